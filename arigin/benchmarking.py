@@ -0,0 +1,286 @@
+import gc
+import json
+import time
+import platform
+import statistics
+import tracemalloc
+import numpy as np
+import torch
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Timings of a benchmark.
+
+    :param name: Unique name of the benchmark, including its parameters.
+    :type name: str
+    :param times: Duration of each repetition in seconds.
+    :type times: List[float]
+    :param n_items: Number of items (e.g. expressions or graphs) processed
+                    per repetition.
+    :type n_items: int
+    :param params: Parameters of the benchmark.
+    :type params: Dict[str, Any]
+    :param peak_memory: Peak memory in bytes allocated during a call, if
+                        measured, see `peak_traced_memory`.
+    :type peak_memory: Optional[int]
+    """
+    name: str
+    times: List[float]
+    n_items: int = 1
+    params: Dict[str, Any] = field(default_factory=dict)
+    peak_memory: Optional[int] = None
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def minimum(self) -> float:
+        return min(self.times)
+
+    @property
+    def items_per_second(self) -> float:
+        return self.n_items / self.median if self.median else float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "median": self.median,
+            "minimum": self.minimum,
+            "items_per_second": self.items_per_second,
+        }
+
+
+@dataclass
+class Comparison:
+    """
+    Comparison of a benchmark with its baseline. A ratio above 1 means the
+    benchmark got slower.
+    """
+    name: str
+    baseline: float
+    current: float
+    tolerance: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    @property
+    def regression(self) -> bool:
+        return self.ratio > 1 + self.tolerance
+
+    def __str__(self) -> str:
+        flag = "REGRESSION" if self.regression else "ok"
+        return (
+            f"{self.name:<60} {self.baseline * 1e3:10.3f}ms "
+            f"{self.current * 1e3:10.3f}ms {self.ratio:6.2f}x  {flag}"
+        )
+
+
+def peak_traced_memory(func: Callable[..., Any], *args) -> Tuple[Any, int]:
+    """
+    Call func and measure the peak memory allocated during the call with
+    tracemalloc, i.e. Python objects and NumPy arrays. Memory allocated by
+    torch itself, e.g. by torch.tensor, is not traced, while tensors
+    sharing the memory of NumPy arrays via torch.from_numpy are.
+
+    :returns: The return value of func and the peak memory in bytes.
+    :rtype: Tuple[Any, int]
+    """
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    try:
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return result, peak - start
+
+
+def benchmark(
+        name: str,
+        func: Callable[..., Any],
+        setup: Optional[Callable[[], tuple]] = None,
+        repeat: int = 5,
+        warmup: int = 1,
+        n_items: int = 1,
+        measure_memory: bool = False,
+        **params
+) -> BenchmarkResult:
+    """
+    Time repeated calls of a function.
+
+    The garbage collector is disabled while timing. If given, setup is
+    called before each repetition and its return values are passed as
+    arguments to func, without being timed.
+
+    :param name: Unique name of the benchmark.
+    :type name: str
+    :param func: The function to be timed.
+    :type func: Callable[..., Any]
+    :param setup: Function returning the arguments of func.
+    :type setup: Optional[Callable[[], tuple]]
+    :param repeat: Number of timed repetitions.
+    :type repeat: int
+    :param warmup: Number of untimed repetitions before timing.
+    :type warmup: int
+    :param n_items: Number of items processed per call of func.
+    :type n_items: int
+    :param measure_memory: If True, func is called once more, untimed, to
+                           measure its peak memory, see
+                           `peak_traced_memory`.
+    :type measure_memory: bool
+
+    :returns: The timings.
+    :rtype: BenchmarkResult
+
+    :example:
+
+        >>> benchmark("generate", lambda: [generate() for _ in range(1000)], n_items=1000)
+    """
+
+    times = []
+    for i in range(warmup + repeat):
+        args = setup() if setup is not None else ()
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func(*args)
+            duration = time.perf_counter() - start
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if i >= warmup:
+            times.append(duration)
+
+    peak_memory = None
+    if measure_memory:
+        args = setup() if setup is not None else ()
+        _, peak_memory = peak_traced_memory(func, *args)
+
+    return BenchmarkResult(
+        name=name,
+        times=times,
+        n_items=n_items,
+        params=params,
+        peak_memory=peak_memory
+    )
+
+
+def environment() -> dict:
+    """
+    Describe the environment the benchmarks are run in.
+    """
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def save_results(results: List[BenchmarkResult], path: str):
+    """
+    Store results together with the environment as JSON.
+    """
+    with open(path, "w") as file:
+        json.dump(
+            {
+                "environment": environment(),
+                "results": [result.to_dict() for result in results],
+            },
+            file,
+            indent=2
+        )
+
+
+def load_environment(path: str) -> dict:
+    """
+    Load the environment of results stored by `save_results`.
+    """
+    with open(path) as file:
+        return json.load(file)["environment"]
+
+
+def load_results(path: str) -> List[BenchmarkResult]:
+    """
+    Load results stored by `save_results`.
+    """
+    with open(path) as file:
+        content = json.load(file)
+    return [
+        BenchmarkResult(
+            name=result["name"],
+            times=result["times"],
+            n_items=result["n_items"],
+            params=result["params"],
+            peak_memory=result.get("peak_memory")
+        )
+        for result in content["results"]
+    ]
+
+
+def compare(
+        results: List[BenchmarkResult],
+        baseline: List[BenchmarkResult],
+        tolerance: float = 0.1,
+        baseline_environment: Optional[dict] = None
+) -> List[Comparison]:
+    """
+    Compare the median durations of results with a baseline. Benchmarks
+    missing in the baseline are skipped. Timings only compare within the
+    same environment, hence a baseline measured in another environment is
+    rejected.
+
+    :param results: The current results.
+    :type results: List[BenchmarkResult]
+    :param baseline: The baseline results.
+    :type baseline: List[BenchmarkResult]
+    :param tolerance: Relative slowdown, which is not yet a regression.
+    :type tolerance: float
+    :param baseline_environment: Environment of the baseline, see
+                                 `load_environment`, which must equal the
+                                 current one, not checked if None.
+    :type baseline_environment: Optional[dict]
+
+    :returns: Comparison of each benchmark contained in both.
+    :rtype: List[Comparison]
+    """
+
+    if baseline_environment is not None:
+        current = environment()
+        differences = [
+            f"{key}: {baseline_environment.get(key)!r} != {value!r}"
+            for key, value in current.items()
+            if baseline_environment.get(key) != value
+        ]
+        if differences:
+            raise ValueError(
+                "The baseline was measured in another environment, "
+                + ", ".join(differences)
+            )
+
+    baseline = {result.name: result for result in baseline}
+    return [
+        Comparison(
+            name=result.name,
+            baseline=baseline[result.name].median,
+            current=result.median,
+            tolerance=tolerance
+        )
+        for result in results
+        if result.name in baseline
+    ]
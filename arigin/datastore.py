@@ -0,0 +1,469 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+import torch
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence
+from torch_geometric.data import Data
+from sklearn.base import TransformerMixin
+
+from arigin.feature_spec import FEATURE_SPEC_FILE, FeatureSpec
+from arigin.graph.generation import iter_multiple_graphs
+from arigin.preprocessing import GraphDataset, GraphEntityToDataSet, split_by_graph
+
+FORMAT_VERSION = 4
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ARIGIN_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "arigin")
+)
+
+METADATA_FILE = "metadata.json"
+
+# Arrays stored per shard as returned by `split_by_graph`, i.e. a single
+# graph is a contiguous slice of every array.
+ARRAYS = (
+    "x", "edge_index", "edge_attr", "y", "depth", "topo_rank", "root_index",
+    "node_offsets", "edge_offsets"
+)
+
+
+def cache_key(
+        n_graphs: int,
+        min_numbers: int,
+        max_numbers: int,
+        seed: int,
+        shard_size: int,
+        transformer: Optional[TransformerMixin] = None
+) -> str:
+    """
+    Get the key of a cached dataset, i.e. a hash of the generation
+    parameters, the seed and the transformer used for featurization.
+    """
+
+    if transformer is None:
+        transformer = GraphEntityToDataSet()
+
+    parameters = {
+        "format_version": FORMAT_VERSION,
+        "n_graphs": n_graphs,
+        "min_numbers": min_numbers,
+        "max_numbers": max_numbers,
+        "seed": seed,
+        "shard_size": shard_size,
+        "transformer": repr(transformer),
+    }
+    return hashlib.sha256(
+        json.dumps(parameters, sort_keys=True).encode()
+    ).hexdigest()[:16]
+
+
+def build_cache(
+        n_graphs: int = 1000,
+        min_numbers: int = 2,
+        max_numbers: int = 4,
+        seed: int = 0,
+        shard_size: int = 10000,
+        n_jobs: int = 1,
+        transformer: Optional[TransformerMixin] = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        overwrite: bool = False
+) -> str:
+    """
+    Generate and featurize graphs shard by shard and store them as .npy
+    files, which can be loaded memory mapped by `load_cache`.
+
+    The transformer is fitted on all shards first, see
+    `GraphEntityToDataSet.fit_stream`, then the shards are generated again
+    from the same seed and featurized. Hence generation runs twice, but
+    only a single shard is held in memory at a time. The cache is written
+    to a temporary directory, which is renamed when complete, so an
+    interrupted build never leaves a partial cache.
+
+    :param n_graphs: The number of expressions to generate.
+    :type n_graphs: int
+    :param min_numbers: The minimum number of numbers in each expression.
+    :type min_numbers: int
+    :param max_numbers: The maximum number of numbers in each expression.
+    :type max_numbers: int
+    :param seed: Master seed for reproducible generation.
+    :type seed: int
+    :param shard_size: Number of expressions per shard.
+    :type shard_size: int
+    :param n_jobs: Number of worker processes used for generation.
+    :type n_jobs: int
+    :param transformer: Transformer to featurize the graphs, which must
+                        be fitted incrementally by fit_stream. Defaults to
+                        GraphEntityToDataSet().
+    :type transformer: Optional[TransformerMixin]
+    :param cache_dir: Directory containing the caches.
+    :type cache_dir: str
+    :param overwrite: If True, an existing cache is rebuilt.
+    :type overwrite: bool
+
+    :returns: Path of the cache.
+    :rtype: str
+
+    :example:
+
+        >>> path = build_cache(100000, seed=42, n_jobs=-1)
+        >>> store = load_cache(path)
+    """
+
+    if seed is None:
+        raise ValueError("A seed is required to build a reproducible cache.")
+    if transformer is None:
+        transformer = GraphEntityToDataSet()
+    if not hasattr(transformer, "fit_stream"):
+        raise ValueError(
+            f"{transformer!r} cannot be fitted on all shards, use a "
+            "GraphEntityToDataSet with incremental transformers."
+        )
+
+    key = cache_key(
+        n_graphs, min_numbers, max_numbers, seed, shard_size, transformer
+    )
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(path):
+        if not overwrite:
+            return path
+        shutil.rmtree(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=f".{key}-", dir=cache_dir)
+    def iter_shards():
+        return iter_multiple_graphs(
+            n_graphs,
+            min_numbers,
+            max_numbers,
+            chunk_size=shard_size,
+            n_jobs=n_jobs,
+            seed=seed,
+            compact=True
+        )
+
+    try:
+        transformer.fit_stream(iter_shards())
+        if hasattr(transformer, "feature_spec"):
+            try:
+                transformer.feature_spec().save(
+                    os.path.join(tmp_path, FEATURE_SPEC_FILE)
+                )
+            except ValueError:
+                # Only the fast featurizers can be exported
+                pass
+
+        shards = []
+        for shard, (graphs, results) in enumerate(iter_shards()):
+            data = transformer.transform(graphs, results)
+            arrays = split_by_graph(data, graphs.n_graphs)
+
+            name = f"shard-{shard:05d}"
+            os.makedirs(os.path.join(tmp_path, name))
+            for array_name, array in arrays.items():
+                np.save(os.path.join(tmp_path, name, array_name), array)
+            shards.append(
+                {
+                    "name": name,
+                    "n_graphs": len(arrays["node_offsets"]) - 1,
+                    "n_nodes": int(arrays["node_offsets"][-1]),
+                    "n_edges": int(arrays["edge_offsets"][-1]),
+                }
+            )
+
+        metadata = {
+            "key": key,
+            "format_version": FORMAT_VERSION,
+            "n_graphs": n_graphs,
+            "min_numbers": min_numbers,
+            "max_numbers": max_numbers,
+            "seed": seed,
+            "shard_size": shard_size,
+            "transformer": repr(transformer),
+            "shards": shards,
+        }
+        with open(os.path.join(tmp_path, METADATA_FILE), "w") as file:
+            json.dump(metadata, file, indent=2)
+
+        os.rename(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    return path
+
+
+class GraphDataStore:
+    """
+    Dataset stored by `build_cache`. Arrays are memory mapped by default,
+    i.e. loading is almost instant and processes, like data loader
+    workers, share the pages of the operating system's page cache instead
+    of holding copies.
+
+    :param path: Path of the cache.
+    :type path: str
+    :param mmap: If False, all arrays are read into memory.
+    :type mmap: bool
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as file:
+            self.metadata = json.load(file)
+        if self.metadata["format_version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Cache format version {self.metadata['format_version']} "
+                f"is not supported, expected {FORMAT_VERSION}."
+            )
+
+        mmap_mode = "r" if mmap else None
+        self.shards: List[Dict[str, np.ndarray]] = [
+            {
+                array_name: np.load(
+                    os.path.join(path, shard["name"], f"{array_name}.npy"),
+                    mmap_mode=mmap_mode
+                )
+                for array_name in ARRAYS
+            }
+            for shard in self.metadata["shards"]
+        ]
+        self.shard_offsets = np.zeros(len(self.shards) + 1, dtype=np.int64)
+        np.cumsum(
+            [shard["n_graphs"] for shard in self.metadata["shards"]],
+            out=self.shard_offsets[1:]
+        )
+
+    def __len__(self) -> int:
+        return int(self.shard_offsets[-1])
+
+    def __getitem__(self, index: int) -> Data:
+        return self.graph(index)
+
+    def __iter__(self) -> Iterator[Data]:
+        for index in range(len(self)):
+            yield self.graph(index)
+
+    @property
+    def feature_spec(self) -> Optional[FeatureSpec]:
+        """
+        Featurization of the stored graphs, None if the transformer could
+        not be exported, see `GraphEntityToDataSet.feature_spec`.
+        """
+        path = os.path.join(self.path, FEATURE_SPEC_FILE)
+        return FeatureSpec.load(path) if os.path.exists(path) else None
+
+    @property
+    def n_nodes(self) -> np.ndarray:
+        """
+        Number of nodes of each graph.
+        """
+        return np.concatenate(
+            [np.diff(shard["node_offsets"]) for shard in self.shards]
+        )
+
+    def graph(self, index: int) -> Data:
+        """
+        Get a single graph as pytorch DataSet. Only the slices of the graph
+        are read from the memory mapped arrays.
+        """
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Graph index {index} out of range.")
+
+        shard_index = int(
+            np.searchsorted(self.shard_offsets, index, side="right") - 1
+        )
+        shard = self.shards[shard_index]
+        i = index - self.shard_offsets[shard_index]
+        node_start, node_end = shard["node_offsets"][i:i + 2]
+        edge_start, edge_end = shard["edge_offsets"][i:i + 2]
+
+        return Data(
+            x=torch.tensor(shard["x"][node_start:node_end]),
+            edge_index=torch.tensor(shard["edge_index"][:, edge_start:edge_end]),
+            edge_attr=torch.tensor(shard["edge_attr"][edge_start:edge_end]),
+            y=torch.tensor(shard["y"][i:i + 1]),
+            depth=torch.tensor(shard["depth"][node_start:node_end]),
+            topo_rank=torch.tensor(shard["topo_rank"][node_start:node_end]),
+            root_index=torch.tensor(shard["root_index"][i:i + 1]),
+        )
+
+    def shard_data(self, shard_index: int) -> Data:
+        """
+        Get all graphs of a shard as a single pytorch DataSet with "batch"
+        indices, like the output of `GraphEntityToDataSet.transform`
+        (up to the order of edges).
+        """
+
+        shard = self.shards[shard_index]
+        node_offsets = shard["node_offsets"]
+        edge_offsets = shard["edge_offsets"]
+        n_graphs = len(node_offsets) - 1
+
+        batch = np.repeat(np.arange(n_graphs), np.diff(node_offsets))
+        edge_batch = np.repeat(np.arange(n_graphs), np.diff(edge_offsets))
+        edge_index = shard["edge_index"] + node_offsets[edge_batch]
+
+        return Data(
+            x=torch.tensor(shard["x"]),
+            edge_index=torch.from_numpy(edge_index),
+            edge_attr=torch.tensor(shard["edge_attr"]),
+            y=torch.tensor(shard["y"]),
+            batch=torch.from_numpy(batch),
+            depth=torch.tensor(shard["depth"]),
+            topo_rank=torch.tensor(shard["topo_rank"]),
+            root_index=torch.from_numpy(shard["root_index"] + node_offsets[:-1]),
+        )
+
+    def shard_dataset(self, shard_index: int) -> GraphDataset:
+        """
+        Get the graphs of a shard as GraphDataset, e.g. to draw shuffled
+        mini-batches with `torch_geometric.loader.DataLoader`. The arrays
+        are read into memory once.
+        """
+        return GraphDataset.from_arrays(
+            {
+                array_name: np.array(array)
+                for array_name, array in self.shards[shard_index].items()
+            }
+        )
+
+    def iter_shards(self) -> Iterator[Data]:
+        """
+        Lazily iterate the shards as pytorch DataSets, see `shard_data`.
+        """
+        for shard_index in range(len(self.shards)):
+            yield self.shard_data(shard_index)
+
+
+def load_cache(path: str, mmap: bool = True) -> GraphDataStore:
+    """
+    Load a cache built by `build_cache`.
+
+    :param path: Path of the cache.
+    :type path: str
+    :param mmap: If True, arrays are memory mapped instead of read.
+    :type mmap: bool
+
+    :returns: The cached dataset.
+    :rtype: GraphDataStore
+    """
+    return GraphDataStore(path, mmap=mmap)
+
+
+def cached_dataset(
+        n_graphs: int = 1000,
+        min_numbers: int = 2,
+        max_numbers: int = 4,
+        seed: int = 0,
+        shard_size: int = 10000,
+        n_jobs: int = 1,
+        transformer: Optional[TransformerMixin] = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        mmap: bool = True
+) -> GraphDataStore:
+    """
+    Load the cached dataset of the given parameters, building it first
+    if it does not exist yet. See `build_cache` for the parameters.
+    """
+
+    path = build_cache(
+        n_graphs,
+        min_numbers,
+        max_numbers,
+        seed=seed,
+        shard_size=shard_size,
+        n_jobs=n_jobs,
+        transformer=transformer,
+        cache_dir=cache_dir
+    )
+    return load_cache(path, mmap=mmap)
+
+
+def list_caches(cache_dir: str = DEFAULT_CACHE_DIR) -> List[dict]:
+    """
+    Get the metadata of all caches in cache_dir.
+    """
+
+    if not os.path.isdir(cache_dir):
+        return []
+
+    caches = []
+    for name in sorted(os.listdir(cache_dir)):
+        metadata_path = os.path.join(cache_dir, name, METADATA_FILE)
+        if not name.startswith(".") and os.path.isfile(metadata_path):
+            with open(metadata_path) as file:
+                caches.append(json.load(file))
+    return caches
+
+
+def _describe(metadata: dict) -> str:
+    n_nodes = sum(shard["n_nodes"] for shard in metadata["shards"])
+    n_edges = sum(shard["n_edges"] for shard in metadata["shards"])
+    n_graphs = sum(shard["n_graphs"] for shard in metadata["shards"])
+    return (
+        f"{metadata['key']}: {n_graphs} graphs, {n_nodes} nodes, "
+        f"{n_edges} edges in {len(metadata['shards'])} shards "
+        f"(n_graphs={metadata['n_graphs']}, "
+        f"min_numbers={metadata['min_numbers']}, "
+        f"max_numbers={metadata['max_numbers']}, seed={metadata['seed']})"
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Command line interface to build and inspect dataset caches.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="arigin-cache",
+        description="Build and inspect cached graph datasets."
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Generate and store a dataset.")
+    build.add_argument("--n-graphs", type=int, default=1000)
+    build.add_argument("--min-numbers", type=int, default=2)
+    build.add_argument("--max-numbers", type=int, default=4)
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--shard-size", type=int, default=10000)
+    build.add_argument("--n-jobs", type=int, default=1)
+    build.add_argument("--overwrite", action="store_true")
+
+    commands.add_parser("list", help="List all cached datasets.")
+
+    info = commands.add_parser("info", help="Describe a cached dataset.")
+    info.add_argument("key")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        path = build_cache(
+            args.n_graphs,
+            args.min_numbers,
+            args.max_numbers,
+            seed=args.seed,
+            shard_size=args.shard_size,
+            n_jobs=args.n_jobs,
+            cache_dir=args.cache_dir,
+            overwrite=args.overwrite
+        )
+        print(path)
+    elif args.command == "list":
+        for metadata in list_caches(args.cache_dir):
+            print(_describe(metadata))
+    else:
+        store = load_cache(os.path.join(args.cache_dir, args.key))
+        print(_describe(store.metadata))
+        print(json.dumps(store.metadata, indent=2))
+
+
+if __name__ == "__main__":
+    main()
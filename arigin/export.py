@@ -0,0 +1,359 @@
+import json
+import argparse
+import numpy as np
+import torch
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+from torch_geometric.loader import DataLoader
+
+from arigin.benchmarking import BenchmarkResult, benchmark
+from arigin.graph.models import LevelModel
+from arigin.training import MODELS, build_model, predict
+
+# Formats of exported models:
+# - "torchscript": scripted with torch.jit.script, loads without arigin
+# - "state_dict": the state dict and the arguments of `build_model`, e.g. of
+#   a quantized MathModel, which is rebuilt by arigin when loaded
+EXPORT_FORMATS = ("torchscript", "state_dict")
+
+# Models, which can be scripted
+SCRIPTABLE_MODELS = (LevelModel,)
+
+# Layers replaced by their dynamically quantized counterparts
+QUANTIZED_LAYERS = {torch.nn.Linear, torch.nn.GRUCell}
+
+
+def quantize(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Quantize the weights of the Linear and GRUCell layers of a copy of the
+    model to int8. Activations are quantized dynamically at inference,
+    i.e. no calibration data is needed. Layers of torch_geometric, e.g.
+    the linear maps inside GATv2Conv, are kept in float.
+    """
+    return torch.ao.quantization.quantize_dynamic(
+        model, QUANTIZED_LAYERS, dtype=torch.qint8, inplace=False
+    )
+
+
+def quantized_fraction(model: torch.nn.Module, exported: torch.nn.Module) -> float:
+    """
+    Fraction of the parameters of model, which are quantized in the
+    exported model. Quantized weights are packed, i.e. no parameters.
+    """
+    total = sum(parameter.numel() for parameter in model.parameters())
+    remaining = sum(parameter.numel() for parameter in exported.parameters())
+    return 1 - remaining / total if total else 0.
+
+
+def export_model(
+        model: torch.nn.Module,
+        path: str,
+        format: str = "torchscript",
+        quantized: bool = False,
+        config: Optional[Dict[str, Any]] = None) -> torch.nn.Module:
+    """
+    Export a trained model for CPU inference.
+
+    LevelModel is scripted into a self-contained TorchScript artifact.
+    GATv2Conv of MathModel is not scriptable and GCNConv of GCN scripts,
+    but the saved archive fails to load. Tracing is no alternative, since
+    it fixes the data dependent pooling of MathModel to the traced batch.
+    Hence both can only be exported as state dict, which is loaded without
+    unpickling any code, but needs arigin to rebuild the model. ONNX export
+    would need onnx, which is no dependency.
+
+    :param model: The trained model.
+    :type model: torch.nn.Module
+    :param path: Path of the exported model.
+    :type path: str
+    :param format: One of EXPORT_FORMATS.
+    :type format: str
+    :param quantized: If True, the model is quantized first, see
+                      `quantize`.
+    :type quantized: bool
+    :param config: Keyword arguments of `arigin.training.build_model`
+                   creating the model, required by the state_dict format.
+    :type config: Optional[Dict[str, Any]]
+
+    :returns: The exported model, as loaded by `load_exported`.
+    :rtype: torch.nn.Module
+
+    :example:
+
+        >>> exported = export_model(model, "level.pt", quantized=True)
+        >>> predict(exported, batch)
+
+        >>> config = dict(name="math", in_channels=9, edge_dim=4)
+        >>> export_model(model, "math.pt", "state_dict", config=config)
+    """
+
+    if format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown format '{format}', expected one of {EXPORT_FORMATS}."
+        )
+    if format == "torchscript" and not isinstance(model, SCRIPTABLE_MODELS):
+        raise ValueError(
+            f"{model.__class__.__name__} cannot be scripted, use the "
+            "state_dict format instead."
+        )
+    if format == "state_dict" and config is None:
+        raise ValueError("The state_dict format requires the config of the model.")
+
+    model = model.eval()
+    if quantized:
+        model = quantize(model)
+
+    if format == "torchscript":
+        model = torch.jit.script(model)
+        torch.jit.save(model, path)
+    else:
+        torch.save(
+            {
+                "config": dict(config),
+                "quantized": quantized,
+                "state_dict": model.state_dict(),
+            },
+            path
+        )
+    return model
+
+
+def load_exported(path: str) -> torch.nn.Module:
+    """
+    Load a model exported by `export_model` in either format. Models in
+    state_dict format are rebuilt from their config and only tensors are
+    loaded, so no code is unpickled.
+    """
+    try:
+        return torch.jit.load(path, map_location="cpu")
+    except RuntimeError:
+        # Not a TorchScript archive
+        exported = torch.load(path, map_location="cpu", weights_only=True)
+
+    model = build_model(**exported["config"]).eval()
+    if exported["quantized"]:
+        model = quantize(model)
+    model.load_state_dict(exported["state_dict"])
+    return model
+
+
+@dataclass
+class ExportReport:
+    """
+    Accuracy and latency of an exported model compared with the eager
+    model it was exported from.
+
+    :param max_abs_delta: Maximum absolute difference of the predictions.
+    :type max_abs_delta: float
+    :param mean_abs_delta: Mean absolute difference of the predictions.
+    :type mean_abs_delta: float
+    :param eager: Latencies of the eager model per batch size.
+    :type eager: List[BenchmarkResult]
+    :param exported: Latencies of the exported model per batch size.
+    :type exported: List[BenchmarkResult]
+    :param quantized_fraction: Fraction of the parameters, which are
+                               quantized, see `quantized_fraction`.
+    :type quantized_fraction: float
+    :param notes: Limitations of the export.
+    :type notes: List[str]
+    """
+    max_abs_delta: float
+    mean_abs_delta: float
+    eager: List[BenchmarkResult]
+    exported: List[BenchmarkResult]
+    quantized_fraction: float = 0.
+    notes: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "max_abs_delta": self.max_abs_delta,
+            "mean_abs_delta": self.mean_abs_delta,
+            "eager": [result.to_dict() for result in self.eager],
+            "exported": [result.to_dict() for result in self.exported],
+            "quantized_fraction": self.quantized_fraction,
+            "notes": list(self.notes),
+        }
+
+    def __str__(self) -> str:
+        lines = [
+            f"max abs delta {self.max_abs_delta:.6f}, "
+            f"mean abs delta {self.mean_abs_delta:.6f}, "
+            f"quantized {self.quantized_fraction:.0%} of the parameters",
+            f"{'batch size':>10} {'eager':>12} {'exported':>12} {'speedup':>8}",
+        ]
+        for eager, exported in zip(self.eager, self.exported):
+            lines.append(
+                f"{eager.params['batch_size']:>10} "
+                f"{eager.median * 1e3:10.3f}ms {exported.median * 1e3:10.3f}ms "
+                f"{eager.median / exported.median:7.2f}x"
+            )
+        lines += [f"note: {note}" for note in self.notes]
+        return "\n".join(lines)
+
+
+def compare_export(
+        eager: torch.nn.Module,
+        exported: torch.nn.Module,
+        dataset,
+        batch_sizes: Sequence[int] = (1, 32, 1024),
+        repeat: int = 20) -> ExportReport:
+    """
+    Compare the predictions of an exported model with the eager model on
+    all graphs of a dataset and time both at each batch size, under
+    torch.inference_mode. Limitations of the export, e.g. a model that
+    could not be scripted or is quantized only partially, are noted in
+    the report.
+
+    :param eager: The model before export.
+    :type eager: torch.nn.Module
+    :param exported: The exported model.
+    :type exported: torch.nn.Module
+    :param dataset: Graphs, e.g. a GraphDataset.
+    :param batch_sizes: Batch sizes of the latency benchmark.
+    :type batch_sizes: Sequence[int]
+    :param repeat: Number of timed repetitions per batch size.
+    :type repeat: int
+    """
+
+    eager = eager.eval()
+    deltas = []
+    with torch.inference_mode():
+        for batch in DataLoader(dataset, batch_size=1024):
+            deltas.append(
+                (predict(exported, batch) - predict(eager, batch)).abs().numpy()
+            )
+    deltas = np.concatenate(deltas)
+
+    results = {"eager": [], "exported": []}
+    for batch_size in batch_sizes:
+        batch = next(iter(DataLoader(dataset, batch_size=batch_size)))
+        for name, model in (("eager", eager), ("exported", exported)):
+
+            def forward(model=model, batch=batch):
+                with torch.inference_mode():
+                    predict(model, batch)
+
+            results[name].append(
+                benchmark(
+                    f"{name}[batch_size={batch_size}]",
+                    forward,
+                    repeat=repeat,
+                    warmup=3,
+                    n_items=batch.num_graphs,
+                    batch_size=batch_size
+                )
+            )
+
+    fraction = quantized_fraction(eager, exported)
+    notes = []
+    if not isinstance(exported, torch.jit.ScriptModule):
+        notes.append(
+            f"{eager.__class__.__name__} cannot be scripted or traced, it was "
+            "exported as state dict, which needs arigin to load, ONNX export "
+            "is not available."
+        )
+    if 0 < fraction < 0.5:
+        notes.append(
+            "Most parameters stay in float, torch_geometric layers like "
+            "GATv2Conv are not quantized, so little speedup can be expected."
+        )
+
+    return ExportReport(
+        max_abs_delta=float(deltas.max(initial=0.)),
+        mean_abs_delta=float(deltas.mean()) if len(deltas) else 0.,
+        eager=results["eager"],
+        exported=results["exported"],
+        quantized_fraction=fraction,
+        notes=notes
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Command line interface to export a trained model and report accuracy
+    and latency of the export.
+    """
+
+    from arigin.graph.generation import generate_multiple_graphs
+    from arigin.preprocessing import GraphDataset
+    from arigin.serving import load_predictor
+
+    parser = argparse.ArgumentParser(
+        prog="arigin-export",
+        description="Export a trained model for CPU inference."
+    )
+    parser.add_argument("output", help="Path of the exported model.")
+    parser.add_argument(
+        "--checkpoint", default=None,
+        help="Checkpoint of `arigin.training.Trainer`, untrained if omitted."
+    )
+    parser.add_argument(
+        "--feature-spec", default=None,
+        help="Feature spec, defaults to the one next to the checkpoint."
+    )
+    parser.add_argument("--model", choices=MODELS, default="level")
+    parser.add_argument("--hidden-channels", type=int, default=32)
+    parser.add_argument(
+        "--graph-norm", action="store_true",
+        help="MathModel was trained with --graph-norm."
+    )
+    parser.add_argument(
+        "--format", choices=EXPORT_FORMATS, default="torchscript",
+        help="Only LevelModel can be scripted, others require --format state_dict."
+    )
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument(
+        "--n-graphs", type=int, default=2048,
+        help="Number of generated graphs compared by the report."
+    )
+    parser.add_argument("--report", default=None, help="Store the report as JSON.")
+    args = parser.parse_args(argv)
+
+    try:
+        predictor = load_predictor(
+            args.model, args.hidden_channels, checkpoint=args.checkpoint,
+            feature_spec=args.feature_spec, graph_norm=args.graph_norm
+        )
+    except ValueError as error:
+        parser.error(str(error))
+    model = predictor.model
+    if args.format == "torchscript" and not isinstance(model, SCRIPTABLE_MODELS):
+        parser.error(
+            f"{model.__class__.__name__} cannot be scripted, pass --format "
+            "state_dict to export the state dict, which needs arigin to load."
+        )
+    spec = predictor.feature_spec
+    config = dict(
+        name=args.model,
+        in_channels=len(spec.node_columns),
+        edge_dim=2 * len(spec.edge_columns),
+        hidden_channels=args.hidden_channels,
+        graph_norm=args.graph_norm
+    )
+    export_model(
+        model, args.output, format=args.format, quantized=args.quantize,
+        config=config
+    )
+    exported = load_exported(args.output)
+
+    graphs, results = generate_multiple_graphs(
+        args.n_graphs, 2, 4, seed=0, compact=True
+    )
+    dataset = GraphDataset.from_data(
+        predictor.feature_spec.transform(graphs, np.array(results).reshape(-1, 1)),
+        graphs.n_graphs
+    )
+    report = compare_export(model, exported, dataset)
+    print(report)
+
+    if args.report is not None:
+        with open(args.report, "w") as file:
+            json.dump(
+                {**report.to_dict(), **vars(args)},
+                file,
+                indent=2
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,36 @@
 import re
 import random
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Union
+
+from arigin.profiling import profiled
 
 OPERATORS = ["+", "-", "*", "/"]
 OPEN_PARENTHESIS = "("
 CLOSE_PARENTHESIS = ")"
 
+# Integer codes of tokens as used by `generate_batch`. Operators are
+# encoded by OPERATOR_TOKEN + position in OPERATORS.
+PADDING_TOKEN = -1
+NUMBER_TOKEN = 0
+OPERATOR_TOKEN = 1
+OPEN_PARENTHESIS_TOKEN = OPERATOR_TOKEN + len(OPERATORS)
+CLOSE_PARENTHESIS_TOKEN = OPEN_PARENTHESIS_TOKEN + 1
 
-def generate(
+
+def generate_entities(
         min_numbers: int = 2, 
         max_numbers: int = 4,
         min_value: float = 0.01,
         max_value: float = 1.,
-        n_digits: int = 3
-    ) -> str:
+        n_digits: int = 3,
+        rng: Optional[random.Random] = None
+    ) -> Iterator[Union[float, str]]:
     """
-    Generate an arithmetic expression by applying the formatting rules,
-    which are hardcoded to fill basic arithmetic rules.
+    Lazily generate the entities of an arithmetic expression, i.e. numbers
+    as float and operators and parentheses as string, by applying the
+    formatting rules, which are hardcoded to fill basic arithmetic rules.
 
     :param min_numbers: minimum number of values to be created. Must be
                        greater or equal 2.
@@ -23,47 +38,48 @@ def generate(
     :param max_numbers: minimum number of values to be created. Must be
                        greater or equal 2.
     :type max_numbers: int
+    :param rng: Random number generator to draw from. If None, the global
+                generator of the random module is used.
+    :type rng: Optional[random.Random]
 
-    :return: String representing the expression.
+    :return: Iterator of the entities of the expression.
     """
 
-    expression = []
+    if rng is None:
+        rng = random
+
+    previous_entity = None
     
-    max_numbers = random.randint(min_numbers, max(max_numbers, 2))
+    max_numbers = rng.randint(min_numbers, max(max_numbers, 2))
 
     n_open_parentesis = 0
     n_numbers = 0
 
     def _number():
-        number = min_value + (max_value - min_value) * random.random()
+        number = min_value + (max_value - min_value) * rng.random()
         return round(number, n_digits)
 
     while n_numbers < max_numbers:
-        if len(expression):
-            previous_entity = expression[-1]
-        else:
-            previous_entity = None
-
         if isinstance(previous_entity, float):  # Number
             next_possible_entity = list(OPERATORS)
             if n_open_parentesis > 0:
                 next_possible_entity.append(CLOSE_PARENTHESIS)
-            next_entity = random.choice(next_possible_entity)
+            next_entity = rng.choice(next_possible_entity)
         elif previous_entity in OPERATORS:  # Operator
             next_possible_entity = [_number(), OPEN_PARENTHESIS]
-            next_entity = random.choice(next_possible_entity)
+            next_entity = rng.choice(next_possible_entity)
         elif previous_entity == CLOSE_PARENTHESIS:  # )
             next_possible_entity = list(OPERATORS)
-            next_entity = random.choice(next_possible_entity)
+            next_entity = rng.choice(next_possible_entity)
         elif previous_entity == OPEN_PARENTHESIS:  # (
             next_possible_entity = [_number(), OPEN_PARENTHESIS]
-            next_entity = random.choice(next_possible_entity)
+            next_entity = rng.choice(next_possible_entity)
         else:  # None <- initial
             next_possible_entity = [
                 _number(),
                 OPEN_PARENTHESIS
             ]
-            next_entity = random.choice(next_possible_entity)
+            next_entity = rng.choice(next_possible_entity)
 
         if next_entity == CLOSE_PARENTHESIS:
             n_open_parentesis -= 1
@@ -72,10 +88,209 @@ def generate(
         elif isinstance(next_entity, float):
             n_numbers += 1
 
-        expression.append(next_entity)
+        yield next_entity
+        previous_entity = next_entity
 
     while n_open_parentesis > 0:
-        expression += CLOSE_PARENTHESIS
+        yield CLOSE_PARENTHESIS
         n_open_parentesis -= 1
 
+
+@profiled("expressions.generate")
+def generate(
+        min_numbers: int = 2, 
+        max_numbers: int = 4,
+        min_value: float = 0.01,
+        max_value: float = 1.,
+        n_digits: int = 3,
+        rng: Optional[random.Random] = None
+    ) -> str:
+    """
+    Generate an arithmetic expression by applying the formatting rules,
+    which are hardcoded to fill basic arithmetic rules.
+
+    :param min_numbers: minimum number of values to be created. Must be
+                       greater or equal 2.
+    :type min_numbers: int
+    :param max_numbers: minimum number of values to be created. Must be
+                       greater or equal 2.
+    :type max_numbers: int
+    :param rng: Random number generator to draw from. If None, the global
+                generator of the random module is used.
+    :type rng: Optional[random.Random]
+
+    :return: String representing the expression.
+    """
+
+    expression = generate_entities(
+        min_numbers, max_numbers, min_value, max_value, n_digits, rng
+    )
+
     return " ".join((str(x) for x in expression))
+
+
+@dataclass
+class TokenBatch:
+    """
+    Batch of expressions given as token code arrays, rows are padded with
+    PADDING_TOKEN.
+
+    :param codes: Token codes of each expression.
+    :type codes: np.ndarray[int8], shape (n_expressions, max_length)
+    :param values: Values of the number tokens, NaN for other tokens.
+    :type values: np.ndarray[float64], shape (n_expressions, max_length)
+    :param lengths: Number of tokens of each expression.
+    :type lengths: np.ndarray[int64], shape (n_expressions,)
+    """
+    codes: np.ndarray
+    values: np.ndarray
+    lengths: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def expression(self, index: int) -> str:
+        """
+        Render a single expression as string, formatted like `generate`.
+        """
+        length = self.lengths[index]
+        symbols = (
+            [None] + OPERATORS + [OPEN_PARENTHESIS, CLOSE_PARENTHESIS]
+        )
+        return " ".join(
+            str(value) if code == NUMBER_TOKEN else symbols[code]
+            for code, value in zip(
+                self.codes[index, :length].tolist(),
+                self.values[index, :length].tolist()
+            )
+        )
+
+    def to_strings(self) -> List[str]:
+        """
+        Render all expressions as strings.
+        """
+        return [self.expression(index) for index in range(len(self))]
+
+
+@profiled("expressions.generate_batch")
+def generate_batch(
+        n_expressions: int,
+        min_numbers: int = 2,
+        max_numbers: int = 4,
+        min_value: float = 0.01,
+        max_value: float = 1.,
+        n_digits: int = 3,
+        seed: Optional[Union[int, np.random.Generator]] = None
+    ) -> TokenBatch:
+    """
+    Generate a batch of arithmetic expressions at once as token arrays.
+
+    The expressions follow the same rules and distributions as `generate`,
+    but all expressions are extended token by token in lockstep using
+    vectorized numpy operations instead of a Python loop per expression.
+
+    :param n_expressions: Number of expressions to be created.
+    :type n_expressions: int
+    :param min_numbers: minimum number of values to be created. Must be
+                       greater or equal 2.
+    :type min_numbers: int
+    :param max_numbers: maximum number of values to be created. Must be
+                       greater or equal 2.
+    :type max_numbers: int
+    :param seed: Seed or generator for the numpy random number generator.
+    :type seed: Optional[Union[int, np.random.Generator]]
+
+    :return: Token arrays of the expressions.
+    :rtype: TokenBatch
+    """
+
+    rng = np.random.default_rng(seed)
+
+    n_numbers_target = rng.integers(
+        min_numbers, max(max_numbers, 2), endpoint=True, size=n_expressions
+    )
+    n_numbers = np.zeros(n_expressions, dtype=np.int64)
+    n_open = np.zeros(n_expressions, dtype=np.int64)
+    lengths = np.zeros(n_expressions, dtype=np.int64)
+    previous = np.full(n_expressions, PADDING_TOKEN, dtype=np.int8)
+
+    capacity = 4 * max(max_numbers, 2)
+    codes = np.full((n_expressions, capacity), PADDING_TOKEN, dtype=np.int8)
+    values = np.full((n_expressions, capacity), np.nan)
+
+    active = np.flatnonzero(n_numbers < n_numbers_target)
+    while len(active):
+        if lengths.max() >= capacity:
+            codes = np.pad(
+                codes, ((0, 0), (0, capacity)), constant_values=PADDING_TOKEN
+            )
+            values = np.pad(
+                values, ((0, 0), (0, capacity)), constant_values=np.nan
+            )
+            capacity *= 2
+
+        prev = previous[active]
+        u = rng.random(len(active))
+        token = np.empty(len(active), dtype=np.int8)
+
+        # After start, operator or '(': a number or '('
+        expect_operand = (
+            (prev == PADDING_TOKEN) |
+            (prev == OPEN_PARENTHESIS_TOKEN) |
+            ((prev >= OPERATOR_TOKEN) & (prev < OPEN_PARENTHESIS_TOKEN))
+        )
+        token[expect_operand] = np.where(
+            u[expect_operand] < 0.5, NUMBER_TOKEN, OPEN_PARENTHESIS_TOKEN
+        )
+
+        # After a number: an operator or ')' if any parenthesis is open
+        after_number = prev == NUMBER_TOKEN
+        n_choices = len(OPERATORS) + (n_open[active][after_number] > 0)
+        choice = (u[after_number] * n_choices).astype(np.int8)
+        token[after_number] = np.where(
+            choice < len(OPERATORS),
+            OPERATOR_TOKEN + choice,
+            CLOSE_PARENTHESIS_TOKEN
+        )
+
+        # After ')': an operator
+        after_close = prev == CLOSE_PARENTHESIS_TOKEN
+        token[after_close] = OPERATOR_TOKEN + (
+            u[after_close] * len(OPERATORS)
+        ).astype(np.int8)
+
+        position = lengths[active]
+        codes[active, position] = token
+        is_number = token == NUMBER_TOKEN
+        number_rows = active[is_number]
+        number = min_value + (max_value - min_value) * rng.random(len(number_rows))
+        values[number_rows, position[is_number]] = np.round(number, n_digits)
+
+        n_numbers[number_rows] += 1
+        n_open[active] += (
+            (token == OPEN_PARENTHESIS_TOKEN).astype(np.int64) -
+            (token == CLOSE_PARENTHESIS_TOKEN)
+        )
+        previous[active] = token
+        lengths[active] += 1
+        active = active[n_numbers[active] < n_numbers_target[active]]
+
+    # Close all remaining parentheses
+    total_lengths = lengths + n_open
+    if total_lengths.max(initial=0) > capacity:
+        extra = total_lengths.max() - capacity
+        codes = np.pad(codes, ((0, 0), (0, extra)), constant_values=PADDING_TOKEN)
+        values = np.pad(values, ((0, 0), (0, extra)), constant_values=np.nan)
+    columns = np.arange(codes.shape[1])
+    closing = (
+        (columns >= lengths[:, np.newaxis]) &
+        (columns < total_lengths[:, np.newaxis])
+    )
+    codes[closing] = CLOSE_PARENTHESIS_TOKEN
+
+    max_length = total_lengths.max(initial=0)
+    return TokenBatch(
+        codes=codes[:, :max_length],
+        values=values[:, :max_length],
+        lengths=total_lengths
+    )
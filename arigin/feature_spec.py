@@ -0,0 +1,312 @@
+import json
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from arigin.graph.compact import GraphBatch
+from arigin.profiling import profiled
+
+FORMAT_VERSION = 1
+
+# Default file name of a feature spec stored next to a model checkpoint
+FEATURE_SPEC_FILE = "feature_spec.npz"
+
+
+def check_known(codes: np.ndarray, known: np.ndarray):
+    if not np.isin(codes, known).all():
+        raise ValueError("Found unknown categories during transform.")
+
+
+def inverse_value(value: np.ndarray) -> np.ndarray:
+    """
+    Inverse of the values, shifted to avoid division by zero.
+    """
+    return 1 / (value + 1e-5)
+
+
+def encode_nodes(
+        node_type: np.ndarray,
+        value: np.ndarray,
+        features: Tuple[str, ...],
+        class_type_table: np.ndarray,
+        label_table: np.ndarray,
+        dtype=np.float32) -> np.ndarray:
+    """
+    Write the node features into a preallocated array, see
+    `arigin.features.NodeFeaturizer` for the feature blocks.
+    """
+
+    widths = {
+        "class_type": class_type_table.shape[1],
+        "class_type_label": 1,
+        "inverse_value": 1,
+        "value": 1,
+    }
+    out = np.empty(
+        (len(node_type), sum(widths[feature] for feature in features)),
+        dtype=dtype
+    )
+    start = 0
+    for feature in features:
+        width = widths[feature]
+        if feature == "class_type":
+            out[:, start:start + width] = class_type_table[node_type]
+        elif feature == "class_type_label":
+            out[:, start] = label_table[node_type]
+        elif feature == "inverse_value":
+            inverse = inverse_value(value)
+            out[:, start] = np.where(np.isnan(inverse), 0., inverse)
+        else:
+            out[:, start] = np.where(np.isnan(value), 0., value)
+        start += width
+
+    return out
+
+
+def edge_attr_with_reverse(E: np.ndarray, dtype: Optional[np.dtype] = None) -> np.ndarray:
+    """
+    Get the edge features of edges and reverse edges. Features of the
+    edges occupy the first columns, those of the reverse edges the last
+    columns, the remaining block is zero. The features keep the dtype of E,
+    unless another dtype is given.
+    """
+
+    n_edges, n_features = E.shape
+    edge_attr = np.zeros(
+        (2 * n_edges, 2 * n_features), dtype=E.dtype if dtype is None else dtype
+    )
+    edge_attr[:n_edges, :n_features] = E
+    edge_attr[n_edges:, n_features:] = E
+
+    return edge_attr
+
+
+@dataclass
+class FeatureSpec:
+    """
+    Fitted featurization of compact graphs as plain arrays, i.e. the
+    vocabularies, column order and target scaling of a fitted
+    `arigin.preprocessing.GraphEntityToDataSet` with the fast featurizers.
+
+    A spec is stored as a single .npz file without pickles, e.g. next to a
+    model checkpoint, and loads in milliseconds without sklearn or pandas.
+    Its transform is numerically identical to the transformer it was
+    created from.
+
+    :param node_features: Feature blocks of the nodes in output order.
+    :type node_features: Tuple[str, ...]
+    :param node_columns: Names of the node feature columns.
+    :type node_columns: List[str]
+    :param node_codes: Known node type codes.
+    :type node_codes: np.ndarray
+    :param class_type_table: One hot encoding of each node type code.
+    :type class_type_table: np.ndarray
+    :param label_table: Label of each node type code.
+    :type label_table: np.ndarray
+    :param edge_columns: Names of the edge feature columns.
+    :type edge_columns: List[str]
+    :param edge_codes: Known edge type codes.
+    :type edge_codes: np.ndarray
+    :param edge_class_table: One hot encoding of each edge type code.
+    :type edge_class_table: np.ndarray
+    :param target_mean: Mean subtracted from the targets, if scaled.
+    :type target_mean: Optional[np.ndarray]
+    :param target_scale: Scale dividing the targets, if scaled.
+    :type target_scale: Optional[np.ndarray]
+
+    :example:
+
+        >>> transformer.feature_spec().save("checkpoints/feature_spec.npz")
+        >>> spec = FeatureSpec.load("checkpoints/feature_spec.npz")
+        >>> data = spec.transform(graph_from_expression("0.5 * 0.25", compact=True))
+    """
+    node_features: Tuple[str, ...]
+    node_columns: List[str]
+    node_codes: np.ndarray
+    class_type_table: np.ndarray
+    label_table: np.ndarray
+    edge_columns: List[str]
+    edge_codes: np.ndarray
+    edge_class_table: np.ndarray
+    target_mean: Optional[np.ndarray] = None
+    target_scale: Optional[np.ndarray] = None
+    dtype: str = "float32"
+
+    @classmethod
+    def from_transformer(cls, transformer) -> "FeatureSpec":
+        """
+        Create the spec of a fitted GraphEntityToDataSet, whose node and
+        edge transformers are a NodeFeaturizer and an EdgeFeaturizer. The
+        target transformer must be None or a StandardScaler.
+        """
+
+        node = getattr(transformer, "node_transformer_", None)
+        edge = getattr(transformer, "edge_transformer_", None)
+        if not hasattr(node, "class_type_table_") or not hasattr(edge, "class_table_"):
+            raise ValueError(
+                "A feature spec requires fitted NodeFeaturizer and "
+                "EdgeFeaturizer transformers."
+            )
+        if np.dtype(node.dtype) != np.dtype(edge.dtype):
+            raise ValueError("Node and edge features must share the dtype.")
+
+        target_mean = target_scale = None
+        target = transformer.target_transformer_
+        if target is not None:
+            if not hasattr(target, "mean_") or not hasattr(target, "scale_"):
+                raise ValueError(
+                    "Only a fitted StandardScaler is supported as target "
+                    f"transformer, got {target!r}."
+                )
+            n_targets = target.n_features_in_
+            target_mean = (
+                np.zeros(n_targets) if target.mean_ is None else target.mean_
+            )
+            target_scale = (
+                np.ones(n_targets) if target.scale_ is None else target.scale_
+            )
+
+        columns = {
+            "class_type": (
+                [f"class_{c}" for c in node.classes_]
+                + [f"type_{t or 'none'}" for t in node.types_]
+            ),
+            "class_type_label": ["class_type_label"],
+            "inverse_value": ["inverse_value"],
+            "value": ["value"],
+        }
+        return cls(
+            node_features=tuple(node.features),
+            node_columns=[c for f in node.features for c in columns[f]],
+            node_codes=np.asarray(node.codes_),
+            class_type_table=node.class_type_table_,
+            label_table=node.label_table_,
+            edge_columns=[f"class_{c}" for c in edge.classes_],
+            edge_codes=np.asarray(edge.codes_),
+            edge_class_table=edge.class_table_,
+            target_mean=target_mean,
+            target_scale=target_scale,
+            dtype=np.dtype(node.dtype).name
+        )
+
+    def node_features_of(self, X: GraphBatch) -> np.ndarray:
+        check_known(X.node_type, self.node_codes)
+        return encode_nodes(
+            X.node_type,
+            X.value,
+            self.node_features,
+            self.class_type_table,
+            self.label_table,
+            dtype=self.dtype
+        )
+
+    def edge_features_of(self, X: GraphBatch) -> np.ndarray:
+        check_known(X.edge_type, self.edge_codes)
+        return self.edge_class_table[X.edge_type].astype(self.dtype)
+
+    def transform_target(self, y: np.ndarray) -> np.ndarray:
+        if self.target_mean is None:
+            return y
+        return (y - self.target_mean) / self.target_scale
+
+    def inverse_transform_target(self, y: np.ndarray) -> np.ndarray:
+        """
+        Undo the target scaling, e.g. of model predictions.
+        """
+        if self.target_mean is None:
+            return y
+        return y * self.target_scale + self.target_mean
+
+    def arrays(self, X: GraphBatch, y: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Featurize a GraphBatch into the arrays x, edge_index, edge_attr, y,
+        batch, depth, topo_rank and root_index, laid out like by
+        `GraphEntityToDataSet.transform`.
+        """
+
+        edge_index = np.empty((2, 2 * X.n_edges), dtype=np.int64)
+        edge_index[:, :X.n_edges] = X.edge_index
+        edge_index[:, X.n_edges:] = X.edge_index[::-1]
+        if y is not None:
+            y = np.ascontiguousarray(self.transform_target(y), dtype=np.float32)
+
+        return {
+            "x": self.node_features_of(X),
+            "edge_index": edge_index,
+            "edge_attr": edge_attr_with_reverse(
+                self.edge_features_of(X), self.dtype
+            ),
+            "y": y,
+            "batch": X.batch.astype(np.int64, copy=False),
+            "depth": X.depth.astype(np.int64),
+            "topo_rank": X.topo_rank.astype(np.int64),
+            "root_index": X.root_index.astype(np.int64),
+        }
+
+    @profiled("feature_spec.transform")
+    def transform(self, X: GraphBatch, y: Optional[np.ndarray] = None):
+        """
+        Featurize a GraphBatch to torch_geometric Data, like
+        `GraphEntityToDataSet.transform`.
+        """
+
+        import torch
+        from torch_geometric.data import Data
+
+        arrays = self.arrays(X, y)
+        return Data(**{
+            name: None if array is None else torch.from_numpy(array)
+            for name, array in arrays.items()
+        })
+
+    def save(self, path: str):
+        """
+        Store the spec as .npz file without pickles.
+        """
+
+        metadata = {
+            "format_version": FORMAT_VERSION,
+            "node_features": list(self.node_features),
+            "node_columns": self.node_columns,
+            "edge_columns": self.edge_columns,
+            "dtype": self.dtype,
+        }
+        arrays = {
+            "node_codes": self.node_codes,
+            "class_type_table": self.class_type_table,
+            "label_table": self.label_table,
+            "edge_codes": self.edge_codes,
+            "edge_class_table": self.edge_class_table,
+        }
+        if self.target_mean is not None:
+            arrays["target_mean"] = self.target_mean
+            arrays["target_scale"] = self.target_scale
+        with open(path, "wb") as file:
+            np.savez(file, metadata=np.array(json.dumps(metadata)), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureSpec":
+        """
+        Load a spec stored by `save`.
+        """
+
+        with np.load(path, allow_pickle=False) as content:
+            metadata = json.loads(str(content["metadata"]))
+            if metadata["format_version"] != FORMAT_VERSION:
+                raise ValueError(
+                    f"Feature spec format version {metadata['format_version']} "
+                    f"is not supported, expected {FORMAT_VERSION}."
+                )
+            return cls(
+                node_features=tuple(metadata["node_features"]),
+                node_columns=metadata["node_columns"],
+                node_codes=content["node_codes"],
+                class_type_table=content["class_type_table"],
+                label_table=content["label_table"],
+                edge_columns=metadata["edge_columns"],
+                edge_codes=content["edge_codes"],
+                edge_class_table=content["edge_class_table"],
+                target_mean=content.get("target_mean"),
+                target_scale=content.get("target_scale"),
+                dtype=metadata["dtype"]
+            )
@@ -1,10 +1,14 @@
 import numpy as np
+from typing import List, Sequence, Union
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, LabelEncoder, StandardScaler, PolynomialFeatures
 from sklearn.impute import SimpleImputer
 
-from arigin.graph.elements import model_to_frame, join_categorical
+from arigin.graph.elements import Node, Relationship, model_to_frame, join_categorical
+from arigin.graph.compact import GraphBatch, NODE_TYPES, EDGE_TYPES
+from arigin.feature_spec import check_known, encode_nodes, inverse_value
 
 
 class PipelineLabelEncoder(LabelEncoder):
@@ -64,7 +68,7 @@ node_features_values = Pipeline(
         ("dataframe", FunctionTransformer(model_to_frame)),
         ("column_transform", ColumnTransformer(
             [
-                ("1/value", FunctionTransformer(lambda x: 1 / (x + 1e-5)), ["value"]),
+                ("1/value", FunctionTransformer(inverse_value), ["value"]),
                 ("value", "passthrough", ["value"]),
             ],
             remainder="drop"
@@ -84,3 +88,282 @@ edge_features = Pipeline(
         )
     ]
 )
+
+
+def _node_codes(X: Union[GraphBatch, List[Node]]):
+    """
+    Get node type codes and values of nodes given as GraphBatch or list of
+    pydantic nodes.
+    """
+    if isinstance(X, GraphBatch):
+        return X.node_type, X.value
+
+    codes = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+    try:
+        node_type = np.array(
+            [codes[(node.__class__, node.type)] for node in X], dtype=np.int32
+        )
+    except KeyError as error:
+        raise ValueError(f"Found unknown node type {error}.") from error
+    value = np.array(
+        [np.nan if node.value is None else node.value for node in X],
+        dtype=np.float64
+    )
+    return node_type, value
+
+
+def _edge_codes(X: Union[GraphBatch, List[Relationship]]):
+    """
+    Get edge type codes of relationships given as GraphBatch or list of
+    pydantic relationships.
+    """
+    if isinstance(X, GraphBatch):
+        return X.edge_type
+
+    codes = {edge_type: code for code, edge_type in enumerate(EDGE_TYPES)}
+    try:
+        return np.array(
+            [codes[relationship.__class__] for relationship in X],
+            dtype=np.int32
+        )
+    except KeyError as error:
+        raise ValueError(f"Found unknown relationship type {error}.") from error
+
+
+def _n_samples(X: Union[GraphBatch, list], size: str) -> int:
+    return getattr(X, size) if isinstance(X, GraphBatch) else len(X)
+
+
+def _check_mergeable(featurizer, other):
+    if other is featurizer:
+        raise ValueError("Cannot merge a featurizer with itself.")
+    if (type(other) is not type(featurizer)
+            or other.get_params() != featurizer.get_params()):
+        raise ValueError(
+            f"Cannot merge {other!r} into {featurizer!r}, parameters differ."
+        )
+
+
+class NodeFeaturizer(BaseEstimator, TransformerMixin):
+    """
+    Fast replacement of the node feature pipelines, writing the features
+    directly into a preallocated array instead of building a DataFrame.
+
+    The vocabulary of node classes and operator types is given by
+    `arigin.graph.compact.NODE_TYPES`. With categories="fixed", all of them
+    make up the features, otherwise only those seen during fit. Categories
+    are ordered like by OneHotEncoder and LabelEncoder, so the output is
+    numerically identical to the corresponding pipeline:
+
+    - node_features: features=("class_type", "value")
+    - node_features_emb: features=("class_type_label",)
+    - node_features_values: features=("inverse_value", "value")
+
+    The categories can also be learned incrementally from chunks of nodes
+    with `partial_fit`, featurizers fitted on different chunks, e.g. by
+    parallel workers, are combined with `merge`.
+
+    :param features: Feature blocks in output order. "class_type" are one
+                     hot encoded node classes followed by one hot encoded
+                     operator types (the last one for numbers),
+                     "class_type_label" the label encoded combination of
+                     both, "inverse_value" 1 / (value + 1e-5) and "value"
+                     the value, both being 0 for operators.
+    :type features: Sequence[str]
+    :param categories: "fixed" or "auto", i.e. learned during fit.
+    :type categories: str
+    :param dtype: Data type of the output.
+    :type dtype: type
+    """
+
+    FEATURES = ("class_type", "class_type_label", "inverse_value", "value")
+
+    def __init__(
+            self,
+            features: Sequence[str] = ("class_type", "value"),
+            categories: str = "fixed",
+            dtype=np.float32):
+        self.features = features
+        self.categories = categories
+        self.dtype = dtype
+
+    def fit(self, X: Union[GraphBatch, List[Node]], y=None):
+        """
+        Determine the categories and the encoding of each node type code.
+        """
+        for attribute in ("codes_", "n_samples_seen_"):
+            self.__dict__.pop(attribute, None)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X: Union[GraphBatch, List[Node]], y=None):
+        """
+        Update the categories with those of a chunk of nodes. The result
+        of fitting chunk by chunk equals the fit on all nodes at once.
+        """
+        unknown = set(self.features) - set(self.FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown features {unknown}.")
+        if self.categories not in ("fixed", "auto"):
+            raise ValueError(f"Unknown categories '{self.categories}'.")
+
+        if self.categories == "fixed":
+            codes = np.arange(len(NODE_TYPES))
+        else:
+            codes = np.unique(_node_codes(X)[0])
+        self._set_codes(codes)
+        self.n_samples_seen_ = (
+            getattr(self, "n_samples_seen_", 0) + _n_samples(X, "n_nodes")
+        )
+        return self
+
+    def merge(self, other: "NodeFeaturizer") -> "NodeFeaturizer":
+        """
+        Merge the categories learned by another featurizer with the same
+        parameters into this one, e.g. of a parallel worker fitted on
+        another chunk.
+        """
+        _check_mergeable(self, other)
+        if hasattr(other, "codes_"):
+            self._set_codes(other.codes_)
+            self.n_samples_seen_ = (
+                getattr(self, "n_samples_seen_", 0) + other.n_samples_seen_
+            )
+        return self
+
+    def _set_codes(self, codes: np.ndarray):
+        """
+        Add codes to the known node type codes and rebuild the encoding.
+        """
+        if hasattr(self, "codes_"):
+            codes = np.union1d(self.codes_, codes)
+        self.codes_ = codes
+
+        node_types = [
+            (
+                NODE_TYPES[code][0].__name__,
+                None if NODE_TYPES[code][1] is None else NODE_TYPES[code][1].value
+            )
+            for code in self.codes_
+        ]
+        self.classes_ = sorted({c for c, _ in node_types})
+        # Missing types are ordered last, like by OneHotEncoder
+        types = {t for _, t in node_types}
+        self.types_ = sorted(types - {None}) + ([None] if None in types else [])
+        self.labels_ = sorted({f"{c}_{t or 'none'}" for c, t in node_types})
+
+        n_codes = len(NODE_TYPES)
+        self.class_type_table_ = np.zeros(
+            (n_codes, len(self.classes_) + len(self.types_))
+        )
+        self.label_table_ = np.zeros(n_codes)
+        for code, (c, t) in zip(self.codes_, node_types):
+            self.class_type_table_[code, self.classes_.index(c)] = 1
+            self.class_type_table_[
+                code, len(self.classes_) + self.types_.index(t)
+            ] = 1
+            self.label_table_[code] = self.labels_.index(f"{c}_{t or 'none'}")
+
+        widths = {
+            "class_type": self.class_type_table_.shape[1],
+            "class_type_label": 1,
+            "inverse_value": 1,
+            "value": 1,
+        }
+        self.n_features_out_ = sum(widths[feature] for feature in self.features)
+
+    def transform(self, X: Union[GraphBatch, List[Node]]) -> np.ndarray:
+        """
+        Compute the features of the nodes.
+        """
+        node_type, value = _node_codes(X)
+        check_known(node_type, self.codes_)
+
+        return encode_nodes(
+            node_type,
+            value,
+            self.features,
+            self.class_type_table_,
+            self.label_table_,
+            dtype=self.dtype
+        )
+
+
+class EdgeFeaturizer(BaseEstimator, TransformerMixin):
+    """
+    Fast replacement of the edge_features pipeline, one hot encoding the
+    relationship class. The vocabulary is given by
+    `arigin.graph.compact.EDGE_TYPES`, see `NodeFeaturizer` for the
+    categories.
+    """
+
+    def __init__(self, categories: str = "fixed", dtype=np.float32):
+        self.categories = categories
+        self.dtype = dtype
+
+    def fit(self, X: Union[GraphBatch, List[Relationship]], y=None):
+        """
+        Determine the categories and the encoding of each edge type code.
+        """
+        for attribute in ("codes_", "n_samples_seen_"):
+            self.__dict__.pop(attribute, None)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X: Union[GraphBatch, List[Relationship]], y=None):
+        """
+        Update the categories with those of a chunk of relationships, see
+        `NodeFeaturizer.partial_fit`.
+        """
+        if self.categories not in ("fixed", "auto"):
+            raise ValueError(f"Unknown categories '{self.categories}'.")
+
+        if self.categories == "fixed":
+            codes = np.arange(len(EDGE_TYPES))
+        else:
+            codes = np.unique(_edge_codes(X))
+        self._set_codes(codes)
+        self.n_samples_seen_ = (
+            getattr(self, "n_samples_seen_", 0) + _n_samples(X, "n_edges")
+        )
+        return self
+
+    def merge(self, other: "EdgeFeaturizer") -> "EdgeFeaturizer":
+        """
+        Merge the categories learned by another featurizer, see
+        `NodeFeaturizer.merge`.
+        """
+        _check_mergeable(self, other)
+        if hasattr(other, "codes_"):
+            self._set_codes(other.codes_)
+            self.n_samples_seen_ = (
+                getattr(self, "n_samples_seen_", 0) + other.n_samples_seen_
+            )
+        return self
+
+    def _set_codes(self, codes: np.ndarray):
+        if hasattr(self, "codes_"):
+            codes = np.union1d(self.codes_, codes)
+        self.codes_ = codes
+
+        self.classes_ = sorted(EDGE_TYPES[code].__name__ for code in self.codes_)
+        self.class_table_ = np.zeros((len(EDGE_TYPES), len(self.classes_)))
+        for code in self.codes_:
+            self.class_table_[code, self.classes_.index(EDGE_TYPES[code].__name__)] = 1
+        self.n_features_out_ = len(self.classes_)
+
+    def transform(self, X: Union[GraphBatch, List[Relationship]]) -> np.ndarray:
+        """
+        Compute the features of the relationships.
+        """
+        edge_type = _edge_codes(X)
+        check_known(edge_type, self.codes_)
+
+        return self.class_table_[edge_type].astype(self.dtype)
+
+
+fast_node_features = NodeFeaturizer(features=("class_type", "value"))
+
+fast_node_features_emb = NodeFeaturizer(features=("class_type_label",))
+
+fast_node_features_values = NodeFeaturizer(features=("inverse_value", "value"))
+
+fast_edge_features = EdgeFeaturizer()
@@ -0,0 +1,231 @@
+import warnings
+import collections
+from typing import Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from arigin.graph.compact import GraphBatch
+from arigin.graph.evaluation import evaluate
+from arigin.graph.parsing import Reduction, parse
+
+EVICTION_POLICIES = ("lru", "fifo")
+
+
+def graph_key(graph: GraphBatch) -> Tuple[Hashable, ...]:
+    """
+    Get a key identifying the expression tree of a single compact graph,
+    i.e. its node types, values and edges.
+    """
+    return (
+        graph.node_type.tobytes(),
+        graph.value.tobytes(),
+        graph.edge_index.tobytes(),
+    )
+
+
+def canonical_key(reductions: List[Reduction]) -> Tuple[Hashable, ...]:
+    """
+    Get a key identifying the expression tree given by its reductions, the
+    key of its graph, see `graph_key`. Number operands are compared by
+    value, e.g. '0.50' and '0.5', and redundant parentheses do not change
+    the reductions, hence expressions with identical trees share the key.
+    """
+    return graph_key(GraphBatch.from_reductions(reductions))
+
+
+class CachedGraph(NamedTuple):
+    """
+    Compact graph of an expression and its result, None if the expression
+    divides by zero.
+    """
+    graph: GraphBatch
+    result: Optional[float]
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class GraphCache:
+    """
+    Cache of compact graphs and results of expressions keyed by their
+    canonical tree, see `canonical_key`.
+
+    Besides saving the parsing, graph building and evaluation of repeated
+    expressions, the cache tracks which trees have been seen, e.g. to
+    deduplicate a dataset or to exclude the training expressions from
+    validation data, see `deduplicate`. Deduplication requires an unbounded
+    cache, since evicted trees would pass again.
+
+    :param maxsize: Maximum number of cached graphs. If None, the cache is
+                    unbounded.
+    :type maxsize: Optional[int]
+    :param eviction: Which graph is evicted when the cache is full, "lru"
+                     for the least recently used or "fifo" for the oldest.
+    :type eviction: str
+
+    :example:
+
+        >>> cache = GraphCache(maxsize=10000)
+        >>> graph, result = cache.get("0.5 * ( 0.25 + 0.125 )")
+        >>> cache.cache_info()
+        CacheInfo(hits=0, misses=1, evictions=0, maxsize=10000, currsize=1)
+    """
+
+    def __init__(self, maxsize: Optional[int] = 100000, eviction: str = "lru"):
+
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction '{eviction}', expected one of "
+                f"{EVICTION_POLICIES}."
+            )
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        # Canonical keys of expression strings, so repeated strings are
+        # looked up without parsing
+        self._keys: collections.OrderedDict = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, expression: str) -> bool:
+        key = self._keys.get(expression)
+        if key is None:
+            key = self._add_key(expression, canonical_key(parse(expression)))
+        return key in self._entries
+
+    def _add_key(self, expression: str, key: Tuple[Hashable, ...]) -> Tuple[Hashable, ...]:
+        self._keys[expression] = key
+        if self.maxsize is not None and len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+        return key
+
+    def contains_reductions(self, reductions: List[Reduction]) -> bool:
+        """
+        Check whether the tree is cached, without counting a hit or miss.
+        """
+        return canonical_key(reductions) in self._entries
+
+    def get(self, expression: str) -> CachedGraph:
+        """
+        Get the compact graph and result of an expression, building and
+        evaluating it on a miss. Expression strings seen before are not
+        parsed again.
+        """
+        key = self._keys.get(expression)
+        if key is not None and key in self._entries:
+            return self._hit(key)
+        graph = GraphBatch.from_reductions(parse(expression))
+        return self._get(self._add_key(expression, graph_key(graph)), graph)
+
+    def get_reductions(self, reductions: List[Reduction]) -> CachedGraph:
+        """
+        Get the compact graph and result of the tree given by its
+        reductions, building and evaluating it on a miss.
+        """
+
+        graph = GraphBatch.from_reductions(reductions)
+        return self._get(graph_key(graph), graph)
+
+    def _get(self, key: Tuple[Hashable, ...], graph: GraphBatch) -> CachedGraph:
+        if key in self._entries:
+            return self._hit(key)
+
+        self.misses += 1
+        evaluation = evaluate(graph)
+        if evaluation.no_operator[0]:
+            raise ValueError("Cannot evaluate an expression without operators.")
+        result = (
+            None if evaluation.zero_division[0] else float(evaluation.results[0])
+        )
+        entry = CachedGraph(graph, result)
+        self._insert(key, entry)
+        return entry
+
+    def _hit(self, key: Tuple[Hashable, ...]) -> CachedGraph:
+        self.hits += 1
+        if self.eviction == "lru":
+            self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def insert(
+            self,
+            graph: GraphBatch,
+            result: Optional[float]) -> Optional[CachedGraph]:
+        """
+        Add the compact graph of a tree, whose result is known already, e.g.
+        generated by `arigin.graph.generation.generate_graphs`, if it is not
+        cached yet. The result is not evaluated again.
+
+        :returns: The cached graph and result, None if the tree was cached
+                  before.
+        :rtype: Optional[CachedGraph]
+        """
+
+        key = graph_key(graph)
+        if key in self._entries:
+            self._hit(key)
+            return None
+
+        self.misses += 1
+        entry = CachedGraph(graph, result)
+        self._insert(key, entry)
+        return entry
+
+    def _insert(self, key: Tuple[Hashable, ...], entry: CachedGraph):
+        self._entries[key] = entry
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def add_reductions(self, reductions: List[Reduction]) -> bool:
+        """
+        Add a tree to the cache, if it is not cached yet.
+
+        :returns: True, if the tree was not cached before.
+        :rtype: bool
+        """
+        misses = self.misses
+        self.get_reductions(reductions)
+        return self.misses > misses
+
+    def deduplicate(self, expressions: Iterable[str]) -> Iterator[str]:
+        """
+        Lazily filter expressions, whose tree is already cached or occurred
+        before in expressions. Passed expressions are added to the cache.
+        Trees evicted from a bounded cache may pass again, hence a warning
+        is emitted on the first eviction.
+        """
+        evictions = self.evictions
+        warned = False
+        for expression in expressions:
+            misses = self.misses
+            self.get(expression)
+            if not warned and self.evictions > evictions:
+                warnings.warn(
+                    "Trees were evicted from the cache during "
+                    "deduplication, duplicates may pass. Use "
+                    "GraphCache(maxsize=None).",
+                    RuntimeWarning,
+                    stacklevel=2
+                )
+                warned = True
+            if self.misses > misses:
+                yield expression
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(
+            self.hits, self.misses, self.evictions, self.maxsize, len(self)
+        )
+
+    def cache_clear(self):
+        self._entries.clear()
+        self._keys.clear()
+        self.hits = self.misses = self.evictions = 0
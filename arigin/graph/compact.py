@@ -0,0 +1,661 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple, Type
+
+from arigin.expressions import (
+    OPERATORS,
+    TokenBatch,
+    NUMBER_TOKEN,
+    OPERATOR_TOKEN,
+    OPEN_PARENTHESIS_TOKEN,
+    CLOSE_PARENTHESIS_TOKEN,
+)
+from arigin.graph import elements
+from arigin.graph.elements import OperatorType
+from arigin.graph.parsing import MULTIPLICATIVE_OPERATORS, Reduction
+
+
+# Vocabulary of node types, the position in the list is the node type code
+NODE_TYPES: List[Tuple[Type[elements.Node], Optional[OperatorType]]] = [
+    (elements.LeftOperand, None),
+    (elements.RightOperand, None),
+    (elements.Operator, OperatorType.MULTIPLICATION),
+    (elements.Operator, OperatorType.DIVISION),
+    (elements.Operator, OperatorType.ADDITION),
+    (elements.Operator, OperatorType.SUBTRACTION),
+]
+
+# Vocabulary of edge types, the position in the list is the edge type code
+EDGE_TYPES: List[Type[elements.Relationship]] = [
+    elements.IsLeftOperantOf,
+    elements.IsRightOperantOf,
+]
+
+LEFT_OPERAND = NODE_TYPES.index((elements.LeftOperand, None))
+RIGHT_OPERAND = NODE_TYPES.index((elements.RightOperand, None))
+OPERATOR_CODES = {
+    operator_type.value: NODE_TYPES.index((elements.Operator, operator_type))
+    for operator_type in OperatorType
+}
+IS_LEFT_OPERANT_OF = EDGE_TYPES.index(elements.IsLeftOperantOf)
+IS_RIGHT_OPERANT_OF = EDGE_TYPES.index(elements.IsRightOperantOf)
+
+
+@dataclass
+class GraphBatch:
+    """
+    Columnar representation of one or multiple graphs.
+
+    Nodes of all graphs are stored consecutively, graph i owns the nodes
+    node_offsets[i]:node_offsets[i + 1] and the edges
+    edge_offsets[i]:edge_offsets[i + 1]. Edges refer to the position of
+    nodes within the whole batch.
+
+    :param node_type: Node type codes, i.e. positions in NODE_TYPES.
+    :type node_type: np.ndarray[int32], shape (n_nodes,)
+    :param value: Values of the nodes, NaN for operators.
+    :type value: np.ndarray[float64], shape (n_nodes,)
+    :param edge_index: Source (first row) and target (second row) node of
+                       each edge.
+    :type edge_index: np.ndarray[int64], shape (2, n_edges)
+    :param edge_type: Edge type codes, i.e. positions in EDGE_TYPES.
+    :type edge_type: np.ndarray[int32], shape (n_edges,)
+    :param node_offsets: Start of the nodes of each graph.
+    :type node_offsets: np.ndarray[int64], shape (n_graphs + 1,)
+    :param edge_offsets: Start of the edges of each graph.
+    :type edge_offsets: np.ndarray[int64], shape (n_graphs + 1,)
+    :param depth: Distance of each node from the root of its graph.
+    :type depth: np.ndarray[int32], shape (n_nodes,)
+    :param topo_rank: Height of the subtree of each node, i.e. 0 for
+                      numbers and 1 + the maximum rank of the operands for
+                      operators. Nodes of equal rank do not depend on each
+                      other, so a tree can be evaluated rank by rank.
+    :type topo_rank: np.ndarray[int32], shape (n_nodes,)
+    """
+    node_type: np.ndarray
+    value: np.ndarray
+    edge_index: np.ndarray
+    edge_type: np.ndarray
+    node_offsets: np.ndarray
+    edge_offsets: np.ndarray
+    depth: np.ndarray
+    topo_rank: np.ndarray
+
+    @property
+    def n_graphs(self) -> int:
+        return len(self.node_offsets) - 1
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_type)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.edge_type)
+
+    @property
+    def batch(self) -> np.ndarray:
+        """
+        Graph index of each node.
+        """
+        return np.repeat(
+            np.arange(self.n_graphs, dtype=np.int64),
+            np.diff(self.node_offsets)
+        )
+
+    @property
+    def root_index(self) -> np.ndarray:
+        """
+        Index of the root operator of each graph, which is its last node,
+        -1 for graphs without nodes.
+        """
+        return np.where(
+            np.diff(self.node_offsets) > 0, self.node_offsets[1:] - 1, -1
+        )
+
+    def __len__(self) -> int:
+        return self.n_graphs
+
+    def __getitem__(self, index: int) -> "GraphBatch":
+        """
+        Select a single graph as GraphBatch.
+        """
+        if index < 0:
+            index += self.n_graphs
+        if not 0 <= index < self.n_graphs:
+            raise IndexError("Graph index out of range.")
+
+        node_start, node_end = self.node_offsets[index:index + 2]
+        edge_start, edge_end = self.edge_offsets[index:index + 2]
+        return GraphBatch(
+            node_type=self.node_type[node_start:node_end],
+            value=self.value[node_start:node_end],
+            edge_index=self.edge_index[:, edge_start:edge_end] - node_start,
+            edge_type=self.edge_type[edge_start:edge_end],
+            node_offsets=np.array([0, node_end - node_start], dtype=np.int64),
+            edge_offsets=np.array([0, edge_end - edge_start], dtype=np.int64),
+            depth=self.depth[node_start:node_end],
+            topo_rank=self.topo_rank[node_start:node_end],
+        )
+
+    def take(self, indices: np.ndarray) -> "GraphBatch":
+        """
+        Select multiple graphs as GraphBatch, e.g. by the indices of the
+        valid graphs.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        node_counts = np.diff(self.node_offsets)[indices]
+        edge_counts = np.diff(self.edge_offsets)[indices]
+        node_offsets = np.concatenate([[0], np.cumsum(node_counts)]).astype(np.int64)
+        edge_offsets = np.concatenate([[0], np.cumsum(edge_counts)]).astype(np.int64)
+        nodes = _ranges(self.node_offsets[indices], node_counts)
+        edges = _ranges(self.edge_offsets[indices], edge_counts)
+        node_shift = np.repeat(
+            self.node_offsets[indices] - node_offsets[:-1], edge_counts
+        )
+        return GraphBatch(
+            node_type=self.node_type[nodes],
+            value=self.value[nodes],
+            edge_index=self.edge_index[:, edges] - node_shift,
+            edge_type=self.edge_type[edges],
+            node_offsets=node_offsets,
+            edge_offsets=edge_offsets,
+            depth=self.depth[nodes],
+            topo_rank=self.topo_rank[nodes],
+        )
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["GraphBatch"]) -> "GraphBatch":
+        """
+        Concatenate multiple batches into a single one.
+        """
+        node_shift = np.cumsum([0] + [b.n_nodes for b in batches])
+        edge_shift = np.cumsum([0] + [b.n_edges for b in batches])
+
+        return cls(
+            node_type=np.concatenate(
+                [np.empty(0, dtype=np.int32)] + [b.node_type for b in batches]
+            ).astype(np.int32),
+            value=np.concatenate(
+                [np.empty(0)] + [b.value for b in batches]
+            ).astype(np.float64),
+            edge_index=np.concatenate(
+                [np.empty((2, 0), dtype=np.int64)] +
+                [b.edge_index + s for b, s in zip(batches, node_shift)],
+                axis=1
+            ),
+            edge_type=np.concatenate(
+                [np.empty(0, dtype=np.int32)] + [b.edge_type for b in batches]
+            ).astype(np.int32),
+            node_offsets=np.concatenate(
+                [[0]] + [b.node_offsets[1:] + s for b, s in zip(batches, node_shift)]
+            ).astype(np.int64),
+            edge_offsets=np.concatenate(
+                [[0]] + [b.edge_offsets[1:] + s for b, s in zip(batches, edge_shift)]
+            ).astype(np.int64),
+            depth=np.concatenate(
+                [np.empty(0, dtype=np.int32)] + [b.depth for b in batches]
+            ).astype(np.int32),
+            topo_rank=np.concatenate(
+                [np.empty(0, dtype=np.int32)] + [b.topo_rank for b in batches]
+            ).astype(np.int32),
+        )
+
+    @classmethod
+    def from_reductions(cls, reductions: List[Reduction]) -> "GraphBatch":
+        """
+        Build a single graph from primitive reductions as returned by
+        `arigin.graph.parsing.parse`.
+        """
+        builder = GraphBatchBuilder()
+        builder.add(reductions)
+        return builder.build()
+
+    @classmethod
+    def from_token_batch(cls, token_batch: TokenBatch) -> "GraphBatch":
+        """
+        Build one graph per expression of a batch of token arrays as
+        returned by `arigin.expressions.generate_batch`. The graphs are
+        identical to parsing each expression, see `from_reductions`, but
+        groups, operator precedence and operands of all expressions are
+        resolved by array operations on the token codes, without a loop
+        over the expressions.
+        """
+        rows, operator_codes, left, right, left_value, right_value = (
+            _reductions_of_token_batch(token_batch)
+        )
+        n_rows = len(token_batch.lengths)
+
+        # Each reduction creates its left and right number node, if the
+        # operand is a number, followed by the operator node
+        left_number = left < 0
+        right_number = right < 0
+        n_created = 1 + left_number.astype(np.int64) + right_number
+        start = np.cumsum(n_created) - n_created
+        operator = start + left_number + right_number
+        n_nodes = int(n_created.sum())
+
+        left_node = np.where(left_number, start, operator[np.maximum(left, 0)])
+        right_node = np.where(
+            right_number, start + left_number, operator[np.maximum(right, 0)]
+        )
+
+        node_type = np.empty(n_nodes, dtype=np.int32)
+        value = np.full(n_nodes, np.nan)
+        node_type[operator] = operator_codes
+        node_type[left_node[left_number]] = LEFT_OPERAND
+        node_type[right_node[right_number]] = RIGHT_OPERAND
+        value[left_node[left_number]] = left_value[left_number]
+        value[right_node[right_number]] = right_value[right_number]
+
+        # Reductions of an expression are ordered innermost first, so the
+        # k-th reductions of all expressions are processed at once
+        first = np.searchsorted(rows, rows)
+        position = np.arange(len(rows)) - first
+        topo_rank = np.zeros(n_nodes, dtype=np.int32)
+        depth = np.zeros(n_nodes, dtype=np.int32)
+        steps = [position == k for k in range(position.max(initial=-1) + 1)]
+        for step in steps:
+            topo_rank[operator[step]] = 1 + np.maximum(
+                topo_rank[left_node[step]], topo_rank[right_node[step]]
+            )
+        for step in reversed(steps):
+            depth[left_node[step]] = depth[right_node[step]] = (
+                depth[operator[step]] + 1
+            )
+
+        n_reductions = np.bincount(rows, minlength=n_rows)
+        return cls(
+            node_type=node_type,
+            value=value,
+            edge_index=np.stack([
+                np.stack([left_node, right_node], axis=1).ravel(),
+                np.repeat(operator, 2)
+            ]).astype(np.int64),
+            edge_type=np.tile(
+                np.array([IS_LEFT_OPERANT_OF, IS_RIGHT_OPERANT_OF], dtype=np.int32),
+                len(rows)
+            ),
+            node_offsets=np.concatenate(
+                [[0], np.cumsum(np.bincount(rows, n_created, minlength=n_rows))]
+            ).astype(np.int64),
+            edge_offsets=np.concatenate(
+                [[0], np.cumsum(2 * n_reductions)]
+            ).astype(np.int64),
+            depth=depth,
+            topo_rank=topo_rank,
+        )
+
+    @classmethod
+    def from_entities(cls, graph_entities: elements.GraphEntities) -> "GraphBatch":
+        """
+        Convert graph entities into a GraphBatch. If graph_entities contain
+        "batch", the graphs are separated accordingly, otherwise all nodes
+        are considered as a single graph.
+
+        :raises ValueError: If nodes or relationships are not ordered by
+                            graph or a node type is not part of NODE_TYPES.
+        """
+        nodes = graph_entities["nodes"]
+        relationships = graph_entities["relationships"]
+        id_to_index = elements.node_id_to_index(nodes)
+        node_codes = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+        edge_codes = {edge_type: code for code, edge_type in enumerate(EDGE_TYPES)}
+
+        try:
+            node_type = np.array(
+                [node_codes[(node.__class__, node.type)] for node in nodes],
+                dtype=np.int32
+            )
+            edge_type = np.array(
+                [edge_codes[r.__class__] for r in relationships],
+                dtype=np.int32
+            )
+        except KeyError as error:
+            raise ValueError(f"Unsupported graph element {error}.") from error
+
+        value = np.array(
+            [np.nan if node.value is None else node.value for node in nodes],
+            dtype=np.float64
+        )
+        edge_index = np.array(
+            [
+                [id_to_index[r.source.id] for r in relationships],
+                [id_to_index[r.target.id] for r in relationships]
+            ],
+            dtype=np.int64
+        ).reshape(2, -1)
+
+        if "batch" in graph_entities:
+            batch = np.asarray(graph_entities["batch"], dtype=np.int64)
+            n_graphs = int(batch.max()) + 1 if len(batch) else 0
+        else:
+            batch = np.zeros(len(nodes), dtype=np.int64)
+            n_graphs = 1
+        edge_batch = batch[edge_index[1]]
+        if np.any(np.diff(batch) < 0) or np.any(np.diff(edge_batch) < 0):
+            raise ValueError("Graph entities must be ordered by graph.")
+
+        graphs = np.arange(n_graphs + 1)
+        depth, topo_rank = tree_order(edge_index, len(nodes))
+        return cls(
+            node_type=node_type,
+            value=value,
+            edge_index=edge_index,
+            edge_type=edge_type,
+            node_offsets=np.searchsorted(batch, graphs).astype(np.int64),
+            edge_offsets=np.searchsorted(edge_batch, graphs).astype(np.int64),
+            depth=depth,
+            topo_rank=topo_rank,
+        )
+
+    def to_entities(self) -> elements.GraphEntities:
+        """
+        Convert into pydantic graph entities including "batch", e.g. for
+        debugging or visualization. Node ids are newly created and the
+        expression of numbers is the representation of their value.
+        """
+        nodes = []
+        for code, value in zip(self.node_type.tolist(), self.value.tolist()):
+            node_class, operator_type = NODE_TYPES[code]
+            if operator_type is None:
+                nodes.append(node_class(expression=repr(value), value=value))
+            else:
+                nodes.append(
+                    node_class(
+                        expression=operator_type.value, type=operator_type
+                    )
+                )
+
+        relationships = [
+            EDGE_TYPES[code](source=nodes[source], target=nodes[target])
+            for code, source, target in zip(
+                self.edge_type.tolist(), *self.edge_index.tolist()
+            )
+        ]
+
+        return elements.GraphEntities(
+            nodes=nodes,
+            relationships=relationships,
+            batch=self.batch.tolist()
+        )
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Concatenate the ranges start:start + count.
+    """
+    return np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(
+        counts.sum()
+    )
+
+
+def _reductions_of_token_batch(token_batch: TokenBatch) -> Tuple[np.ndarray, ...]:
+    """
+    Get the primitive reductions of all expressions of a token batch in the
+    order of `arigin.graph.parsing.reductions_from_tokens`, i.e. sorted by
+    expression, by the closing position of their group, multiplicative
+    before additive operators and from left to right.
+
+    :returns: Expression, operator node type code, left and right operand
+              of each reduction. An operand refers to the position of an
+              earlier reduction, whose result it is, or is -1 for a number,
+              whose value is returned separately.
+    :rtype: Tuple[np.ndarray, ...]
+    """
+
+    n_rows, length = token_batch.codes.shape
+    lengths = np.asarray(token_batch.lengths, dtype=np.int64)
+    inside = np.arange(length) < lengths[:, np.newaxis]
+    codes = token_batch.codes[inside].astype(np.int64)
+    values = token_batch.values[inside]
+    n_tokens = len(codes)
+    row = np.repeat(np.arange(n_rows), lengths)
+    starts = np.cumsum(lengths) - lengths
+    column = np.arange(n_tokens) - starts[row]
+    is_operator = (codes >= OPERATOR_TOKEN) & (codes < OPEN_PARENTHESIS_TOKEN)
+    is_open = codes == OPEN_PARENTHESIS_TOKEN
+    is_close = codes == CLOSE_PARENTHESIS_TOKEN
+
+    # Nesting depth after each token and level of the group each token
+    # belongs to: '(' is an operand of the enclosing group, ')' ends the
+    # group it closes. Parentheses of each expression are balanced, so the
+    # depth is 0 at the start of each expression.
+    depth = np.cumsum(is_open.astype(np.int64) - is_close)
+    level = depth - is_open + is_close
+
+    # The group of a token at level k is opened by the last '(' at depth k
+    # before it. Sorting the tokens and the '(' opening groups by
+    # expression, level and column, this '(' is the last one before the
+    # token within its segment.
+    opens = np.flatnonzero(is_open)
+    entry_token = np.concatenate([np.arange(n_tokens), opens])
+    entry_level = np.concatenate([level, depth[opens]])
+    is_opening = np.arange(len(entry_token)) >= n_tokens
+    n_levels = int(entry_level.max(initial=0)) + 1
+    order = np.argsort(
+        (row[entry_token] * n_levels + entry_level) * length + column[entry_token],
+        kind="stable"
+    )
+    latest = np.maximum.accumulate(
+        np.where(is_opening[order], np.arange(len(order)), -1)
+    )
+    source = order[np.maximum(latest, 0)]
+    in_segment = (
+        (latest >= 0) &
+        (row[entry_token[source]] == row[entry_token[order]]) &
+        (entry_level[source] == entry_level[order])
+    )
+
+    # Groups are numbered like the tokens with an extra slot for the top
+    # level group in front of each expression, i.e. a group opened by '('
+    # has the number of the '(' shifted by its expression
+    top_level = starts + np.arange(n_rows)
+    queries = ~is_opening[order]
+    group = np.empty(n_tokens, dtype=np.int64)
+    group[order[queries]] = np.where(
+        in_segment,
+        entry_token[source] + row[entry_token[source]] + 1,
+        top_level[row[entry_token[order]]]
+    )[queries]
+    close = np.empty(n_tokens + n_rows, dtype=np.int64)
+    close[top_level] = lengths
+    close[group[is_close]] = column[is_close]
+
+    # Operands and operators of each group alternate in order of columns
+    members = np.flatnonzero(~is_close)
+    members = members[np.argsort(group[members], kind="stable")]
+    slots = np.flatnonzero(is_operator[members])
+    operator = members[slots]
+    before, after = members[slots - 1], members[slots + 1]
+    operator_group = group[operator]
+    is_multiplicative = np.isin(
+        codes[operator],
+        [OPERATOR_TOKEN + OPERATORS.index(o) for o in MULTIPLICATIVE_OPERATORS]
+    )
+
+    n_operators = len(operator)
+    index = np.arange(n_operators)
+    same_previous = np.zeros(n_operators, dtype=bool)
+    same_previous[1:] = operator_group[1:] == operator_group[:-1]
+    same_next = np.zeros(n_operators, dtype=bool)
+    same_next[:-1] = same_previous[1:]
+    previous = np.maximum(index - 1, 0)
+    following = np.minimum(index + 1, max(n_operators - 1, 0))
+
+    # Last multiplicative operator of the run starting at each operator
+    run_continues = same_next & is_multiplicative[following]
+    run_end = np.minimum.accumulate(
+        np.where(run_continues, n_operators, index)[::-1]
+    )[::-1]
+    # Last additive operator up to each operator within its group
+    last_additive = np.maximum.accumulate(np.where(is_multiplicative, -1, index))
+    last_additive = np.where(
+        (last_additive >= 0) &
+        (operator_group[np.maximum(last_additive, 0)] == operator_group),
+        last_additive, -1
+    )
+
+    # Operands are tokens: a number, an operator standing for its result or
+    # a '(' standing for the result of its group. Like in
+    # `arigin.graph.parsing._reduce_group`, a multiplicative operator
+    # continues the preceding run of multiplicative operators, an additive
+    # one the preceding additive operator or the preceding term.
+    previous_additive = np.where(same_previous, last_additive[previous], -1)
+    left_operator = np.where(
+        is_multiplicative,
+        np.where(same_previous & is_multiplicative[previous], previous, -1),
+        np.where(
+            previous_additive >= 0, previous_additive,
+            np.where(same_previous, previous, -1)
+        )
+    )
+    left = np.where(left_operator >= 0, operator[np.maximum(left_operator, 0)], before)
+    right = np.where(
+        ~is_multiplicative & same_next & is_multiplicative[following],
+        operator[run_end[following]],
+        after
+    )
+
+    # The result of a group is its last additive operator, else its last
+    # operator, else its single operand
+    result = np.zeros(n_tokens + n_rows, dtype=np.int64)
+    result[group[members]] = members
+    last = ~same_next
+    result[operator_group[last]] = operator[
+        np.where(last_additive[last] >= 0, last_additive[last], index[last])
+    ]
+    operand = np.concatenate([left, right])
+    nested = np.flatnonzero(is_open[operand])
+    while len(nested):
+        # The group of a '(' may consist of a single '(' again
+        opening = operand[nested]
+        operand[nested] = result[opening + row[opening] + 1]
+        nested = nested[is_open[operand[nested]]]
+    left, right = np.split(operand, 2)
+
+    # Groups are reduced when closed, multiplicative operators first
+    rows = row[operator]
+    order = np.argsort(
+        ((rows * (length + 1) + close[operator_group]) * 2 + ~is_multiplicative)
+        * length + column[operator],
+        kind="stable"
+    )
+    operator, left, right, rows = operator[order], left[order], right[order], rows[order]
+
+    reduction = np.full(n_tokens, -1)
+    reduction[operator] = np.arange(n_operators)
+    node_codes = np.array([OPERATOR_CODES[o] for o in OPERATORS], dtype=np.int32)
+    left_number = codes[left] == NUMBER_TOKEN
+    right_number = codes[right] == NUMBER_TOKEN
+    return (
+        rows,
+        node_codes[codes[operator] - OPERATOR_TOKEN],
+        np.where(left_number, -1, reduction[left]),
+        np.where(right_number, -1, reduction[right]),
+        values[left],
+        values[right],
+    )
+
+
+def tree_order(edge_index: np.ndarray, n_nodes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute depth and topological rank of the nodes of trees given by
+    their edges from operands to operators, see GraphBatch. Operands must
+    precede their operators, like in graphs built from reductions.
+
+    :returns: Depth and topological rank of each node.
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+
+    depth = np.zeros(n_nodes, dtype=np.int32)
+    topo_rank = np.zeros(n_nodes, dtype=np.int32)
+    order = np.argsort(edge_index[1], kind="stable")
+    sources, targets = edge_index[:, order].tolist()
+
+    for source, target in zip(sources, targets):
+        topo_rank[target] = max(topo_rank[target], topo_rank[source] + 1)
+    # Operators are visited before their operands
+    for source, target in zip(reversed(sources), reversed(targets)):
+        depth[source] = depth[target] + 1
+
+    return depth, topo_rank
+
+
+class GraphBatchBuilder:
+    """
+    Accumulate graphs from primitive reductions in plain lists and build a
+    GraphBatch from them at once, without creating any pydantic models.
+    """
+
+    def __init__(self):
+        self.node_type = []
+        self.value = []
+        self.sources = []
+        self.targets = []
+        self.edge_type = []
+        self.node_offsets = [0]
+        self.edge_offsets = [0]
+        self.depth = []
+        self.topo_rank = []
+
+    def __len__(self) -> int:
+        return len(self.node_offsets) - 1
+
+    def _operand(self, operand, code: int, operators: List[int]) -> int:
+        if isinstance(operand, int):
+            return operators[operand]
+        self.node_type.append(code)
+        self.value.append(float(operand))
+        self.topo_rank.append(0)
+        return len(self.node_type) - 1
+
+    def add(self, reductions: Iterable[Reduction]):
+        """
+        Add a graph given by its primitive reductions. Nodes are created in
+        the same order as by `arigin.graph.generation.graph_from_reductions`.
+        Reductions are ordered innermost first, so the topological rank of
+        an operator is known once its operands are, and the depth follows
+        in a single pass over the reductions in reverse order.
+        """
+        operators = []
+        operands = []
+        for reduction in reductions:
+            left = self._operand(reduction.left, LEFT_OPERAND, operators)
+            right = self._operand(reduction.right, RIGHT_OPERAND, operators)
+            self.node_type.append(OPERATOR_CODES[reduction.operator])
+            self.value.append(np.nan)
+            self.topo_rank.append(
+                1 + max(self.topo_rank[left], self.topo_rank[right])
+            )
+            operator = len(self.node_type) - 1
+            operators.append(operator)
+            operands.append((left, right))
+
+            self.sources += [left, right]
+            self.targets += [operator, operator]
+            self.edge_type += [IS_LEFT_OPERANT_OF, IS_RIGHT_OPERANT_OF]
+
+        first = self.node_offsets[-1]
+        depth = [0] * (len(self.node_type) - first)
+        for operator, (left, right) in zip(reversed(operators), reversed(operands)):
+            depth[left - first] = depth[right - first] = depth[operator - first] + 1
+        self.depth += depth
+
+        self.node_offsets.append(len(self.node_type))
+        self.edge_offsets.append(len(self.edge_type))
+        return self
+
+    def build(self) -> GraphBatch:
+        return GraphBatch(
+            node_type=np.array(self.node_type, dtype=np.int32),
+            value=np.array(self.value, dtype=np.float64),
+            edge_index=np.array(
+                [self.sources, self.targets], dtype=np.int64
+            ).reshape(2, -1),
+            edge_type=np.array(self.edge_type, dtype=np.int32),
+            node_offsets=np.array(self.node_offsets, dtype=np.int64),
+            edge_offsets=np.array(self.edge_offsets, dtype=np.int64),
+            depth=np.array(self.depth, dtype=np.int32),
+            topo_rank=np.array(self.topo_rank, dtype=np.int32),
+        )
@@ -1,8 +1,109 @@
 import random
-import pandas as pd
+import contextlib
+import contextvars
 from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Optional, Any, Union, List
+from typing import TYPE_CHECKING, Optional, Any, Union, List, Dict, Iterable, Iterator
+
+from arigin.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Node ids are either random hex strings or sequential integers
+NodeId = Union[int, str]
+
+# Generator of the random ids, independent of the global random state, so
+# creating nodes does not perturb the generation of expressions
+_id_random = random.Random()
+
+
+def random_id() -> str:
+    """
+    Create a random 128 bit id as hex string.
+    """
+    return "%032x" % _id_random.getrandbits(128)
+
+
+def reseed_random_ids():
+    """
+    Reseed the generator of random ids from system entropy, e.g. in forked
+    worker processes, which would create the same ids otherwise.
+    """
+    _id_random.seed()
+
+
+class SequentialIds:
+    """
+    Id strategy allocating sequential integer ids, counted separately for
+    nodes and relationships, such that the id of a node equals its position
+    in a list of all nodes created within the scope, see `sequential_ids`.
+    """
+
+    def __init__(self, start: int = 0):
+        self.next_node_id = start
+        self.next_relationship_id = start
+
+    def node_id(self) -> int:
+        node_id = self.next_node_id
+        self.next_node_id += 1
+        return node_id
+
+    def relationship_id(self) -> int:
+        relationship_id = self.next_relationship_id
+        self.next_relationship_id += 1
+        return relationship_id
+
+
+# Id strategy of the current context, None for random ids
+_id_strategy: contextvars.ContextVar[Optional[SequentialIds]] = (
+    contextvars.ContextVar("id_strategy", default=None)
+)
+
+
+@contextlib.contextmanager
+def id_scope(strategy: Optional[SequentialIds]) -> Iterator[Optional[SequentialIds]]:
+    """
+    Use the id strategy for all graph elements created within the context,
+    None for random ids.
+    """
+    token = _id_strategy.set(strategy)
+    try:
+        yield strategy
+    finally:
+        _id_strategy.reset(token)
+
+
+def sequential_ids(start: int = 0):
+    """
+    Create sequential integer ids within the context, e.g. for a single
+    graph or a batch of graphs. Ids are only unique within the scope.
+
+    :example:
+
+        >>> with sequential_ids():
+        ...     graph_entities = graph_from_expression("0.5 * 0.25")
+        >>> [node.id for node in graph_entities["nodes"]]
+        [0, 1, 2]
+    """
+    return id_scope(SequentialIds(start))
+
+
+def random_ids():
+    """
+    Create random hex string ids within the context (the default).
+    """
+    return id_scope(None)
+
+
+def _new_node_id() -> NodeId:
+    strategy = _id_strategy.get()
+    return random_id() if strategy is None else strategy.node_id()
+
+
+def _new_relationship_id() -> NodeId:
+    strategy = _id_strategy.get()
+    return random_id() if strategy is None else strategy.relationship_id()
 
 
 class OperatorType(str, Enum):
@@ -21,7 +122,7 @@ class AbstractModel(BaseModel):
     """
     Object acting as abstract base model for any graph element.
     """
-    id: str = Field(default_factory=lambda: "%032x" % random.getrandbits(128))
+    id: NodeId = Field(default_factory=_new_node_id)
 
 
 class Node(AbstractModel):
@@ -48,6 +149,7 @@ class Relationship(AbstractModel):
     """
     Object describing a relationship in a graph.
     """
+    id: NodeId = Field(default_factory=_new_relationship_id)
     source: Node
     target: Node
 
@@ -77,7 +179,6 @@ class Operator(Node):
     """
     Representation of arithmetic operator.
     """
-    id: str = Field(default_factory=lambda: "%032x" % random.getrandbits(128))
     type: OperatorType = Field(
         None, 
         description="Arithmetic operators can have different types."
@@ -102,10 +203,105 @@ class IsRightOperantOf(Relationship):
     target: Operator
 
 
-def node_by_id(nodes: List[Node], node_id: str):
+def _reindexing(method):
+    """
+    Wrap a list method such that the node index is rebuilt afterwards.
+    """
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._reindex()
+        return result
+    return wrapper
+
+
+class NodeList(list):
+    """
+    List of nodes keeping an index of node id to position in the list.
+
+    The index is updated whenever nodes are appended, so selecting nodes
+    by id is O(1) instead of scanning the list. Any other modification of
+    the list rebuilds the index. If the same id occurs multiple times, the
+    first node is indexed.
+    """
+
+    def __init__(self, nodes: Iterable[Node] = ()):
+        super().__init__()
+        self.id_to_index: Dict[NodeId, int] = {}
+        self.extend(nodes)
+
+    def _reindex(self):
+        self.id_to_index = {}
+        for index, node in enumerate(self):
+            self.id_to_index.setdefault(node.id, index)
+
+    def append(self, node: Node):
+        self.id_to_index.setdefault(node.id, len(self))
+        super().append(node)
+
+    def extend(self, nodes: Iterable[Node]):
+        for node in nodes:
+            self.append(node)
+
+    def __iadd__(self, nodes: Iterable[Node]):
+        self.extend(nodes)
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+    def by_id(self, node_id: NodeId) -> Optional[Node]:
+        """
+        Select node by id. Returns None if not found.
+        """
+        index = self.id_to_index.get(node_id)
+        if index is None:
+            return None
+        return self[index]
+
+    insert = _reindexing(list.insert)
+    pop = _reindexing(list.pop)
+    remove = _reindexing(list.remove)
+    clear = _reindexing(list.clear)
+    sort = _reindexing(list.sort)
+    reverse = _reindexing(list.reverse)
+    __setitem__ = _reindexing(list.__setitem__)
+    __delitem__ = _reindexing(list.__delitem__)
+    __imul__ = _reindexing(list.__imul__)
+
+
+class GraphEntities(dict):
+    """
+    Container for the nodes and relationships of one or multiple graphs,
+    accessible as dictionary with keys "nodes" and "relationships" (and
+    "batch" for multiple graphs). Nodes are always kept in a `NodeList`,
+    such that lookups by id do not need to scan the nodes.
+    """
+
+    def __init__(
+            self,
+            nodes: Iterable[Node] = (),
+            relationships: Iterable[Relationship] = (),
+            **kwargs):
+        super().__init__(
+            nodes=NodeList(nodes),
+            relationships=list(relationships),
+            **kwargs
+        )
+
+    def __setitem__(self, key, value):
+        if key == "nodes" and not isinstance(value, NodeList):
+            value = NodeList(value)
+        super().__setitem__(key, value)
+
+
+def node_by_id(nodes: List[Node], node_id: NodeId):
     """
     Select node from a list of nodes by id. Returns None if not found.
+    Uses the index of a `NodeList`, other lists are scanned.
     """
+    if isinstance(nodes, NodeList):
+        return nodes.by_id(node_id)
+
     result = [
         node for node in nodes if node.id == node_id
     ]
@@ -115,12 +311,25 @@ def node_by_id(nodes: List[Node], node_id: str):
         return None
 
 
+def node_id_to_index(nodes: List[Node]) -> Dict[NodeId, int]:
+    """
+    Get a dictionary mapping node ids to their index in the nodes list.
+    The index of a `NodeList` is returned as is, without rebuilding it.
+    """
+    if not isinstance(nodes, NodeList):
+        nodes = NodeList(nodes)
+    return nodes.id_to_index
+
+
+@profiled("elements.model_to_frame")
 def model_to_frame(model: Union[AbstractModel, List[AbstractModel]]):
     """
     Method to convert a (list of) model to a pandas.DataFrame including the
     actual class name and the model's attributes.
     """
 
+    import pandas as pd
+
     if not isinstance(model, list):
         model = [model]
 
@@ -129,7 +338,7 @@ def model_to_frame(model: Union[AbstractModel, List[AbstractModel]]):
     return df
 
 
-def join_categorical(df: pd.DataFrame, columns=list()):
+def join_categorical(df: "pd.DataFrame", columns=list()):
     """
     Join categorical columns and make one output column of it, while
     dropping the original ones.
@@ -141,7 +350,7 @@ def join_categorical(df: pd.DataFrame, columns=list()):
     return df
 
 
-def mask_result_values(df: pd.DataFrame):
+def mask_result_values(df: "pd.DataFrame"):
     """
     Mask any value column of a Result Node class.
     """
@@ -0,0 +1,151 @@
+import numpy as np
+from dataclasses import dataclass
+
+from arigin.expressions import OPERATORS
+from arigin.graph.parsing import OPERATIONS
+from arigin.graph.compact import (
+    GraphBatch,
+    OPERATOR_CODES,
+    IS_LEFT_OPERANT_OF,
+    IS_RIGHT_OPERANT_OF,
+)
+
+
+@dataclass
+class Evaluation:
+    """
+    Result of evaluating a GraphBatch.
+
+    :param node_values: Value of each node, i.e. the number of a number
+                        node and the intermediate result of an operator.
+    :type node_values: np.ndarray[float64], shape (n_nodes,)
+    :param results: Result of each graph, i.e. the value of its root
+                    operator. NaN for graphs without operators.
+    :type results: np.ndarray[float64], shape (n_graphs,)
+    :param node_zero_division: Operators dividing by zero.
+    :type node_zero_division: np.ndarray[bool], shape (n_nodes,)
+    :param node_overflow: Operators with finite operands, but a non finite
+                          result.
+    :type node_overflow: np.ndarray[bool], shape (n_nodes,)
+    :param zero_division: Graphs containing a division by zero.
+    :type zero_division: np.ndarray[bool], shape (n_graphs,)
+    :param overflow: Graphs containing an overflow.
+    :type overflow: np.ndarray[bool], shape (n_graphs,)
+    :param no_operator: Graphs without operators, which have no result.
+    :type no_operator: np.ndarray[bool], shape (n_graphs,)
+    """
+    node_values: np.ndarray
+    results: np.ndarray
+    node_zero_division: np.ndarray
+    node_overflow: np.ndarray
+    zero_division: np.ndarray
+    overflow: np.ndarray
+    no_operator: np.ndarray
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        Graphs with a result, evaluated without division by zero and
+        overflow.
+        """
+        return ~(self.zero_division | self.overflow | self.no_operator)
+
+
+def operand_indices(graph_batch: GraphBatch):
+    """
+    Get the index of the left and right operand node of each node, -1 for
+    nodes which are not operators.
+    """
+    left = np.full(graph_batch.n_nodes, -1, dtype=np.int64)
+    right = np.full(graph_batch.n_nodes, -1, dtype=np.int64)
+    sources, targets = graph_batch.edge_index
+    is_left = graph_batch.edge_type == IS_LEFT_OPERANT_OF
+    is_right = graph_batch.edge_type == IS_RIGHT_OPERANT_OF
+    left[targets[is_left]] = sources[is_left]
+    right[targets[is_right]] = sources[is_right]
+    return left, right
+
+
+def evaluation_order(graph_batch: GraphBatch) -> np.ndarray:
+    """
+    Get the evaluation step of each node, i.e. 0 for numbers and 1 + the
+    maximum step of its operands for operators. This is the topological
+    rank computed when the graphs are built, see `GraphBatch.topo_rank`,
+    not the distance from the root, see `GraphBatch.depth`.
+    """
+    return graph_batch.topo_rank.astype(np.int64)
+
+
+def evaluate(graph_batch: GraphBatch) -> Evaluation:
+    """
+    Evaluate all operators of all graphs in a batch.
+
+    Operators are processed level by level in topological order, all
+    operators of the same evaluation step, see `evaluation_order`, across
+    the whole batch in one vectorized numpy step. IEEE double arithmetic is applied to the same operands in
+    the same order as Python's eval, so results are bit for bit identical.
+    Divisions by zero and overflows do not raise, but are reported by
+    masks, the affected values are inf or NaN.
+
+    :param graph_batch: The graphs to be evaluated.
+    :type graph_batch: GraphBatch
+
+    :returns: Node values, graph results and masks of invalid operations.
+    :rtype: Evaluation
+
+    :example:
+
+        >>> evaluation = evaluate(graph_from_expression("1 / (2 - 2)", compact=True))
+        >>> evaluation.zero_division
+        array([ True])
+    """
+
+    values = graph_batch.value.astype(np.float64, copy=True)
+    node_type = graph_batch.node_type
+    zero_division = np.zeros(graph_batch.n_nodes, dtype=bool)
+    overflow = np.zeros(graph_batch.n_nodes, dtype=bool)
+
+    left, right = operand_indices(graph_batch)
+    step = evaluation_order(graph_batch)
+
+    order = np.argsort(step, kind="stable")
+    level_starts = np.searchsorted(step[order], np.arange(step.max(initial=0) + 2))
+
+    with np.errstate(all="ignore"):
+        for level in range(1, len(level_starts) - 1):
+            nodes = order[level_starts[level]:level_starts[level + 1]]
+            a = values[left[nodes]]
+            b = values[right[nodes]]
+            codes = node_type[nodes]
+
+            result = np.select(
+                [codes == OPERATOR_CODES[operator] for operator in OPERATORS],
+                [OPERATIONS[operator](a, b) for operator in OPERATORS]
+            )
+            is_division = codes == OPERATOR_CODES["/"]
+            zero_division[nodes] = is_division & (b == 0)
+            overflow[nodes] = (
+                np.isfinite(a) & np.isfinite(b) & ~np.isfinite(result) &
+                ~zero_division[nodes]
+            )
+            values[nodes] = result
+
+    has_operator = np.diff(graph_batch.node_offsets) > 0
+    roots = graph_batch.node_offsets[1:] - 1
+    results = np.full(graph_batch.n_graphs, np.nan)
+    results[has_operator] = values[roots[has_operator]]
+
+    batch = graph_batch.batch
+    return Evaluation(
+        node_values=values,
+        results=results,
+        node_zero_division=zero_division,
+        node_overflow=overflow,
+        zero_division=np.bincount(
+            batch, weights=zero_division, minlength=graph_batch.n_graphs
+        ) > 0,
+        overflow=np.bincount(
+            batch, weights=overflow, minlength=graph_batch.n_graphs
+        ) > 0,
+        no_operator=~has_operator,
+    )
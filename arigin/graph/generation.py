@@ -1,21 +1,36 @@
+import os
 import re
+import random
+import itertools
+import collections
 import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
 from tqdm import tqdm
-from typing import Dict, List, Union, Optional, Tuple
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from arigin.graph import elements
-from arigin.expressions import generate
-
-
-# Placeholder for storing graph entities, i.e. dictionary of nodes
+from arigin.graph.cache import GraphCache
+from arigin.graph.compact import GraphBatch
+from arigin.graph.evaluation import evaluate
+from arigin.graph.parsing import (
+    Reduction,
+    parse,
+    reductions_from_tokens,
+    tokens_from_entities,
+    evaluate_reductions,
+)
+from arigin.expressions import generate_batch, generate_entities
+from arigin.profiling import count, profiled
+
+
+# Container for storing graph entities, i.e. dictionary of nodes
 # and relationships
-GraphEntities = Dict[
-    str, 
-    List[Union[elements.Node, elements.Relationship]]
-    ]
+GraphEntities = elements.GraphEntities
 
 
 MATCH_PATTERN = r"\w*\.?\w*"
 
+ENGINES = ("parser", "regex")
+
 
 def extract_first_pattern(pattern: str, expression: str) -> Optional[str]:
     """
@@ -154,7 +169,10 @@ def graph_elements_from_primitive_expression(
         )
         nodes.append(right)
     
+    # The operator id is substituted into the expression, hence it must be
+    # a random alphanumeric string independent of the current id strategy
     operator = elements.Operator(
+        id=elements.random_id(),
         expression=elements_list[1],
         type=elements_list[1]
     )
@@ -171,9 +189,11 @@ def graph_elements_from_primitive_expression(
     return operator
 
 
-def graph_from_expression(expr: str) -> GraphEntities:
+@profiled("generation.graph_from_expression_regex")
+def graph_from_expression_regex(expr: str) -> GraphEntities:
     """
-    Build a graph structure from a given mathematical expression.
+    Build a graph structure from a given mathematical expression by
+    repeatedly rewriting the expression string.
 
     This function iteratively extracts the innermost expressions from the
     input mathematical expression and processes them to construct graph 
@@ -198,7 +218,7 @@ def graph_from_expression(expr: str) -> GraphEntities:
 
     :example:
 
-        >>> graph_entities = graph_from_expression("(2 + 3) * (5 - 4)")
+        >>> graph_entities = graph_from_expression_regex("(2 + 3) * (5 - 4)")
         >>> print(graph_entities)
         {
             'nodes': [...],
@@ -206,7 +226,7 @@ def graph_from_expression(expr: str) -> GraphEntities:
         }
     """
 
-    graph_entities = {"nodes": [], "relationships": []}
+    graph_entities = GraphEntities()
 
     try:
         expr = remove_redundant_parenthesis(expr)
@@ -239,11 +259,512 @@ def graph_from_expression(expr: str) -> GraphEntities:
         return graph_entities
 
 
+def _operand_node(
+        operand,
+        operand_class,
+        operators: List[elements.Operator],
+        nodes: List[elements.Node]) -> elements.Node:
+    """
+    Return the node of an operand, i.e. the operator node referenced by an
+    index or a newly created number node appended to nodes.
+    """
+    if isinstance(operand, int):
+        return operators[operand]
+
+    node = operand_class(expression=str(operand), value=float(operand))
+    nodes.append(node)
+    return node
+
+
+def graph_from_reductions(reductions: List[Reduction]) -> GraphEntities:
+    """
+    Build graph entities from primitive reductions as returned by
+    `arigin.graph.parsing.parse`.
+
+    For each reduction the left and right number nodes (if not referring to
+    a previous operator) and the operator node are created in this order,
+    followed by the relationships to the operator.
+
+    :param reductions: The primitive reductions of an expression.
+    :type reductions: List[Reduction]
+
+    :returns: A dictionary containing the constructed graph elements (nodes
+              and relationships).
+    :rtype: GraphEntities
+    """
+
+    graph_entities = GraphEntities()
+    nodes = graph_entities["nodes"]
+    relationships = graph_entities["relationships"]
+    operators = []
+
+    for reduction in reductions:
+        left = _operand_node(
+            reduction.left, elements.LeftOperand, operators, nodes
+        )
+        right = _operand_node(
+            reduction.right, elements.RightOperand, operators, nodes
+        )
+        operator = elements.Operator(
+            expression=reduction.operator,
+            type=reduction.operator
+        )
+        nodes.append(operator)
+        operators.append(operator)
+
+        relationships.append(
+            elements.IsLeftOperantOf(source=left, target=operator)
+        )
+        relationships.append(
+            elements.IsRightOperantOf(source=right, target=operator)
+        )
+
+    return graph_entities
+
+
+@profiled("generation.graph_from_expression")
+def graph_from_expression(
+        expr: str,
+        engine: str = "parser",
+        compact: bool = False) -> Union[GraphEntities, GraphBatch]:
+    """
+    Build a graph structure from a given mathematical expression.
+
+    Two engines are available, both creating the same nodes and
+    relationships in the same order:
+
+    - "parser": tokenizes the expression and parses it in a single pass,
+      see `arigin.graph.parsing`. Runtime is linear in the length of the
+      expression. Besides decimals, integers, negative numbers and
+      scientific notation are supported.
+    - "regex": the original implementation repeatedly rewriting the
+      expression string, see `graph_from_expression_regex`.
+
+    :param expr: The mathematical expression to be converted into graph 
+                 entities.
+    :type expr: str
+    :param engine: Engine used for parsing the expression, either "parser"
+                   or "regex".
+    :type engine: str
+    :param compact: If True, return the graph as columnar GraphBatch. The
+                    "parser" engine builds it directly without creating any
+                    pydantic models.
+    :type compact: bool
+
+    :returns: A dictionary containing the constructed graph elements (nodes
+              and relationships) or the equivalent GraphBatch.
+    :rtype: Union[GraphEntities, GraphBatch]
+
+    :raises ValueError: If the engine is unknown or the expression cannot
+                        be parsed by the "parser" engine.
+
+    :example:
+
+        >>> graph_entities = graph_from_expression("(2 + 3) * (5 - 4)")
+        >>> print(graph_entities)
+        {
+            'nodes': [...],
+            'relationships': [...]
+        }
+    """
+
+    if engine == "parser":
+        reductions = parse(expr)
+        if compact:
+            return GraphBatch.from_reductions(reductions)
+        return graph_from_reductions(reductions)
+    elif engine == "regex":
+        graph_entities = graph_from_expression_regex(expr)
+        if compact:
+            return GraphBatch.from_entities(graph_entities)
+        return graph_entities
+
+    raise ValueError(
+        f"Unknown engine '{engine}', expected one of {ENGINES}."
+    )
+
+
+class ExpressionTree(NamedTuple):
+    """
+    Expression sampled as tree, i.e. its primitive reductions together with
+    the evaluated result. The entities are kept for rendering the
+    expression on request.
+    """
+    entities: List[Union[float, str]]
+    reductions: List[Reduction]
+    result: Optional[float]
+
+    def render(self) -> str:
+        """
+        Render the expression as string, identical to `generate`.
+        """
+        return " ".join(str(entity) for entity in self.entities)
+
+
+@profiled("generation.generate_tree")
+def generate_tree(
+        min_numbers: int = 2,
+        max_numbers: int = 4,
+        min_value: float = 0.01,
+        max_value: float = 1.,
+        n_digits: int = 3,
+        rng: Optional[random.Random] = None
+) -> ExpressionTree:
+    """
+    Sample an expression directly as tree, without creating and parsing a
+    string and without calling eval.
+
+    The entities of `arigin.expressions.generate_entities` are parsed into
+    reductions while they are drawn, the reductions are evaluated
+    afterwards. For the same random number generator state, the expression
+    is identical to the one of `generate` and the result is identical to
+    eval of that expression.
+
+    :param min_numbers: minimum number of values to be created. Must be
+                       greater or equal 2.
+    :type min_numbers: int
+    :param max_numbers: maximum number of values to be created.
+    :type max_numbers: int
+    :param rng: Random number generator to draw from. If None, the global
+                generator of the random module is used.
+    :type rng: Optional[random.Random]
+
+    :returns: Sampled expression tree, its result is None if the expression
+              divides by zero.
+    :rtype: ExpressionTree
+
+    :example:
+
+        >>> tree = generate_tree(2, 4)
+        >>> graph_entities = graph_from_reductions(tree.reductions)
+        >>> print(tree.render(), "=", tree.result)
+    """
+
+    entities, reductions = _sample_reductions(
+        min_numbers, max_numbers, min_value, max_value, n_digits, rng
+    )
+
+    try:
+        result = evaluate_reductions(reductions)
+    except ZeroDivisionError:
+        result = None
+
+    return ExpressionTree(entities, reductions, result)
+
+
+def _sample_reductions(
+        min_numbers: int = 2,
+        max_numbers: int = 4,
+        min_value: float = 0.01,
+        max_value: float = 1.,
+        n_digits: int = 3,
+        rng: Optional[random.Random] = None
+) -> Tuple[List[Union[float, str]], List[Reduction]]:
+    """
+    Sample the entities and reductions of an expression tree, see
+    `generate_tree`, without evaluating it.
+    """
+
+    entities = []
+
+    def _record(entity_iterator):
+        for entity in entity_iterator:
+            entities.append(entity)
+            yield entity
+
+    reductions = reductions_from_tokens(
+        tokens_from_entities(
+            _record(
+                generate_entities(
+                    min_numbers, max_numbers, min_value, max_value, n_digits, rng
+                )
+            )
+        )
+    )
+    return entities, reductions
+
+
+@profiled("generation.generate_graphs")
+def generate_graphs(
+        n_graphs: int,
+        min_numbers: int,
+        max_numbers: int,
+        rng: Optional[random.Random] = None,
+        compact: bool = False,
+        cache: Optional[GraphCache] = None,
+        deduplicate: bool = True
+) -> Tuple[Union[GraphEntities, GraphBatch], List[float]]:
+    """
+    Generate graphs and their results serially in the calling process,
+    e.g. a single batch drawn from its own random number generator, see
+    `generate_multiple_graphs` for sharded and parallel generation.
+
+    All expressions are sampled at once as token arrays, see
+    `arigin.expressions.generate_batch`, which are turned into a single
+    GraphBatch, see `GraphBatch.from_token_batch`, and evaluated level by
+    level, see `arigin.graph.evaluation.evaluate`. Graphs dividing by zero
+    (or otherwise invalid, see `Evaluation.valid`) are skipped. If a cache
+    is given, graphs already contained in it are skipped as well if
+    deduplicate, otherwise they are only added to the cache. Nodes get
+    sequential integer ids scoped to the returned graphs.
+
+    :param n_graphs: The number of expressions to sample.
+    :type n_graphs: int
+    :param min_numbers: The minimum number of numbers in each expression.
+    :type min_numbers: int
+    :param max_numbers: The maximum number of numbers in each expression.
+    :type max_numbers: int
+    :param rng: Random number generator seeding the numpy generator the
+                expressions are drawn from. If None, the global generator
+                of the random module is used.
+    :type rng: Optional[random.Random]
+    :param compact: If True, graphs are returned as GraphBatch instead of
+                    GraphEntities.
+    :type compact: bool
+    :param cache: Cache of the graphs generated before, see
+                  `iter_multiple_graphs`.
+    :type cache: Optional[GraphCache]
+    :param deduplicate: If False, cached trees are not skipped.
+    :type deduplicate: bool
+
+    :returns: GraphEntities (or GraphBatch) and results of the generated
+              graphs.
+    :rtype: Tuple[Union[GraphEntities, GraphBatch], List[float]]
+
+    :example:
+
+        >>> rng = random.Random(0)
+        >>> graphs, results = generate_graphs(64, 2, 4, rng=rng, compact=True)
+    """
+
+    with elements.sequential_ids():
+        return _generate_graphs_scoped(
+            n_graphs, min_numbers, max_numbers, rng, compact, cache,
+            deduplicate
+        )
+
+
+def _generate_graphs_scoped(
+        n_graphs: int,
+        min_numbers: int,
+        max_numbers: int,
+        rng: Optional[random.Random],
+        compact: bool,
+        cache: Optional[GraphCache],
+        deduplicate: bool = True
+) -> Tuple[Union[GraphEntities, GraphBatch], List[float]]:
+
+    seed = (random if rng is None else rng).getrandbits(64)
+    graph_batch = GraphBatch.from_token_batch(
+        generate_batch(n_graphs, min_numbers, max_numbers, seed=seed)
+    )
+    evaluation = evaluate(graph_batch)
+    valid = evaluation.valid
+
+    if cache is not None:
+        candidates = np.flatnonzero(valid) if deduplicate else range(n_graphs)
+        for i in candidates:
+            result = float(evaluation.results[i]) if valid[i] else None
+            entry = cache.insert(graph_batch[i], result)
+            if deduplicate and entry is None:
+                valid[i] = False
+
+    indices = np.flatnonzero(valid)
+    graphs = graph_batch.take(indices)
+    results = evaluation.results[indices].tolist()
+
+    count("generation.graphs", len(indices))
+    if compact:
+        return graphs, results
+    return graphs.to_entities(), results
+
+
+def _generate_shard(
+        n_graphs: int,
+        min_numbers: int,
+        max_numbers: int,
+        seed: int,
+        compact: bool = False
+) -> Tuple[Union[GraphEntities, GraphBatch], List[float]]:
+    """
+    Generate a shard of graphs in a worker process. Expressions are drawn
+    from a generator seeded by seed, while the generator of random node
+    ids is reseeded from system entropy. Otherwise forked workers would
+    share its state and create identical random ids.
+    """
+    elements.reseed_random_ids()
+    return generate_graphs(
+        n_graphs,
+        min_numbers,
+        max_numbers,
+        rng=random.Random(seed),
+        compact=compact
+    )
+
+
+def iter_shard_seeds(seed: Optional[int]) -> Iterator[int]:
+    """
+    Derive an endless stream of independent seeds for the random number
+    generators of the shards from a master seed. If seed is None, fresh
+    entropy is used.
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    while True:
+        child = seed_sequence.spawn(1)[0]
+        yield int(child.generate_state(1, np.uint64)[0])
+
+
+def shard_seeds(seed: Optional[int], n_shards: int) -> List[int]:
+    """
+    Derive independent seeds for n_shards random number generators from a
+    master seed, i.e. the first n_shards seeds of `iter_shard_seeds`.
+    """
+    return list(itertools.islice(iter_shard_seeds(seed), n_shards))
+
+
+def iter_multiple_graphs(
+        n_graphs: Optional[int] = None,
+        min_numbers: int = 2,
+        max_numbers: int = 4,
+        chunk_size: int = 1000,
+        n_jobs: int = 1,
+        seed: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        compact: bool = False,
+        prefetch: Optional[int] = None,
+        cache: Optional[GraphCache] = None,
+        deduplicate: bool = True
+) -> Iterator[Tuple[Union[GraphEntities, GraphBatch], np.ndarray]]:
+    """
+    Lazily generate graphs with random mathematical expressions in chunks.
+
+    Each chunk is generated from chunk_size expressions, expressions
+    dividing by zero are skipped, see `generate_graphs`. A chunk is self-contained,
+    i.e. its "batch" indices start at 0, like the output of
+    `generate_multiple_graphs`. Only the current chunk (and at most
+    prefetch chunks generated ahead by workers) are held in memory, so the
+    stream can be consumed with constant memory.
+
+    If a seed is given, each chunk is generated with its own random number
+    generator derived from the seed. Otherwise, if n_jobs is 1 and no
+    executor is given, the global generator of the random module is used.
+
+    :param n_graphs: The number of expressions to generate. If None, an
+                     endless stream of chunks is generated.
+    :type n_graphs: Optional[int]
+    :param min_numbers: The minimum number of numbers in each expression.
+    :type min_numbers: int
+    :param max_numbers: The maximum number of numbers in each expression.
+    :type max_numbers: int
+    :param chunk_size: Number of expressions per chunk.
+    :type chunk_size: int
+    :param n_jobs: Number of worker processes, -1 to use all CPUs.
+    :type n_jobs: int
+    :param seed: Master seed for reproducible generation.
+    :type seed: Optional[int]
+    :param executor: Executor to process the chunks, overrides n_jobs.
+    :type executor: Optional[concurrent.futures.Executor]
+    :param compact: If True, graphs are returned as GraphBatch instead of
+                    GraphEntities.
+    :type compact: bool
+    :param prefetch: Maximum number of chunks submitted to the workers
+                     ahead of consumption, defaults to 2 * n_jobs.
+    :type prefetch: Optional[int]
+    :param cache: If given, graphs whose expression tree is contained in
+                  the cache are skipped, new graphs are added. Requires
+                  serial generation.
+    :type cache: Optional[GraphCache]
+    :param deduplicate: If False, graphs contained in the cache are not
+                        skipped, new graphs are still added to the cache.
+                        Deduplication requires an unbounded cache.
+    :type deduplicate: bool
+
+    :returns: Iterator of graphs and results of each chunk.
+    :rtype: Iterator[Tuple[Union[GraphEntities, GraphBatch], np.ndarray]]
+
+    :example:
+
+        >>> for graphs, results in iter_multiple_graphs(10000, chunk_size=500):
+        ...     data = graph_entity_to_data_set.transform(graphs, results)
+    """
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    if n_graphs is None:
+        chunk_sizes = itertools.repeat(chunk_size)
+    else:
+        chunk_sizes = (
+            min(chunk_size, n_graphs - start)
+            for start in range(0, n_graphs, chunk_size)
+        )
+
+    if cache is not None and (executor is not None or n_jobs != 1):
+        raise ValueError("Generation with a cache requires n_jobs=1.")
+    if cache is not None and deduplicate and cache.maxsize is not None:
+        raise ValueError(
+            "Deduplication requires an unbounded cache, i.e. "
+            "GraphCache(maxsize=None), since evicted trees would pass again."
+        )
+
+    if executor is None and n_jobs == 1:
+        if seed is None:
+            rngs = itertools.repeat(None)
+        else:
+            rngs = map(random.Random, iter_shard_seeds(seed))
+        for size, rng in zip(chunk_sizes, rngs):
+            graphs, results = generate_graphs(
+                size, min_numbers, max_numbers, rng=rng, compact=compact,
+                cache=cache, deduplicate=deduplicate
+            )
+            yield graphs, np.array(results).reshape(-1, 1)
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=n_jobs)
+    if prefetch is None:
+        prefetch = 2 * n_jobs
+
+    pending = collections.deque()
+    try:
+        for size, chunk_seed in zip(chunk_sizes, iter_shard_seeds(seed)):
+            pending.append(
+                executor.submit(
+                    _generate_shard,
+                    size,
+                    min_numbers,
+                    max_numbers,
+                    chunk_seed,
+                    compact
+                )
+            )
+            if len(pending) >= max(prefetch, 1):
+                graphs, results = pending.popleft().result()
+                yield graphs, np.array(results).reshape(-1, 1)
+
+        while pending:
+            graphs, results = pending.popleft().result()
+            yield graphs, np.array(results).reshape(-1, 1)
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown()
+
+
 def generate_multiple_graphs(
         n_graphs=1000,
         min_numbers=2,
-        max_numbers=4
-) -> Tuple[GraphEntities, np.ndarray]:
+        max_numbers=4,
+        n_jobs: int = 1,
+        seed: Optional[int] = None,
+        shard_size: int = 1000,
+        executor: Optional[Executor] = None,
+        compact: bool = False,
+        cache: Optional[GraphCache] = None,
+        deduplicate: bool = True
+) -> Tuple[Union[GraphEntities, GraphBatch], np.ndarray]:
     """
     Generate multiple graphs with random mathematical expressions.
 
@@ -253,15 +774,45 @@ def generate_multiple_graphs(
     as the minimum and maximum number of numbers in each expression, can be 
     specified.
 
+    The graphs are generated in shards of shard_size graphs, see
+    `iter_multiple_graphs`, and merged in order. If a seed is given, each
+    shard is generated with its own random number generator derived from
+    the seed, so the result only depends on seed and shard_size, but not on
+    the number of workers. Shards are processed by a process pool with
+    n_jobs workers or by the given executor. Merging pydantic models in the
+    main process limits the speedup, for close to linear scaling with the
+    number of workers use compact=True.
+
     :param n_graphs: The number of graphs to generate.
     :type n_graphs: int
     :param min_numbers: The minimum number of numbers in each expression.
     :type min_numbers: int
     :param max_numbers: The maximum number of numbers in each expression.
     :type max_numbers: int
-
-    :returns: GraphEntities and results of the generated graphs.
-    :rtype: Tuple[GraphEntities, np.ndarray]
+    :param n_jobs: Number of worker processes, -1 to use all CPUs.
+    :type n_jobs: int
+    :param seed: Master seed for reproducible generation.
+    :type seed: Optional[int]
+    :param shard_size: Number of graphs generated per shard.
+    :type shard_size: int
+    :param executor: Executor to process the shards, overrides n_jobs.
+    :type executor: Optional[concurrent.futures.Executor]
+    :param compact: If True, graphs are returned as GraphBatch instead of
+                    GraphEntities.
+    :type compact: bool
+    :param cache: If given, the dataset is deduplicated against the cache,
+                  i.e. graphs whose expression tree was generated before
+                  are skipped, see `iter_multiple_graphs`. E.g. using the
+                  cache of the training data avoids overlap with the
+                  validation data. The cache must be unbounded.
+    :type cache: Optional[GraphCache]
+    :param deduplicate: If False, graphs are not deduplicated against the
+                        cache, see `iter_multiple_graphs`.
+    :type deduplicate: bool
+
+    :returns: GraphEntities (or GraphBatch) and results of the generated
+              graphs.
+    :rtype: Tuple[Union[GraphEntities, GraphBatch], np.ndarray]
 
     :example:
 
@@ -270,26 +821,66 @@ def generate_multiple_graphs(
         10
     """
 
-    graph_entities = {"nodes": [], "relationships": []}
+    chunks = iter_multiple_graphs(
+        n_graphs,
+        min_numbers,
+        max_numbers,
+        chunk_size=shard_size,
+        n_jobs=n_jobs,
+        seed=seed,
+        executor=executor,
+        compact=compact,
+        cache=cache,
+        deduplicate=deduplicate
+    )
+    n_chunks = -(-n_graphs // shard_size)
+
+    return _merge_chunks(tqdm(chunks, total=n_chunks), compact)
+
+
+def _shift_ids(models: List[elements.AbstractModel], offset: int):
+    """
+    Shift sequential integer ids by offset, random ids are kept.
+    """
+    if offset:
+        for model in models:
+            if isinstance(model.id, int):
+                model.id += offset
+
+
+def _merge_chunks(
+        chunks: Iterable[Tuple[Union[GraphEntities, GraphBatch], np.ndarray]],
+        compact: bool = False
+) -> Tuple[Union[GraphEntities, GraphBatch], np.ndarray]:
+    """
+    Merge chunks in order, shifting their batch indices and the sequential
+    ids of their nodes and relationships, such that ids stay unique.
+    """
+
+    graph_entities = GraphEntities(batch=[])
+    batches = []
     results = []
-    batch = []
-    graph_i = 0
-    for _ in tqdm(range(n_graphs), total=n_graphs):
-        expr = generate(min_numbers, max_numbers)
-        single_graph_entities = graph_from_expression(expr)
-        try:
-            y = eval(expr)
-        except ZeroDivisionError:
-            continue
-        n_nodes = len(single_graph_entities["nodes"])
-        graph_entities["nodes"] += single_graph_entities["nodes"]
-        graph_entities["relationships"] += single_graph_entities["relationships"]
-        batch += [graph_i] * n_nodes
-
-        results.append(y)
-        graph_i += 1
-
-    graph_entities.update({"batch": batch})
-    results = np.array(results).reshape(-1, 1)
+    n_results = 0
+    for chunk_graphs, chunk_results in chunks:
+        if compact:
+            batches.append(chunk_graphs)
+        else:
+            _shift_ids(chunk_graphs["nodes"], len(graph_entities["nodes"]))
+            _shift_ids(
+                chunk_graphs["relationships"],
+                len(graph_entities["relationships"])
+            )
+            graph_entities["nodes"] += chunk_graphs["nodes"]
+            graph_entities["relationships"] += chunk_graphs["relationships"]
+            graph_entities["batch"] += [
+                n_results + graph_i for graph_i in chunk_graphs["batch"]
+            ]
+        results.append(chunk_results)
+        n_results += len(chunk_results)
+
+    if compact:
+        graph_entities = GraphBatch.concatenate(batches)
+
+    results = np.concatenate([np.empty((0, 1))] + results)
 
     return graph_entities, results
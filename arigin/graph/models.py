@@ -1,4 +1,5 @@
 import torch
+from typing import List, Optional
 from torch.nn import Linear, Module
 import torch.nn.functional as F
 from torch_geometric.nn import GCNConv, GATv2Conv
@@ -113,6 +114,18 @@ class GCN(Module):
     
 
 class MathModel(torch.nn.Module):
+    """
+    Graph attention model with attention pooling, predicting on graph
+    level.
+
+    Parameters
+    ----------
+    graph_norm : bool
+        If True, the layer norm normalizes each graph separately, so the
+        prediction of a graph does not depend on the other graphs of the
+        batch, e.g. when serving micro-batches. By default it normalizes
+        across the whole batch, like models trained before.
+    """
     def __init__(
             self, 
             in_channels: int,
@@ -122,10 +135,13 @@ class MathModel(torch.nn.Module):
             heads: int = 1,
             edge_dim: int = None,
             activation = F.gelu,
-            dropout=0.2):
+            dropout=0.2,
+            graph_norm: bool = False):
 
         super().__init__()
 
+        self.graph_norm = graph_norm
+
         self.n_conv = 3
         self.n_pool = 3
 
@@ -175,7 +191,9 @@ class MathModel(torch.nn.Module):
         for ip, p in enumerate(self.pool):
             for c in self.conv[ip]:
                 x_ = c(x, edge_index, edge_attr)
-                x = self.norm(x + self.activation(x_))
+                x = self.norm(
+                    x + self.activation(x_), batch if self.graph_norm else None
+                )
 
             out += pool.global_max_pool(x, batch)
 
@@ -192,3 +210,180 @@ class MathModel(torch.nn.Module):
             x = h(x)
 
         return x
+
+
+def topological_levels(edge_index: torch.Tensor, num_nodes: int) -> List[torch.Tensor]:
+    """
+    Group the nodes of expression trees by their level, i.e. the height of
+    the subtree they root. Level 0 holds the numbers, level k the operators
+    whose deepest operand is on level k - 1.
+
+    Levels are peeled off like by Kahn's algorithm: an operator enters the
+    frontier once all its operands have been visited, hence every edge is
+    visited once.
+
+    :param edge_index: Edges from operands to their operator, i.e. without
+                       reverse edges.
+    :type edge_index: torch.Tensor
+    :param num_nodes: Number of nodes.
+    :type num_nodes: int
+
+    :returns: Node indices of each level.
+    :rtype: List[torch.Tensor]
+    """
+
+    source, target = edge_index[0], edge_index[1]
+    remaining = torch.bincount(target, minlength=num_nodes)
+
+    # Edges grouped by source node
+    order = torch.argsort(source)
+    parent = target[order]
+    rowptr = torch.cat([
+        torch.zeros(1, dtype=torch.long, device=source.device),
+        torch.cumsum(torch.bincount(source, minlength=num_nodes), 0)
+    ])
+
+    levels: List[torch.Tensor] = []
+    frontier = torch.nonzero(remaining == 0).view(-1)
+    while frontier.numel() > 0:
+        levels.append(frontier)
+        counts = rowptr[frontier + 1] - rowptr[frontier]
+        # Position of each outgoing edge of the frontier in parent
+        edges = torch.repeat_interleave(
+            rowptr[frontier] - torch.cumsum(counts, 0) + counts, counts
+        )
+        edges += torch.arange(edges.numel(), device=edges.device)
+        parents = parent[edges]
+        remaining.index_add_(0, parents, -torch.ones_like(parents))
+        parents = torch.unique(parents)
+        frontier = parents[remaining[parents] == 0]
+
+    return levels
+
+
+class LevelModel(Module):
+    """
+    Level-synchronous message passing along the expression tree.
+
+    Nodes are embedded from their features, then the operators are updated
+    level by level, bottom-up, by a shared GRU cell from the messages of
+    their operands, see `topological_levels`. Each level is a single
+    batched gather and scatter over the edges into its operators, hence
+    every edge passes one message, and deeper expressions need more
+    steps of the same cell instead of a deeper network. The prediction is
+    read from the root operator of each graph.
+
+    The levels are the topological ranks of the nodes. If given, e.g. as
+    emitted by `arigin.preprocessing.GraphEntityToDataSet.transform`, they
+    are not recomputed.
+
+    Parameters
+    ----------
+    in_channels : int
+        Number of input features.
+    hidden_channels : int
+        Number of hidden features.
+    emb_channels : int
+        Number of embedding features of the head.
+    out_channels : int
+        Number of output features.
+    edge_dim : int
+        Number of edge features, e.g. distinguishing left and right
+        operands.
+    activation : callable
+        Activation function.
+    dropout : float
+        Dropout rate of the messages.
+    """
+
+    def __init__(
+            self,
+            in_channels: int,
+            hidden_channels: int,
+            emb_channels: int,
+            out_channels: int,
+            edge_dim: int = 0,
+            activation=F.gelu,
+            dropout: float = 0.):
+
+        super().__init__()
+
+        self.encoder = Linear(in_channels, hidden_channels)
+        self.message = Linear(hidden_channels + edge_dim, hidden_channels)
+        self.cell = torch.nn.GRUCell(hidden_channels, hidden_channels)
+
+        self.head = torch.nn.ModuleList()
+        self.head.append(Linear(hidden_channels, emb_channels))
+        self.head.append(Linear(emb_channels, out_channels))
+
+        self.edge_dim = edge_dim
+        self.activation = activation
+        self.dropout = dropout
+
+    def forward(
+            self,
+            x: torch.Tensor,
+            edge_index: torch.Tensor,
+            edge_attr: Optional[torch.Tensor] = None,
+            batch: Optional[torch.Tensor] = None,
+            topo_rank: Optional[torch.Tensor] = None) -> torch.Tensor:
+
+        # Operands precede their operators, reverse edges are dropped
+        forward_edges = edge_index[0] < edge_index[1]
+        edge_index = edge_index[:, forward_edges]
+        if edge_attr is not None:
+            edge_attr = edge_attr[forward_edges]
+
+        num_nodes = x.size(0)
+        if topo_rank is None:
+            levels = topological_levels(edge_index, num_nodes)
+            level = torch.empty(num_nodes, dtype=torch.long, device=x.device)
+            for i, nodes in enumerate(levels):
+                level[nodes] = i
+        else:
+            level = topo_rank
+            sizes: List[int] = torch.bincount(level).tolist()
+            levels = list(torch.split(torch.argsort(level, stable=True), sizes))
+        position = torch.empty_like(level)
+
+        # Edges ordered by the level of their operator
+        order = torch.argsort(level[edge_index[1]])
+        edge_index = edge_index[:, order]
+        if edge_attr is not None:
+            edge_attr = edge_attr[order]
+        edge_offsets: List[int] = torch.searchsorted(
+            level[edge_index[1]],
+            torch.arange(len(levels) + 1, device=x.device)
+        ).tolist()
+
+        h = self.activation(self.encoder(x))
+        for i in range(1, len(levels)):
+            nodes = levels[i]
+            start, end = edge_offsets[i], edge_offsets[i + 1]
+            source, target = edge_index[0, start:end], edge_index[1, start:end]
+            message = h[source]
+            if edge_attr is not None and self.edge_dim > 0:
+                message = torch.cat([message, edge_attr[start:end]], dim=-1)
+            message = self.activation(self.message(message))
+            message = F.dropout(message, p=self.dropout, training=self.training)
+
+            position[nodes] = torch.arange(nodes.numel(), device=x.device)
+            aggregated = message.new_zeros(nodes.numel(), message.size(-1))
+            aggregated.index_add_(0, position[target], message)
+            # In place, only the rows of this level are written
+            h.index_copy_(0, nodes, self.cell(aggregated, h[nodes]))
+
+        # The root is the only node without operator
+        is_root = torch.ones(num_nodes, dtype=torch.bool, device=x.device)
+        is_root[edge_index[0]] = False
+        root = torch.nonzero(is_root).view(-1)
+        if batch is None:
+            batch = torch.zeros(num_nodes, dtype=torch.long, device=x.device)
+        n_graphs = int(batch.max()) + 1 if num_nodes > 0 else 0
+        out = h.new_zeros(n_graphs, h.size(-1))
+        out = out.index_copy(0, batch[root], h[root])
+
+        out = self.head[0](out)
+        out = self.head[1](self.activation(out))
+
+        return out
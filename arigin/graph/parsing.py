@@ -0,0 +1,340 @@
+import re
+import operator
+import numpy as np
+from enum import Enum
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from arigin.expressions import (
+    OPERATORS,
+    OPEN_PARENTHESIS,
+    CLOSE_PARENTHESIS,
+    NUMBER_TOKEN,
+    OPERATOR_TOKEN,
+    OPEN_PARENTHESIS_TOKEN,
+    CLOSE_PARENTHESIS_TOKEN,
+)
+
+
+class TokenType(str, Enum):
+    NUMBER = "number"
+    OPERATOR = "operator"
+    OPEN_PARENTHESIS = OPEN_PARENTHESIS
+    CLOSE_PARENTHESIS = CLOSE_PARENTHESIS
+
+
+class Token(NamedTuple):
+    """
+    Single lexical element of an arithmetic expression.
+    """
+    type: TokenType
+    text: str
+
+
+# Operand of a reduction: either the literal (or value) of a number or the
+# index of an earlier reduction, whose result is used as the operand.
+Operand = Union[str, float, int]
+
+
+class Reduction(NamedTuple):
+    """
+    Primitive expression '[LeftOperant] [Operator] [RightOperant]', i.e.
+    a single operator node in the graph.
+    """
+    operator: str
+    left: Operand
+    right: Operand
+
+
+NUMBER_PATTERN = r"(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:(?P<number>{})|(?P<operator>[{}])|(?P<open>\()|(?P<close>\)))".format(
+        NUMBER_PATTERN,
+        re.escape("".join(OPERATORS))
+    )
+)
+
+MULTIPLICATIVE_OPERATORS = ("*", "/")
+
+OPERATIONS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
+
+def tokenize(expression: str) -> List[Token]:
+    """
+    Split an arithmetic expression into tokens in a single pass.
+
+    Integers, decimals and numbers in scientific notation are supported.
+    A '+' or '-' in front of a number, where an operand is expected (at
+    the beginning, after an operator or after '('), is treated as the
+    sign of that number.
+
+    :param expression: The arithmetic expression.
+    :type expression: str
+
+    :returns: List of tokens in order of appearance.
+    :rtype: List[Token]
+
+    :raises ValueError: If the expression contains invalid characters or
+                        a sign which is not followed by a number.
+
+    :example:
+
+        >>> tokenize("-2 * (1e-3 + 4)")
+        [Token(type=<TokenType.NUMBER: 'number'>, text='-2'), ...]
+    """
+
+    tokens = []
+    expect_operand = True
+    sign = ""
+    position = 0
+    end = len(expression.rstrip())
+
+    while position < end:
+        match = TOKEN_PATTERN.match(expression, position)
+        if match is None:
+            raise ValueError(
+                f"Invalid character at position {position} in '{expression}'."
+            )
+        position = match.end()
+
+        if match["number"] is not None:
+            tokens.append(Token(TokenType.NUMBER, sign + match["number"]))
+            sign = ""
+            expect_operand = False
+            continue
+
+        if sign:
+            raise ValueError(
+                f"Sign '{sign}' must be followed by a number in '{expression}'."
+            )
+
+        if match["operator"] is not None:
+            operator = match["operator"]
+            if expect_operand and operator in ("+", "-"):
+                sign = operator
+                continue
+            tokens.append(Token(TokenType.OPERATOR, operator))
+            expect_operand = True
+        elif match["open"] is not None:
+            tokens.append(Token(TokenType.OPEN_PARENTHESIS, OPEN_PARENTHESIS))
+            expect_operand = True
+        else:
+            tokens.append(Token(TokenType.CLOSE_PARENTHESIS, CLOSE_PARENTHESIS))
+            expect_operand = False
+
+    if sign:
+        raise ValueError(
+            f"Sign '{sign}' must be followed by a number in '{expression}'."
+        )
+
+    return tokens
+
+
+def _reduce(
+        reductions: List[Reduction],
+        operator: str,
+        left: Operand,
+        right: Operand) -> int:
+    reductions.append(Reduction(operator, left, right))
+    return len(reductions) - 1
+
+
+def _reduce_group(
+        operands: List[Operand],
+        operators: List[str],
+        reductions: List[Reduction]) -> Operand:
+    """
+    Reduce a group without any unresolved parentheses. Multiplications and
+    divisions are reduced first, then additions and subtractions, each from
+    left to right.
+    """
+
+    terms = [operands[0]]
+    term_operators = []
+    for operator, operand in zip(operators, operands[1:]):
+        if operator in MULTIPLICATIVE_OPERATORS:
+            terms[-1] = _reduce(reductions, operator, terms[-1], operand)
+        else:
+            terms.append(operand)
+            term_operators.append(operator)
+
+    result = terms[0]
+    for operator, operand in zip(term_operators, terms[1:]):
+        result = _reduce(reductions, operator, result, operand)
+
+    return result
+
+
+def reductions_from_tokens(
+        tokens: Iterable[Tuple[TokenType, Union[str, float]]]) -> List[Reduction]:
+    """
+    Parse a stream of tokens into the list of primitive reductions, each
+    being one operator with its left and right operand.
+
+    The reductions are ordered exactly like the regex based graph building
+    creates its operators: parenthesized groups are resolved innermost and
+    leftmost first, within a group multiplications and divisions come
+    before additions and subtractions, each from left to right. Each token
+    is visited once, hence the runtime is linear in the length of the
+    expression.
+
+    :param tokens: Tokens as returned by `tokenize`. Instead of the text, a
+                   number token may also carry its float value.
+    :type tokens: Iterable[Tuple[TokenType, Union[str, float]]]
+
+    :returns: List of reductions. Operands referring to an integer are the
+              index of the reduction providing the operand.
+    :rtype: List[Reduction]
+
+    :raises ValueError: If the tokens do not form a valid expression.
+    """
+
+    reductions = []
+    # Operands and operators of each currently open group
+    stack = [([], [])]
+    expect_operand = True
+
+    for token_type, text in tokens:
+        operands, operators = stack[-1]
+        if token_type is TokenType.NUMBER:
+            if not expect_operand:
+                raise ValueError(f"Unexpected number '{text}'.")
+            operands.append(text)
+            expect_operand = False
+        elif token_type is TokenType.OPERATOR:
+            if expect_operand:
+                raise ValueError(f"Unexpected operator '{text}'.")
+            operators.append(text)
+            expect_operand = True
+        elif token_type is TokenType.OPEN_PARENTHESIS:
+            if not expect_operand:
+                raise ValueError("Unexpected opening parenthesis.")
+            stack.append(([], []))
+        else:
+            if expect_operand or len(stack) == 1:
+                raise ValueError("Unexpected closing parenthesis.")
+            stack.pop()
+            stack[-1][0].append(
+                _reduce_group(operands, operators, reductions)
+            )
+            expect_operand = False
+
+    if expect_operand:
+        raise ValueError("Expression is incomplete.")
+    if len(stack) > 1:
+        raise ValueError("Expression has unbalanced parentheses.")
+
+    _reduce_group(*stack[0], reductions)
+
+    return reductions
+
+
+def parse(expression: str) -> List[Reduction]:
+    """
+    Parse an arithmetic expression into primitive reductions, see
+    `reductions_from_tokens`.
+
+    :param expression: The arithmetic expression.
+    :type expression: str
+
+    :returns: List of reductions.
+    :rtype: List[Reduction]
+
+    :example:
+
+        >>> parse("(2 + 3) * 4")
+        [Reduction(operator='+', left='2', right='3'),
+         Reduction(operator='*', left=0, right='4')]
+    """
+    return reductions_from_tokens(tokenize(expression))
+
+
+# Token type and text of each token code, see `arigin.expressions`
+_CODE_TOKENS = {
+    NUMBER_TOKEN: (TokenType.NUMBER, None),
+    OPEN_PARENTHESIS_TOKEN: (TokenType.OPEN_PARENTHESIS, OPEN_PARENTHESIS),
+    CLOSE_PARENTHESIS_TOKEN: (TokenType.CLOSE_PARENTHESIS, CLOSE_PARENTHESIS),
+}
+_CODE_TOKENS.update({
+    OPERATOR_TOKEN + i: (TokenType.OPERATOR, operator)
+    for i, operator in enumerate(OPERATORS)
+})
+
+
+def reductions_from_codes(
+        codes: np.ndarray,
+        values: np.ndarray) -> List[Reduction]:
+    """
+    Parse a single expression given as token codes, e.g. a row of
+    `arigin.expressions.TokenBatch`, into primitive reductions. Number
+    operands are the float values, no strings are involved.
+
+    :param codes: Token codes of the expression without padding.
+    :type codes: np.ndarray
+    :param values: Values of the number tokens.
+    :type values: np.ndarray
+
+    :returns: List of reductions.
+    :rtype: List[Reduction]
+    """
+    return reductions_from_tokens(
+        (token_type, value if text is None else text)
+        for (token_type, text), value in zip(
+            map(_CODE_TOKENS.__getitem__, codes.tolist()),
+            values.tolist()
+        )
+    )
+
+
+def tokens_from_entities(
+        entities: Iterable[Union[float, str]]
+) -> Iterator[Tuple[TokenType, Union[str, float]]]:
+    """
+    Lazily convert the entities of an expression as generated by
+    `arigin.expressions.generate_entities` into tokens, where numbers carry
+    their float value.
+    """
+    for entity in entities:
+        if isinstance(entity, float):
+            yield TokenType.NUMBER, entity
+        elif entity == OPEN_PARENTHESIS:
+            yield TokenType.OPEN_PARENTHESIS, entity
+        elif entity == CLOSE_PARENTHESIS:
+            yield TokenType.CLOSE_PARENTHESIS, entity
+        else:
+            yield TokenType.OPERATOR, entity
+
+
+def evaluate_reductions(reductions: List[Reduction]) -> float:
+    """
+    Evaluate the expression given by its primitive reductions. Operations
+    are applied in the same order and on the same floats as Python's eval
+    of the expression, so the result is identical.
+
+    :param reductions: The primitive reductions of an expression.
+    :type reductions: List[Reduction]
+
+    :returns: Result of the last reduction.
+    :rtype: float
+
+    :raises ZeroDivisionError: If the expression divides by zero.
+    :raises ValueError: If there are no reductions.
+    """
+
+    if not reductions:
+        raise ValueError("Cannot evaluate an expression without operators.")
+
+    results = []
+    for reduction in reductions:
+        left, right = (
+            results[operand] if isinstance(operand, int) else float(operand)
+            for operand in (reduction.left, reduction.right)
+        )
+        results.append(OPERATIONS[reduction.operator](left, right))
+
+    return results[-1]
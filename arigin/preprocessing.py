@@ -1,19 +1,221 @@
 import torch
 import numpy as np
-from typing import Optional
-from torch_geometric.data import Data
-from sklearn.base import BaseEstimator, TransformerMixin
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+from torch_geometric.data import Data, InMemoryDataset
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils.validation import check_is_fitted
 
+from arigin.graph.elements import node_id_to_index
+from arigin.graph.compact import GraphBatch, tree_order
 from arigin.graph.generation import GraphEntities
-from arigin.features import node_features, edge_features
+from arigin.features import fast_node_features, fast_edge_features
+from arigin.feature_spec import FeatureSpec, edge_attr_with_reverse
+from arigin.profiling import profiled
+
+
+def split_by_graph(data: Data, n_graphs: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Split the output of `GraphEntityToDataSet.transform` into per graph
+    slices. The reverse edges, which are appended after all edges of the
+    batch, are moved next to the edges of their graph and edge indices are
+    made local to the graph, so every graph is a contiguous slice of each
+    array. Graphs without nodes are dropped, their root_index sentinel -1
+    would be shifted like a node index when graphs are collated.
+
+    :param data: Batch of graphs with "batch" indices.
+    :type data: Data
+    :param n_graphs: Number of graphs, defaults to the number of targets,
+                     without targets to the maximum batch index + 1, i.e.
+                     trailing graphs without nodes are only known from
+                     their targets.
+    :type n_graphs: Optional[int]
+
+    :returns: Arrays x, edge_index, edge_attr, y, depth, topo_rank,
+              root_index (local to the graph) and the offsets of the nodes
+              and edges of each graph, node_offsets and edge_offsets.
+    :rtype: Dict[str, np.ndarray]
+    """
+
+    batch = data.batch.numpy()
+    edge_index = data.edge_index.numpy()
+    # Trailing graphs without nodes are missing in the root indices of
+    # graph entities, see `GraphEntityToDataSet._get_tree_order`
+    root_index = data.root_index.numpy()
+    n_edges = edge_index.shape[1] // 2
+    if n_graphs is None:
+        n_graphs = (
+            int(batch.max(initial=-1)) + 1 if data.y is None else len(data.y)
+        )
+    if batch.max(initial=-1) >= n_graphs:
+        raise ValueError(
+            f"Found nodes of graph {batch.max()}, but only {n_graphs} graphs."
+        )
+    if data.y is not None and len(data.y) != n_graphs:
+        raise ValueError(
+            f"Expected one target per graph, got {len(data.y)} targets for "
+            f"{n_graphs} graphs."
+        )
+
+    n_nodes = np.bincount(batch, minlength=n_graphs)
+    keep = n_nodes > 0
+    node_offsets = np.zeros(keep.sum() + 1, dtype=np.int64)
+    np.cumsum(n_nodes[keep], out=node_offsets[1:])
+    # Graph index among the kept graphs
+    batch = (np.cumsum(keep) - 1)[batch]
+
+    edge_graph = batch[edge_index[0]]
+    is_reverse = np.arange(2 * n_edges) >= n_edges
+    order = np.lexsort((is_reverse, edge_graph))
+
+    edge_offsets = np.zeros(len(node_offsets), dtype=np.int64)
+    np.cumsum(
+        np.bincount(edge_graph, minlength=len(node_offsets) - 1),
+        out=edge_offsets[1:]
+    )
+
+    edge_index = edge_index[:, order] - node_offsets[edge_graph[order]]
+
+    return {
+        "x": data.x.numpy(),
+        "edge_index": edge_index,
+        "edge_attr": data.edge_attr.numpy()[order],
+        "y": data.y.numpy()[keep] if data.y is not None else None,
+        "depth": data.depth.numpy(),
+        "topo_rank": data.topo_rank.numpy(),
+        "root_index": (
+            root_index[keep[:len(root_index)]] - node_offsets[:-1]
+        ),
+        "node_offsets": node_offsets,
+        "edge_offsets": edge_offsets,
+    }
+
+
+def merge_standard_scalers(scaler: StandardScaler, other: StandardScaler) -> StandardScaler:
+    """
+    Merge the statistics of another StandardScaler fitted on other samples
+    into scaler, as if scaler was fitted on the samples of both. Means and
+    variances are combined pairwise (Chan et al.), like by
+    `StandardScaler.partial_fit`.
+    """
+
+    if other is scaler:
+        raise ValueError("Cannot merge a scaler with itself.")
+    if not hasattr(other, "n_samples_seen_"):
+        return scaler
+    if not hasattr(scaler, "n_samples_seen_"):
+        scaler.__dict__.update(
+            {k: v for k, v in vars(other).items() if k.endswith("_")}
+        )
+        return scaler
+
+    n, n_other = scaler.n_samples_seen_, other.n_samples_seen_
+    n_total = n + n_other
+    if scaler.mean_ is not None:
+        delta = other.mean_ - scaler.mean_
+        if scaler.var_ is not None:
+            scaler.var_ = (
+                scaler.var_ * n + other.var_ * n_other
+                + delta ** 2 * n * n_other / n_total
+            ) / n_total
+            scale = np.sqrt(scaler.var_)
+            scaler.scale_ = np.where(
+                scale < 10 * np.finfo(scale.dtype).eps, 1., scale
+            )
+        scaler.mean_ = scaler.mean_ + delta * n_other / n_total
+    scaler.n_samples_seen_ = n_total
+    return scaler
+
+
+class GraphDataset(InMemoryDataset):
+    """
+    Collated store of graphs, where each item is a single graph. All graphs
+    share the tensors of the store, items are views given by slices, so
+    shuffled mini-batches can be drawn with
+    `torch_geometric.loader.DataLoader` without any re-featurization.
+
+    :param data: Collated graphs with edge indices local to each graph.
+    :type data: Data
+    :param slices: Offsets of each graph in the tensors of data.
+    :type slices: Dict[str, torch.Tensor]
+
+    :example:
+
+        >>> dataset = GraphDataset.from_data(graph_entity_to_data_set.transform(X, y))
+        >>> loader = DataLoader(dataset, batch_size=64, shuffle=True)
+    """
+
+    def __init__(self, data: Data, slices: Dict[str, torch.Tensor]):
+
+        super().__init__(root=None, log=False)
+        self.data, self.slices = data, slices
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "GraphDataset":
+        """
+        Create the dataset from arrays as returned by `split_by_graph`.
+        """
+
+        node_offsets = torch.from_numpy(arrays["node_offsets"])
+        edge_offsets = torch.from_numpy(arrays["edge_offsets"])
+        data = Data(
+            x=torch.as_tensor(arrays["x"], dtype=torch.float),
+            edge_index=torch.as_tensor(arrays["edge_index"], dtype=torch.long),
+            edge_attr=torch.as_tensor(arrays["edge_attr"], dtype=torch.float),
+            depth=torch.as_tensor(arrays["depth"], dtype=torch.long),
+            topo_rank=torch.as_tensor(arrays["topo_rank"], dtype=torch.long),
+            root_index=torch.as_tensor(arrays["root_index"], dtype=torch.long),
+        )
+        slices = {
+            "x": node_offsets,
+            "edge_index": edge_offsets,
+            "edge_attr": edge_offsets,
+            "depth": node_offsets,
+            "topo_rank": node_offsets,
+            "root_index": torch.arange(len(node_offsets)),
+        }
+        if arrays["y"] is not None:
+            data.y = torch.as_tensor(arrays["y"], dtype=torch.float)
+            slices["y"] = torch.arange(len(node_offsets))
+
+        return cls(data, slices)
+
+    @classmethod
+    def from_data(cls, data: Data, n_graphs: Optional[int] = None) -> "GraphDataset":
+        """
+        Create the dataset from the output of `GraphEntityToDataSet.transform`.
+        """
+        return cls.from_arrays(split_by_graph(data, n_graphs))
 
 
 class GraphEntityToDataSet(BaseEstimator, TransformerMixin):
+    """
+    Transform graph entities (or a GraphBatch) and targets to a pytorch
+    DataSet. The default transformers are the fast NumPy featurizers, the
+    sklearn pipelines of `arigin.features` (e.g. node_features and
+    edge_features) can be used as well for graph entities.
+
+    With the fast featurizers and a StandardScaler (or no) target
+    transformer, the transformer can also be fitted on a stream of chunks
+    with bounded memory, see `partial_fit` and `fit_stream`. Transformers
+    fitted on different chunks, e.g. by parallel workers, are combined
+    with `merge`.
+
+    The transformers passed in are left untouched, fitting stores fitted
+    copies in node_transformer_, edge_transformer_ and target_transformer_,
+    so instances never share their fitted state, e.g. through the default
+    featurizers.
+
+    :example:
+
+        >>> transformer = GraphEntityToDataSet(target_transformer=StandardScaler())
+        >>> transformer.fit_stream(iter_multiple_graphs(10 ** 6, compact=True))
+    """
 
     def __init__(
             self, 
-            node_transformer: Optional[TransformerMixin] = node_features, 
-            edge_transformer: Optional[TransformerMixin] = edge_features,
+            node_transformer: Optional[TransformerMixin] = fast_node_features, 
+            edge_transformer: Optional[TransformerMixin] = fast_edge_features,
             target_transformer: Optional[TransformerMixin] = None
         ):
 
@@ -22,75 +224,295 @@ class GraphEntityToDataSet(BaseEstimator, TransformerMixin):
         self.target_transformer = target_transformer
         super().__init__()
 
+    @staticmethod
+    def _nodes(X: Union[GraphEntities, GraphBatch]):
+        return X if isinstance(X, GraphBatch) else X["nodes"]
+
+    @staticmethod
+    def _relationships(X: Union[GraphEntities, GraphBatch]):
+        return X if isinstance(X, GraphBatch) else X["relationships"]
+
     def _get_node_id_to_index(self, graph_entities: GraphEntities) -> dict:
         """
         Get a dictionary mapping node ids to their index in the nodes list.
         """
 
-        return {
-            node.id: index
-            for index, node in enumerate(graph_entities["nodes"])
-        }
+        return node_id_to_index(graph_entities["nodes"])
 
-    def _get_edges(self, graph_entities: GraphEntities) -> list:
+    @staticmethod
+    def _get_first_sequential_id(graph_entities: GraphEntities) -> Optional[int]:
         """
-        Get a list of edges from the relationships list.
+        Get the id of the first node if the node ids are consecutive
+        integers, i.e. equal to the index of the node plus this offset,
+        otherwise None.
         """
 
-        id_index_mapping = self._get_node_id_to_index(graph_entities)
+        nodes = graph_entities["nodes"]
+        if not nodes or type(nodes[0].id) is not int:
+            return None
+        try:
+            ids = np.fromiter(
+                (node.id for node in nodes), dtype=np.int64, count=len(nodes)
+            )
+        except (TypeError, ValueError):
+            return None
+        first_id = int(ids[0])
+        if not np.array_equal(ids, np.arange(first_id, first_id + len(ids))):
+            return None
+        return first_id
 
-        edge_index = [
-            [
-                id_index_mapping[relationship.source.id],
-                id_index_mapping[relationship.target.id]
-            ]
-            for relationship in graph_entities["relationships"]
-        ]
-        edge_index = np.array(edge_index)
+    def _get_edges(self, graph_entities: Union[GraphEntities, GraphBatch]) -> np.ndarray:
+        """
+        Get the edge index of shape (2, 2 * n_edges), where the second half
+        holds the reverse edges. The array is allocated once and filled in
+        place. Sequential node ids, see
+        `arigin.graph.elements.sequential_ids`, are turned into positions by
+        their offset, other ids are looked up in a mapping to their index.
+        """
+
+        if isinstance(graph_entities, GraphBatch):
+            n_edges = graph_entities.n_edges
+        else:
+            relationships = graph_entities["relationships"]
+            n_edges = len(relationships)
+
+        edge_index = np.empty((2, 2 * n_edges), dtype=np.int64)
+        if isinstance(graph_entities, GraphBatch):
+            edge_index[:, :n_edges] = graph_entities.edge_index
+        elif (first_id := self._get_first_sequential_id(graph_entities)) is not None:
+            edge_index[0, :n_edges] = np.fromiter(
+                (r.source.id for r in relationships), dtype=np.int64, count=n_edges
+            )
+            edge_index[1, :n_edges] = np.fromiter(
+                (r.target.id for r in relationships), dtype=np.int64, count=n_edges
+            )
+            edge_index[:, :n_edges] -= first_id
+        else:
+            id_index_mapping = self._get_node_id_to_index(graph_entities)
+            edge_index[0, :n_edges] = np.fromiter(
+                (id_index_mapping[r.source.id] for r in relationships),
+                dtype=np.int64,
+                count=n_edges
+            )
+            edge_index[1, :n_edges] = np.fromiter(
+                (id_index_mapping[r.target.id] for r in relationships),
+                dtype=np.int64,
+                count=n_edges
+            )
         # Add reverse edges
-        edge_index = np.vstack((edge_index, edge_index[:, [1, 0]]))
+        edge_index[0, n_edges:] = edge_index[1, :n_edges]
+        edge_index[1, n_edges:] = edge_index[0, :n_edges]
 
         return edge_index
-    
-    def fit(self, X: GraphEntities, y: np.ndarray, **fit_params):
+
+    @staticmethod
+    def _get_edge_attr(E: np.ndarray) -> np.ndarray:
+        """
+        Get the edge features of edges and reverse edges, see
+        `arigin.feature_spec.edge_attr_with_reverse`, as float32 like the
+        node features.
+        """
+        return edge_attr_with_reverse(E, np.float32)
+
+    @staticmethod
+    def _get_tree_order(
+            X: Union[GraphEntities, GraphBatch],
+            edge_index: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get depth and topological rank of each node and the root index of
+        each graph, see GraphBatch. A GraphBatch holds them since it was
+        built, for graph entities they are computed from the edges.
+        """
+
+        if isinstance(X, GraphBatch):
+            depth, topo_rank, root_index = X.depth, X.topo_rank, X.root_index
+        else:
+            n_edges = edge_index.shape[1] // 2
+            depth, topo_rank = tree_order(edge_index[:, :n_edges], len(X["nodes"]))
+            n_nodes = np.bincount(np.asarray(X["batch"], dtype=np.int64))
+            root_index = np.where(n_nodes > 0, np.cumsum(n_nodes) - 1, -1)
+
+        return (
+            depth.astype(np.int64),
+            topo_rank.astype(np.int64),
+            root_index.astype(np.int64),
+        )
+
+    @profiled("preprocessing.fit")
+    def fit(self, X: Union[GraphEntities, GraphBatch], y: np.ndarray, **fit_params):
         """
         Fit the transformer to the data.
         """
 
-        self.node_transformer.fit(X["nodes"])
-        self.edge_transformer.fit(X["relationships"])
-        if self.target_transformer is not None:
-            self.target_transformer.fit(y)
+        self._own_transformers()
+        self.node_transformer_.fit(self._nodes(X))
+        self.edge_transformer_.fit(self._relationships(X))
+        if self.target_transformer_ is not None:
+            self.target_transformer_.fit(y)
+        self.n_chunks_seen_ = 1
         return self
+
+    def _own_transformers(self):
+        """
+        Create unfitted copies of the transformers to be fitted.
+        """
+
+        self.node_transformer_ = clone(self.node_transformer)
+        self.edge_transformer_ = clone(self.edge_transformer)
+        self.target_transformer_ = (
+            None if self.target_transformer is None
+            else clone(self.target_transformer)
+        )
+        self.n_chunks_seen_ = 0
     
-    def fit_transform(self, X: GraphEntities, y: np.ndarray, **fit_params):
+    def _check_incremental(self):
+        for transformer in (
+                self.node_transformer,
+                self.edge_transformer,
+                self.target_transformer):
+            if transformer is not None and not hasattr(transformer, "partial_fit"):
+                raise ValueError(
+                    f"{transformer!r} cannot be fitted incrementally, use "
+                    "the featurizers of `arigin.features`, e.g. "
+                    "NodeFeaturizer and EdgeFeaturizer."
+                )
+
+    @profiled("preprocessing.partial_fit")
+    def partial_fit(self, X: Union[GraphEntities, GraphBatch], y: np.ndarray = None):
+        """
+        Update the transformers with a chunk of the data. Fitting chunk by
+        chunk equals the fit on all chunks at once, up to floating point
+        errors of the target statistics.
+        """
+
+        self._check_incremental()
+        if not hasattr(self, "n_chunks_seen_"):
+            self._own_transformers()
+        self.node_transformer_.partial_fit(self._nodes(X))
+        self.edge_transformer_.partial_fit(self._relationships(X))
+        if self.target_transformer_ is not None and y is not None:
+            self.target_transformer_.partial_fit(y)
+        self.n_chunks_seen_ += 1
+        return self
+
+    def fit_stream(
+            self,
+            chunks: Iterable[Tuple[Union[GraphEntities, GraphBatch], np.ndarray]]):
+        """
+        Fit the transformer to chunks of graph entities and targets, e.g.
+        as generated by `arigin.graph.generation.iter_multiple_graphs`.
+        Previous fits are discarded and only a single chunk is held in
+        memory at a time.
+        """
+
+        self._check_incremental()
+        for i, (X, y) in enumerate(chunks):
+            if i == 0:
+                self.fit(X, y)
+            else:
+                self.partial_fit(X, y)
+        return self
+
+    def merge(self, other: "GraphEntityToDataSet") -> "GraphEntityToDataSet":
+        """
+        Merge another transformer, fitted on other chunks of the data, into
+        this one. Both need the same kinds of transformers.
+
+        :example:
+
+            >>> transformer = GraphEntityToDataSet()
+            >>> for fitted in transformers_fitted_by_workers:
+            ...     transformer.merge(fitted)
+        """
+
+        self._check_incremental()
+        if not hasattr(self, "n_chunks_seen_"):
+            self._own_transformers()
+        if not hasattr(other, "n_chunks_seen_"):
+            return self
+        self.node_transformer_.merge(other.node_transformer_)
+        self.edge_transformer_.merge(other.edge_transformer_)
+        if self.target_transformer_ is not None:
+            if not isinstance(self.target_transformer_, StandardScaler):
+                raise ValueError(
+                    "Only a StandardScaler target transformer can be merged, "
+                    f"got {self.target_transformer_!r}."
+                )
+            merge_standard_scalers(
+                self.target_transformer_, other.target_transformer_
+            )
+        self.n_chunks_seen_ += getattr(other, "n_chunks_seen_", 0)
+        return self
+
+    def fit_transform(self, X: Union[GraphEntities, GraphBatch], y: np.ndarray, **fit_params):
         return super().fit_transform(X, y, **fit_params)
     
-    def transform(self, X: GraphEntities, y: np.ndarray = None, **transform_params):
+    @profiled("preprocessing.transform")
+    def transform(self, X: Union[GraphEntities, GraphBatch], y: np.ndarray = None, **transform_params):
         """
         Transform the data to pytorch DataSet.
         """
 
-        x = self.node_transformer.transform(X["nodes"])
-        E = self.edge_transformer.transform(X["relationships"])
-        if self.target_transformer is not None:
-            y = self.target_transformer.transform(y)
-        Ez = np.zeros_like(E)
-        # Reverse edges are added to the edge features
-        E = np.vstack(
-            (
-                np.hstack((E, Ez)),
-                np.hstack((Ez, E))
-            )
-        )
-        edge_index = self._get_edges(X)
+        check_is_fitted(self, "n_chunks_seen_")
+        x = self.node_transformer_.transform(self._nodes(X))
+        E = self.edge_transformer_.transform(self._relationships(X))
+        if self.target_transformer_ is not None:
+            y = self.target_transformer_.transform(y)
 
-        # Convert to pytorch tensors
-        edge_index = torch.tensor(edge_index.T, dtype=torch.long)
-        x = torch.tensor(x, dtype=torch.float)
-        E = torch.tensor(E, dtype=torch.float)
+        # Arrays are filled once and shared with the tensors, conversions
+        # only copy if the transformers return another dtype
+        x = torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32))
+        E = torch.from_numpy(self._get_edge_attr(E))
+        edge_index = torch.from_numpy(self._get_edges(X))
         if y is not None:
-            y = torch.tensor(y, dtype=torch.float)
-        batch_no = torch.tensor(X["batch"], dtype=torch.long)
+            y = torch.from_numpy(np.ascontiguousarray(y, dtype=np.float32))
+        if isinstance(X, GraphBatch):
+            batch_no = torch.from_numpy(X.batch.astype(np.int64, copy=False))
+        else:
+            batch_no = torch.from_numpy(np.asarray(X["batch"], dtype=np.int64))
+        depth, topo_rank, root_index = (
+            torch.from_numpy(array)
+            for array in self._get_tree_order(X, edge_index.numpy())
+        )
+
+        return Data(
+            x=x, edge_index=edge_index, edge_attr=E,  y=y, batch=batch_no,
+            depth=depth, topo_rank=topo_rank, root_index=root_index
+        )
+
+    def transform_dataset(
+            self,
+            X: Union[GraphEntities, GraphBatch],
+            y: np.ndarray = None,
+            **transform_params) -> GraphDataset:
+        """
+        Transform the data to a GraphDataset of single graphs, which can be
+        shuffled and mini-batched with `torch_geometric.loader.DataLoader`.
+        """
+
+        n_graphs = X.n_graphs if isinstance(X, GraphBatch) else None
+        return GraphDataset.from_data(
+            self.transform(X, y, **transform_params), n_graphs
+        )
+
+    def feature_spec(self) -> FeatureSpec:
+        """
+        Export the fitted featurization as FeatureSpec, which can be stored
+        next to a model checkpoint and loaded without sklearn for inference.
+        Requires the fast featurizers, see `FeatureSpec.from_transformer`.
+        """
+        return FeatureSpec.from_transformer(self)
+
+    def iter_transform(
+            self,
+            chunks: Iterable[Tuple[Union[GraphEntities, GraphBatch], np.ndarray]],
+            **transform_params) -> Iterator[Data]:
+        """
+        Lazily transform chunks of graph entities and targets, e.g. as
+        generated by `arigin.graph.generation.iter_multiple_graphs`, to one
+        pytorch DataSet per chunk. Only a single chunk is transformed at a
+        time, so memory stays bounded by the chunk size.
+        """
 
-        return Data(x=x, edge_index=edge_index, edge_attr=E,  y=y, batch=batch_no)
+        for graph_entities, y in chunks:
+            yield self.transform(graph_entities, y, **transform_params)
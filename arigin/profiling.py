@@ -0,0 +1,314 @@
+import time
+import functools
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# The active profiler, None if profiling is disabled. Hooks only look it
+# up, so they stay in place in production code at negligible cost.
+_active: Optional["Profiler"] = None
+
+
+@dataclass
+class StageStats:
+    """
+    Accumulated measurements of a stage.
+
+    :param name: Name of the stage.
+    :type name: str
+    :param calls: Number of calls.
+    :type calls: int
+    :param seconds: Total duration in seconds, including nested stages.
+    :type seconds: float
+    :param allocated: Net memory in bytes allocated and still held after
+                      the calls, traced by tracemalloc, None if memory is
+                      not traced.
+    :type allocated: Optional[int]
+    """
+    name: str
+    calls: int = 0
+    seconds: float = 0.
+    allocated: Optional[int] = None
+
+    @property
+    def seconds_per_call(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.
+
+
+@dataclass
+class ProfileReport:
+    """
+    Per stage breakdown of a profiled run, stages are sorted by their total
+    duration.
+
+    :param seconds: Wall time of the profiled run in seconds.
+    :type seconds: float
+    :param stages: Measurements of each stage.
+    :type stages: List[StageStats]
+    :param counters: Values of the counters.
+    :type counters: Dict[str, int]
+    """
+    seconds: float
+    stages: List[StageStats] = field(default_factory=list)
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "seconds": self.seconds,
+            "stages": [
+                {
+                    "name": stats.name,
+                    "calls": stats.calls,
+                    "seconds": stats.seconds,
+                    "allocated": stats.allocated,
+                }
+                for stats in self.stages
+            ],
+            "counters": dict(self.counters),
+        }
+
+    def __str__(self) -> str:
+        lines = [
+            f"{'stage':<40} {'calls':>9} {'total':>11} {'per call':>11} "
+            f"{'share':>6} {'allocated':>11}"
+        ]
+        for stats in self.stages:
+            share = stats.seconds / self.seconds if self.seconds else 0.
+            allocated = (
+                "" if stats.allocated is None
+                else f"{stats.allocated / 2 ** 20:9.2f}MB"
+            )
+            lines.append(
+                f"{stats.name:<40} {stats.calls:>9} {stats.seconds * 1e3:9.1f}ms "
+                f"{stats.seconds_per_call * 1e6:9.1f}us {share:6.1%} "
+                f"{allocated:>11}"
+            )
+        lines.append(f"{'wall time':<40} {'':>9} {self.seconds * 1e3:9.1f}ms")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<40} {value:>9}")
+        return "\n".join(lines)
+
+
+class Profiler:
+    """
+    Record the stages and counters of the code run while the profiler is
+    active, i.e. the hot paths instrumented with `profiled`, `stage` and
+    `count`. Only a single profiler can be active at a time. Stages run in
+    worker processes, e.g. of `generate_multiple_graphs` with n_jobs > 1,
+    are not recorded.
+
+    :param record_functions: If True, each stage is also recorded as
+                             `torch.profiler.record_function` range, so it
+                             shows up in traces of `torch.profiler.profile`.
+    :type record_functions: bool
+    :param trace_memory: If True, the net memory allocated by each stage is
+                         traced with tracemalloc, which slows down
+                         allocation heavy code considerably.
+    :type trace_memory: bool
+
+    :example:
+
+        >>> with Profiler(record_functions=True) as profiler:
+        ...     trainer.fit(loader, epochs=1)
+        >>> print(profiler.report())
+
+        >>> profiler = Profiler().start()
+        >>> graphs, results = generate_multiple_graphs(1000, compact=True)
+        >>> print(profiler.report())
+        >>> profiler.stop()
+    """
+
+    def __init__(self, record_functions: bool = False, trace_memory: bool = False):
+
+        self.record_functions = record_functions
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Counter = Counter()
+        self._start: Optional[float] = None
+        self._seconds = 0.
+        self._stop_tracing = False
+
+    @property
+    def active(self) -> bool:
+        return _active is self
+
+    def start(self) -> "Profiler":
+        """
+        Activate the profiler. Measurements of previous runs are kept.
+        """
+
+        global _active
+        if _active is not None:
+            raise RuntimeError("Another profiler is already active.")
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stop_tracing = True
+        self._start = time.perf_counter()
+        _active = self
+        return self
+
+    def stop(self) -> "Profiler":
+        """
+        Deactivate the profiler.
+        """
+
+        global _active
+        if _active is self:
+            _active = None
+            self._seconds += time.perf_counter() - self._start
+            self._start = None
+            if self._stop_tracing:
+                tracemalloc.stop()
+                self._stop_tracing = False
+        return self
+
+    def reset(self):
+        """
+        Clear all measurements.
+        """
+
+        self.stages.clear()
+        self.counters.clear()
+        self._seconds = 0.
+        if self._start is not None:
+            self._start = time.perf_counter()
+
+    def report(self) -> ProfileReport:
+        """
+        Get the breakdown of the stages measured so far, also while the
+        profiler is active.
+        """
+
+        seconds = self._seconds
+        if self._start is not None:
+            seconds += time.perf_counter() - self._start
+        return ProfileReport(
+            seconds=seconds,
+            stages=sorted(
+                (
+                    StageStats(stats.name, stats.calls, stats.seconds, stats.allocated)
+                    for stats in self.stages.values()
+                ),
+                key=lambda stats: stats.seconds,
+                reverse=True
+            ),
+            counters=dict(self.counters)
+        )
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _NullStage:
+    """
+    Stage returned while profiling is disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+
+    __slots__ = ("profiler", "name", "start", "memory", "range")
+
+    def __init__(self, profiler: Profiler, name: str):
+
+        self.profiler = profiler
+        self.name = name
+        self.range = None
+
+    def __enter__(self):
+
+        if self.profiler.record_functions:
+            from torch.profiler import record_function
+            self.range = record_function(self.name)
+            self.range.__enter__()
+        if self.profiler.trace_memory:
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+
+        duration = time.perf_counter() - self.start
+        stats = self.profiler.stages.get(self.name)
+        if stats is None:
+            stats = self.profiler.stages[self.name] = StageStats(self.name)
+        stats.calls += 1
+        stats.seconds += duration
+        if self.profiler.trace_memory:
+            allocated = tracemalloc.get_traced_memory()[0] - self.memory
+            stats.allocated = (stats.allocated or 0) + allocated
+        if self.range is not None:
+            self.range.__exit__(*exc_info)
+        return False
+
+
+def stage(name: str):
+    """
+    Context manager measuring a block as stage of the active profiler, a
+    no-op if profiling is disabled.
+
+    :example:
+
+        >>> with stage("training.backward"):
+        ...     loss.backward()
+    """
+
+    profiler = _active
+    if profiler is None:
+        return _NULL_STAGE
+    return _Stage(profiler, name)
+
+
+def profiled(name: str) -> Callable[[F], F]:
+    """
+    Decorator measuring each call of a function as stage of the active
+    profiler. Decorated functions stay picklable.
+
+    :example:
+
+        >>> @profiled("preprocessing.transform")
+        ... def transform(X):
+        ...     ...
+    """
+
+    def decorator(func: F) -> F:
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with _Stage(profiler, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, n: int = 1):
+    """
+    Increment a counter of the active profiler, a no-op if profiling is
+    disabled.
+    """
+
+    profiler = _active
+    if profiler is not None:
+        profiler.counters[name] += n
@@ -0,0 +1,236 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+from torch.utils.data import Sampler
+
+
+@dataclass
+class EpochStats:
+    """
+    Statistics of the batches of an epoch.
+
+    :param n_batches: Number of batches.
+    :type n_batches: int
+    :param n_graphs: Number of graphs.
+    :type n_graphs: int
+    :param n_nodes: Number of nodes.
+    :type n_nodes: int
+    :param mean_graphs_per_batch: Mean number of graphs per batch.
+    :type mean_graphs_per_batch: float
+    :param mean_nodes_per_batch: Mean number of nodes per batch.
+    :type mean_nodes_per_batch: float
+    :param fill_ratio: Nodes per batch relative to the node budget.
+    :type fill_ratio: float
+    :param padding_ratio: Fraction of nodes, which would be padding if
+                          each graph of a batch was padded to the largest
+                          graph of the batch.
+    :type padding_ratio: float
+    :param imbalance: Coefficient of variation of the nodes per batch,
+                      i.e. a measure of the jitter of step times.
+    :type imbalance: float
+    :param seconds: Duration of the epoch, if recorded.
+    :type seconds: Optional[float]
+    """
+    n_batches: int
+    n_graphs: int
+    n_nodes: int
+    mean_graphs_per_batch: float
+    mean_nodes_per_batch: float
+    fill_ratio: float
+    padding_ratio: float
+    imbalance: float
+    seconds: Optional[float] = None
+
+    @property
+    def graphs_per_second(self) -> Optional[float]:
+        if not self.seconds:
+            return None
+        return self.n_graphs / self.seconds
+
+    @property
+    def nodes_per_second(self) -> Optional[float]:
+        if not self.seconds:
+            return None
+        return self.n_nodes / self.seconds
+
+
+def batch_stats(
+        batches: Sequence[Sequence[int]],
+        n_nodes: np.ndarray,
+        max_nodes: int,
+        seconds: Optional[float] = None
+) -> EpochStats:
+    """
+    Compute the statistics of batches of graphs.
+
+    :param batches: Graph indices of each batch.
+    :type batches: Sequence[Sequence[int]]
+    :param n_nodes: Number of nodes of each graph.
+    :type n_nodes: np.ndarray
+    :param max_nodes: Node budget of a batch.
+    :type max_nodes: int
+    :param seconds: Duration of the epoch.
+    :type seconds: Optional[float]
+
+    :returns: Statistics of the batches.
+    :rtype: EpochStats
+    """
+
+    graphs = np.array([len(batch) for batch in batches], dtype=np.int64)
+    nodes = np.array(
+        [n_nodes[batch].sum() for batch in batches], dtype=np.int64
+    )
+    padded = np.array(
+        [n_nodes[batch].max(initial=0) * len(batch) for batch in batches],
+        dtype=np.int64
+    )
+
+    n_batches = len(batches)
+    total_nodes = int(nodes.sum())
+    return EpochStats(
+        n_batches=n_batches,
+        n_graphs=int(graphs.sum()),
+        n_nodes=total_nodes,
+        mean_graphs_per_batch=float(graphs.mean()) if n_batches else 0.,
+        mean_nodes_per_batch=float(nodes.mean()) if n_batches else 0.,
+        fill_ratio=float(nodes.mean() / max_nodes) if n_batches else 0.,
+        padding_ratio=(
+            1. - total_nodes / padded.sum() if padded.sum() else 0.
+        ),
+        imbalance=(
+            float(nodes.std() / nodes.mean()) if total_nodes else 0.
+        ),
+        seconds=seconds
+    )
+
+
+class NodeBudgetBatchSampler(Sampler[List[int]]):
+    """
+    Batch sampler, which groups graphs of similar size into buckets and
+    forms batches with at most max_nodes nodes each, instead of a fixed
+    number of graphs. Hence, batches of small graphs hold more graphs,
+    all batches have a similar number of nodes and step times are stable.
+
+    In each epoch, graphs are shuffled within their bucket, packed into
+    batches and the batches of all buckets are shuffled. A graph larger
+    than max_nodes forms a batch on its own. The shuffling is reproducible
+    given the seed and the epoch, see `set_epoch`.
+
+    :param n_nodes: Number of nodes (or any other size, e.g. edges) of
+                    each graph.
+    :type n_nodes: Sequence[int]
+    :param max_nodes: Node budget of a batch.
+    :type max_nodes: int
+    :param n_buckets: Number of buckets of graph sizes, separated by
+                      quantiles. If None, each distinct size forms a
+                      bucket.
+    :type n_buckets: Optional[int]
+    :param shuffle: If False, graphs are batched in order of size.
+    :type shuffle: bool
+    :param drop_last: If True, the last, incomplete batch of each bucket
+                      is dropped.
+    :type drop_last: bool
+    :param seed: Seed for shuffling.
+    :type seed: int
+
+    :example:
+
+        >>> sampler = NodeBudgetBatchSampler.from_dataset(dataset, max_nodes=4096)
+        >>> loader = DataLoader(dataset, batch_sampler=sampler)
+    """
+
+    def __init__(
+            self,
+            n_nodes: Sequence[int],
+            max_nodes: int,
+            n_buckets: Optional[int] = None,
+            shuffle: bool = True,
+            drop_last: bool = False,
+            seed: int = 0):
+
+        self.n_nodes = np.asarray(n_nodes, dtype=np.int64)
+        self.max_nodes = max_nodes
+        self.n_buckets = n_buckets
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+        self.batches_: Optional[List[List[int]]] = None
+
+        if n_buckets is None:
+            boundaries = np.unique(self.n_nodes)[1:]
+        else:
+            boundaries = np.unique(
+                np.quantile(self.n_nodes, np.linspace(0, 1, n_buckets + 1)[1:-1])
+            )
+        bucket = np.searchsorted(boundaries, self.n_nodes, side="right")
+        self.buckets = [
+            np.flatnonzero(bucket == b) for b in range(len(boundaries) + 1)
+        ]
+
+    @classmethod
+    def from_dataset(cls, dataset, max_nodes: int, **kwargs) -> "NodeBudgetBatchSampler":
+        """
+        Create the sampler for a `arigin.preprocessing.GraphDataset` or a
+        `arigin.datastore.GraphDataStore`.
+        """
+
+        if hasattr(dataset, "n_nodes"):
+            n_nodes = dataset.n_nodes
+        else:
+            n_nodes = dataset.slices["x"].diff().numpy()
+        return cls(n_nodes, max_nodes, **kwargs)
+
+    def set_epoch(self, epoch: int):
+        """
+        Set the epoch, which determines the shuffling together with the
+        seed.
+        """
+        self.epoch = epoch
+        self.batches_ = None
+
+    def _batches(self) -> List[List[int]]:
+
+        rng = np.random.default_rng([self.seed, self.epoch])
+        batches = []
+        for indices in self.buckets:
+            if self.shuffle:
+                indices = rng.permutation(indices)
+            batch, nodes = [], 0
+            for index, size in zip(indices.tolist(), self.n_nodes[indices].tolist()):
+                if batch and nodes + size > self.max_nodes:
+                    batches.append(batch)
+                    batch, nodes = [], 0
+                batch.append(index)
+                nodes += size
+            # The last batch is incomplete, if another graph would fit
+            incomplete = nodes + self.n_nodes[indices].min(initial=0) <= self.max_nodes
+            if batch and not (self.drop_last and incomplete):
+                batches.append(batch)
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        self.batches_ = self._batches()
+        return iter(self.batches_)
+
+    def __len__(self) -> int:
+        if self.batches_ is None:
+            self.batches_ = self._batches()
+        return len(self.batches_)
+
+    def epoch_stats(self, seconds: Optional[float] = None) -> EpochStats:
+        """
+        Statistics of the batches of the current epoch.
+
+        :param seconds: Duration of the epoch to compute the throughput.
+        :type seconds: Optional[float]
+
+        :returns: Statistics of the batches.
+        :rtype: EpochStats
+        """
+        if self.batches_ is None:
+            self.batches_ = self._batches()
+        return batch_stats(self.batches_, self.n_nodes, self.max_nodes, seconds)
@@ -0,0 +1,519 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import collections
+import concurrent.futures
+import numpy as np
+import torch
+from typing import (
+    TYPE_CHECKING, Any, Callable, Deque, List, Optional, Sequence, Tuple, Union
+)
+
+from arigin.feature_spec import FEATURE_SPEC_FILE, FeatureSpec
+from arigin.graph.compact import GraphBatch
+from arigin.graph.generation import graph_from_expression
+from arigin.graph.models import MathModel
+from arigin.training import MODELS, build_model, predict
+
+if TYPE_CHECKING:
+    from arigin.preprocessing import GraphEntityToDataSet
+
+
+class Predictor:
+    """
+    Predict the results of arithmetic expressions with a trained model.
+
+    :param model: The trained model, e.g. MathModel.
+    :type model: torch.nn.Module
+    :param transformer: The feature spec or the fitted transformer used for
+                        training. Scaled targets are transformed back.
+    :type transformer: Union[FeatureSpec, GraphEntityToDataSet]
+    """
+
+    def __init__(
+            self,
+            model: torch.nn.Module,
+            transformer: Union[FeatureSpec, "GraphEntityToDataSet"]):
+
+        self.model = model.eval()
+        if not isinstance(transformer, FeatureSpec):
+            transformer = transformer.feature_spec()
+        self.feature_spec = transformer
+
+    @property
+    def batch_independent(self) -> bool:
+        """
+        Whether the prediction of an expression does not depend on the
+        other expressions of its batch. MathModel without graph_norm
+        normalizes across the whole batch.
+        """
+        return not (isinstance(self.model, MathModel) and not self.model.graph_norm)
+
+    @staticmethod
+    def parse(expression: str) -> GraphBatch:
+        """
+        Build the compact graph of an expression.
+
+        :raises TypeError: If the expression is not a string.
+        :raises ValueError: If the expression is invalid or has no
+                            operator.
+        """
+        if not isinstance(expression, str):
+            raise TypeError(
+                f"Expression must be a string, got {type(expression).__name__}."
+            )
+        graph = graph_from_expression(expression, compact=True)
+        if graph.n_nodes == 0:
+            raise ValueError("Expression must contain an operator.")
+        return graph
+
+    def predict_graphs(self, graphs: Sequence[GraphBatch]) -> List[float]:
+        """
+        Predict the results of parsed expressions in a single batch.
+        """
+
+        graph_batch = GraphBatch.concatenate(graphs)
+        data = self.feature_spec.transform(graph_batch)
+        data.ptr = torch.from_numpy(graph_batch.node_offsets)
+        with torch.inference_mode():
+            prediction = predict(self.model, data).numpy()
+        prediction = self.feature_spec.inverse_transform_target(prediction)
+        return prediction.reshape(-1).tolist()
+
+    def predict(self, expressions: Sequence[str]) -> List[float]:
+        """
+        Predict the results of expressions in a single batch.
+        """
+        return self.predict_graphs([self.parse(e) for e in expressions])
+
+
+class LatencyMetrics:
+    """
+    Latencies and batch sizes of the most recent requests.
+
+    :param window: Number of requests to keep.
+    :type window: int
+    """
+
+    def __init__(self, window: int = 10000):
+
+        self.latencies: Deque[float] = collections.deque(maxlen=window)
+        self.batch_sizes: Deque[int] = collections.deque(maxlen=window)
+        self.n_requests = 0
+        self.n_errors = 0
+        self.start = time.perf_counter()
+
+    def record(self, latency: float):
+        self.latencies.append(latency)
+        self.n_requests += 1
+
+    def record_batch(self, batch_size: int):
+        self.batch_sizes.append(batch_size)
+
+    def summary(self) -> dict:
+        latencies = np.array(self.latencies)
+        elapsed = time.perf_counter() - self.start
+        p50, p99 = (
+            np.percentile(latencies, [50, 99]) if len(latencies) else (0., 0.)
+        )
+        return {
+            "requests": self.n_requests,
+            "errors": self.n_errors,
+            "p50_ms": float(p50) * 1e3,
+            "p99_ms": float(p99) * 1e3,
+            "requests_per_second": self.n_requests / elapsed if elapsed else 0.,
+            "mean_batch_size": (
+                float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.
+            ),
+        }
+
+
+class MicroBatcher:
+    """
+    Collect concurrently submitted items into batches, which are processed
+    by a single call of process. A batch is processed when it holds
+    max_batch_size items or max_wait seconds after its first item arrived.
+    Batches are processed in a worker thread, so the event loop keeps
+    accepting items meanwhile.
+
+    :param process: Function returning one result per item of a batch.
+    :type process: Callable[[List[Any]], List[Any]]
+    :param max_batch_size: Maximum number of items per batch.
+    :type max_batch_size: int
+    :param max_wait: Maximum time in seconds to wait for more items.
+    :type max_wait: float
+    :param on_batch: Called with the size of each processed batch.
+    :type on_batch: Optional[Callable[[int], None]]
+    """
+
+    def __init__(
+            self,
+            process: Callable[[List[Any]], List[Any]],
+            max_batch_size: int = 64,
+            max_wait: float = 0.005,
+            on_batch: Optional[Callable[[int], None]] = None):
+
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.on_batch = on_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit an item and wait for its result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(self._queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.process, items
+                )
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            if self.on_batch is not None:
+                self.on_batch(len(items))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class InferenceServer:
+    """
+    Minimal HTTP server predicting results of expressions.
+
+    Endpoints:
+        - POST /predict with JSON body {"expression": "0.5 * 0.25"},
+          returns {"prediction": ...}
+        - GET /metrics returns latency percentiles and throughput
+
+    Expressions are parsed when a request arrives, concurrent requests are
+    predicted in micro-batches, see `MicroBatcher`. Models whose
+    predictions depend on the other graphs of a batch, see
+    `Predictor.batch_independent`, are only served with max_batch_size=1,
+    so a prediction never depends on the concurrent requests.
+
+    :param predictor: The predictor.
+    :type predictor: Predictor
+    :param host: Host to listen on.
+    :type host: str
+    :param port: Port to listen on, 0 for any free port.
+    :type port: int
+    :param max_batch_size: Maximum number of expressions per batch.
+    :type max_batch_size: int
+    :param max_wait: Maximum time in seconds to wait for more requests.
+    :type max_wait: float
+
+    :example:
+
+        >>> server = InferenceServer(Predictor(model, transformer), port=8000)
+        >>> asyncio.run(server.serve_forever())
+    """
+
+    def __init__(
+            self,
+            predictor: Predictor,
+            host: str = "127.0.0.1",
+            port: int = 8000,
+            max_batch_size: int = 64,
+            max_wait: float = 0.005):
+
+        if max_batch_size > 1 and not predictor.batch_independent:
+            raise ValueError(
+                "The predictions of the model depend on the other graphs of "
+                "a batch, serve a MathModel trained with graph_norm "
+                "(--graph-norm) or use max_batch_size=1 (--max-batch-size 1)."
+            )
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.metrics = LatencyMetrics()
+        self.batcher = MicroBatcher(
+            predictor.predict_graphs,
+            max_batch_size=max_batch_size,
+            max_wait=max_wait,
+            on_batch=self.metrics.record_batch
+        )
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self.batcher.start()
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _respond(self, request: Tuple[str, str, bytes]) -> Tuple[int, dict]:
+        method, path, body = request
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics.summary()
+        if method != "POST" or path != "/predict":
+            return 404, {"error": f"Unknown endpoint {method} {path}."}
+
+        start = time.perf_counter()
+        try:
+            graph = self.predictor.parse(json.loads(body)["expression"])
+        except (ValueError, KeyError, TypeError) as error:
+            self.metrics.n_errors += 1
+            return 400, {"error": str(error)}
+        try:
+            prediction = await self.batcher.submit(graph)
+        except Exception as error:
+            self.metrics.n_errors += 1
+            return 500, {"error": f"Prediction failed: {error!r}"}
+        self.metrics.record(time.perf_counter() - start)
+        return 200, {"prediction": prediction}
+
+    async def _handle(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError as error:
+                    # The rest of a malformed request cannot be skipped
+                    # reliably, hence the connection is closed
+                    self.metrics.n_errors += 1
+                    _write_response(writer, 400, {"error": str(error)})
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                status, content = await self._respond(request)
+                _write_response(writer, status, content)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_request(
+        reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes]]:
+    """
+    Read method, path and body of a HTTP/1.1 request, None if the
+    connection was closed.
+
+    :raises ValueError: If the request line or the content length is
+                        malformed.
+    """
+
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode().split()
+    if len(parts) != 3:
+        raise ValueError(f"Malformed request line {request_line!r}.")
+    method, path, _ = parts
+
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+            if content_length < 0:
+                raise ValueError(f"Invalid content length {content_length}.")
+
+    body = await reader.readexactly(content_length) if content_length else b""
+    return method, path, body
+
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    500: "Internal Server Error",
+}
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, content: dict):
+    body = json.dumps(content).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+
+
+def load_predictor(
+        model: str = "math",
+        hidden_channels: int = 32,
+        checkpoint: Optional[str] = None,
+        feature_spec: Optional[Union[str, FeatureSpec]] = None,
+        exported: Optional[str] = None,
+        graph_norm: bool = False) -> Predictor:
+    """
+    Create a predictor of a model trained by `arigin.training.main`.
+
+    :param model: Name of the model, see `arigin.training.MODELS`.
+    :type model: str
+    :param hidden_channels: Hidden channels of the model.
+    :type hidden_channels: int
+    :param checkpoint: Checkpoint of `arigin.training.Trainer`. If None,
+                       the model is untrained, e.g. for load tests.
+    :type checkpoint: Optional[str]
+    :param feature_spec: The FeatureSpec used for training or its path,
+                         defaults to the one stored next to the checkpoint.
+    :type feature_spec: Optional[Union[str, FeatureSpec]]
+    :param exported: Model exported by `arigin.export.export_model`,
+                     replacing model, hidden_channels and the weights of
+                     the checkpoint.
+    :type exported: Optional[str]
+    :param graph_norm: Normalize each graph separately in MathModel, must
+                       match the trained model. Only then predictions do
+                       not depend on the micro-batch of a request.
+    :type graph_norm: bool
+
+    :raises ValueError: If no feature spec is given or found next to the
+                        checkpoint.
+    """
+
+    if feature_spec is None and checkpoint is not None:
+        path = os.path.join(os.path.dirname(checkpoint), FEATURE_SPEC_FILE)
+        feature_spec = path if os.path.exists(path) else None
+
+    if feature_spec is None:
+        raise ValueError(
+            f"A feature spec is required, e.g. the {FEATURE_SPEC_FILE} stored "
+            "next to the checkpoint by arigin-train."
+        )
+    if isinstance(feature_spec, FeatureSpec):
+        spec = feature_spec
+    else:
+        spec = FeatureSpec.load(feature_spec)
+
+    if exported is not None:
+        from arigin.export import load_exported
+        return Predictor(load_exported(exported), spec)
+
+    module = build_model(
+        model,
+        in_channels=len(spec.node_columns),
+        edge_dim=2 * len(spec.edge_columns),
+        hidden_channels=hidden_channels,
+        graph_norm=graph_norm
+    )
+    if checkpoint is not None:
+        module.load_state_dict(
+            torch.load(checkpoint, map_location="cpu")["model"]
+        )
+    return Predictor(module, spec)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Command line interface to serve a trained model.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="arigin-serve",
+        description="Serve predictions of arithmetic expressions."
+    )
+    parser.add_argument(
+        "--checkpoint", default=None,
+        help="Checkpoint of `arigin.training.Trainer`, untrained if omitted."
+    )
+    parser.add_argument(
+        "--feature-spec", default=None,
+        help="Feature spec, defaults to the one next to the checkpoint."
+    )
+    parser.add_argument(
+        "--exported", default=None,
+        help="Model exported by arigin-export, replaces --model."
+    )
+    parser.add_argument("--model", choices=MODELS, default="math")
+    parser.add_argument("--hidden-channels", type=int, default=32)
+    parser.add_argument(
+        "--graph-norm", action="store_true",
+        help="MathModel was trained with --graph-norm."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.005)
+    args = parser.parse_args(argv)
+
+    try:
+        predictor = load_predictor(
+            args.model,
+            args.hidden_channels,
+            checkpoint=args.checkpoint,
+            feature_spec=args.feature_spec,
+            exported=args.exported,
+            graph_norm=args.graph_norm
+        )
+        server = InferenceServer(
+            predictor,
+            host=args.host,
+            port=args.port,
+            max_batch_size=args.max_batch_size,
+            max_wait=args.max_wait
+        )
+    except ValueError as error:
+        parser.error(str(error))
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
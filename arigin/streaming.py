@@ -0,0 +1,149 @@
+import random
+import itertools
+import torch
+from typing import Iterator, Optional
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+from torch_geometric.data import Batch
+
+from arigin.graph.generation import generate_graphs, iter_shard_seeds
+from arigin.preprocessing import GraphEntityToDataSet
+
+
+class GeneratedGraphDataset(IterableDataset):
+    """
+    Stream of batches of freshly generated graphs, i.e. expressions are
+    generated, turned into graphs and featurized on the fly, without ever
+    materializing a dataset.
+
+    Each batch is generated with its own random number generator, seeded
+    from the stream of `arigin.graph.generation.iter_shard_seeds` of the
+    seed and the epoch. Data loader workers take turns on this stream, so
+    the batches of an epoch do not depend on the number of workers (up to
+    their order) and differ between epochs, see `set_epoch`.
+
+    The fitted transformer is part of the dataset, hence it is shared with
+    the workers, when they are started.
+
+    :param transformer: Fitted transformer to featurize the graphs. If
+                        None, a GraphEntityToDataSet is fitted on a sample
+                        batch.
+    :type transformer: Optional[GraphEntityToDataSet]
+    :param batch_size: Number of expressions per batch. Expressions
+                       dividing by zero are skipped, hence batches may
+                       hold slightly fewer graphs.
+    :type batch_size: int
+    :param n_batches: Number of batches per epoch. If None, the stream is
+                      endless.
+    :type n_batches: Optional[int]
+    :param min_numbers: The minimum number of numbers in each expression.
+    :type min_numbers: int
+    :param max_numbers: The maximum number of numbers in each expression.
+    :type max_numbers: int
+    :param seed: Master seed, if None fresh entropy is used.
+    :type seed: Optional[int]
+
+    :example:
+
+        >>> dataset = GeneratedGraphDataset(batch_size=256, n_batches=100, seed=0)
+        >>> loader = streaming_loader(dataset, num_workers=4)
+    """
+
+    def __init__(
+            self,
+            transformer: Optional[GraphEntityToDataSet] = None,
+            batch_size: int = 64,
+            n_batches: Optional[int] = None,
+            min_numbers: int = 2,
+            max_numbers: int = 4,
+            seed: Optional[int] = None):
+
+        super().__init__()
+        self.batch_size = batch_size
+        self.n_batches = n_batches
+        self.min_numbers = min_numbers
+        self.max_numbers = max_numbers
+        self.seed = seed
+        self.epoch = 0
+
+        if transformer is None:
+            graphs, results = generate_graphs(
+                batch_size, min_numbers, max_numbers,
+                rng=random.Random(seed), compact=True
+            )
+            transformer = GraphEntityToDataSet().fit(graphs, results)
+        self.transformer = transformer
+
+    def set_epoch(self, epoch: int):
+        """
+        Set the epoch, which determines the generated graphs together with
+        the seed. Workers are passed the epoch when they are started, i.e.
+        this requires a data loader without persistent workers.
+        """
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        if self.n_batches is None:
+            raise TypeError("An endless stream has no length.")
+        return self.n_batches
+
+    def batch(self, seed: int) -> Batch:
+        """
+        Generate and featurize a single batch.
+        """
+
+        graphs, results = generate_graphs(
+            self.batch_size,
+            self.min_numbers,
+            self.max_numbers,
+            rng=random.Random(seed),
+            compact=True
+        )
+        data = self.transformer.transform(graphs, results)
+        return Batch(
+            x=data.x,
+            edge_index=data.edge_index,
+            edge_attr=data.edge_attr,
+            y=data.y.reshape(-1, 1),
+            batch=data.batch,
+            ptr=torch.from_numpy(graphs.node_offsets),
+            depth=data.depth,
+            topo_rank=data.topo_rank,
+            root_index=data.root_index
+        )
+
+    def __iter__(self) -> Iterator[Batch]:
+
+        worker_info = get_worker_info()
+        worker_id, num_workers = (
+            (0, 1) if worker_info is None
+            else (worker_info.id, worker_info.num_workers)
+        )
+
+        seeds = iter_shard_seeds(
+            None if self.seed is None else [self.seed, self.epoch]
+        )
+        seeds = itertools.islice(seeds, worker_id, self.n_batches, num_workers)
+        for seed in seeds:
+            yield self.batch(seed)
+
+
+def streaming_loader(
+        dataset: GeneratedGraphDataset,
+        num_workers: int = 0,
+        pin_memory: bool = False,
+        prefetch_factor: Optional[int] = None) -> DataLoader:
+    """
+    Create a data loader of the batches of a GeneratedGraphDataset. The
+    batches are generated by num_workers worker processes, each
+    prefetching prefetch_factor batches, and optionally copied into pinned
+    memory for fast transfer to the GPU.
+    """
+
+    return DataLoader(
+        dataset,
+        batch_size=None,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        prefetch_factor=prefetch_factor if num_workers else None,
+        persistent_workers=False
+    )
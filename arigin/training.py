@@ -0,0 +1,487 @@
+import os
+import time
+import resource
+import argparse
+import torch
+import torch.nn.functional as F
+from dataclasses import dataclass, asdict
+from typing import Callable, Iterable, List, Optional, Sequence
+from torch_geometric.data import Data
+from torch_geometric.loader import DataLoader
+
+from arigin.feature_spec import FEATURE_SPEC_FILE
+from arigin.graph.models import GCN, LevelModel, MathModel
+from arigin.profiling import Profiler, count, profiled, stage
+from arigin.sampling import NodeBudgetBatchSampler
+
+MODELS = ("math", "gcn", "level")
+
+
+@dataclass
+class EpochMetrics:
+    """
+    Metrics of a training epoch.
+
+    :param epoch: Index of the epoch.
+    :type epoch: int
+    :param loss: Mean loss per graph.
+    :type loss: float
+    :param n_graphs: Number of graphs processed.
+    :type n_graphs: int
+    :param n_nodes: Number of nodes processed.
+    :type n_nodes: int
+    :param data_seconds: Time spent waiting for batches of the loader.
+    :type data_seconds: float
+    :param compute_seconds: Time spent in forward, backward and optimizer
+                            steps.
+    :type compute_seconds: float
+    :param peak_memory: Peak memory in bytes, i.e. the maximum allocated
+                        CUDA memory or the maximum resident set size of
+                        the process on CPU.
+    :type peak_memory: int
+    :param val_loss: Mean loss per graph of the validation data, if given.
+    :type val_loss: Optional[float]
+    """
+    epoch: int
+    loss: float
+    n_graphs: int
+    n_nodes: int
+    data_seconds: float
+    compute_seconds: float
+    peak_memory: int
+    val_loss: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return self.data_seconds + self.compute_seconds
+
+    @property
+    def graphs_per_second(self) -> float:
+        return self.n_graphs / self.seconds if self.seconds else 0.
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.n_nodes / self.seconds if self.seconds else 0.
+
+    def __str__(self) -> str:
+        text = (
+            f"Epoch {self.epoch:05d} | Loss {self.loss:.6f} | "
+            f"{self.graphs_per_second:.0f} graphs/s | "
+            f"{self.nodes_per_second:.0f} nodes/s | "
+            f"data {self.data_seconds:.2f}s | "
+            f"compute {self.compute_seconds:.2f}s | "
+            f"peak memory {self.peak_memory / 2 ** 20:.0f} MiB"
+        )
+        if self.val_loss is not None:
+            text += f" | Val loss {self.val_loss:.6f}"
+        return text
+
+
+def peak_memory(device: torch.device) -> int:
+    """
+    Get the peak memory in bytes of the device.
+    """
+    if device.type == "cuda":
+        return torch.cuda.max_memory_allocated(device)
+    # ru_maxrss is given in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@profiled("model.forward")
+def predict(model: torch.nn.Module, batch: Data) -> torch.Tensor:
+    """
+    Predict the result of each graph of a batch. MathModel and LevelModel
+    predict on graph level, LevelModel (also when scripted, see
+    `arigin.export`) using the topological ranks of the batch, if
+    available. GCN predicts on node level, hence its prediction
+    of the root operator, which is the last node of each graph, is used.
+    """
+
+    module = getattr(model, "_orig_mod", model)
+    if isinstance(module, GCN):
+        out = model(batch.x, batch.edge_index, None)
+        return out[batch.ptr[1:] - 1]
+    if (isinstance(module, LevelModel)
+            or getattr(module, "original_name", None) == LevelModel.__name__):
+        return model(
+            batch.x, batch.edge_index, batch.edge_attr, batch.batch,
+            topo_rank=getattr(batch, "topo_rank", None)
+        )
+    return model(batch.x, batch.edge_index, batch.edge_attr, batch.batch)
+
+
+class Trainer:
+    """
+    Train a model predicting the result of each graph.
+
+    :param model: The model, e.g. MathModel or GCN.
+    :type model: torch.nn.Module
+    :param optimizer: The optimizer, defaults to Adam.
+    :type optimizer: Optional[torch.optim.Optimizer]
+    :param lr: Learning rate of the default optimizer.
+    :type lr: float
+    :param loss: Loss function of prediction and target.
+    :type loss: Callable
+    :param accumulation_steps: Number of batches, whose gradients are
+                               accumulated before each optimizer step.
+    :type accumulation_steps: int
+    :param bf16: If True, forward passes run under bfloat16 autocast.
+    :type bf16: bool
+    :param compile: If True, the model is compiled with torch.compile.
+    :type compile: bool
+    :param checkpoint_dir: If given, a checkpoint is stored after each
+                           epoch.
+    :type checkpoint_dir: Optional[str]
+    :param device: Device to train on.
+    :type device: str
+
+    :example:
+
+        >>> trainer = Trainer(MathModel(9, 16, 32, 1, edge_dim=4), bf16=True)
+        >>> history = trainer.fit(loader, epochs=10)
+    """
+
+    def __init__(
+            self,
+            model: torch.nn.Module,
+            optimizer: Optional[torch.optim.Optimizer] = None,
+            lr: float = 5e-4,
+            loss: Callable = F.l1_loss,
+            accumulation_steps: int = 1,
+            bf16: bool = False,
+            compile: bool = False,
+            checkpoint_dir: Optional[str] = None,
+            device: str = "cpu"):
+
+        self.device = torch.device(device)
+        self.model = model.to(self.device)
+        self.optimizer = optimizer or torch.optim.Adam(
+            self.model.parameters(), lr=lr
+        )
+        self.loss = loss
+        self.accumulation_steps = max(accumulation_steps, 1)
+        self.bf16 = bf16
+        self.checkpoint_dir = checkpoint_dir
+        self.epoch = 0
+        self.history: List[EpochMetrics] = []
+
+        self._forward_model = torch.compile(self.model) if compile else self.model
+
+    def _autocast(self):
+        return torch.autocast(
+            self.device.type, dtype=torch.bfloat16, enabled=self.bf16
+        )
+
+    def _step_loss(self, batch: Data) -> torch.Tensor:
+        with self._autocast():
+            prediction = predict(self._forward_model, batch)
+        return self.loss(prediction.float(), batch.y.view_as(prediction))
+
+    def train_epoch(self, loader: Iterable[Data]) -> EpochMetrics:
+        """
+        Train one epoch.
+
+        :param loader: Batches of graphs with "batch" and "ptr", e.g. of
+                       `torch_geometric.loader.DataLoader`.
+        :type loader: Iterable[Data]
+
+        :returns: Metrics of the epoch.
+        :rtype: EpochMetrics
+        """
+
+        for epoch_dependent in (
+                getattr(loader, "batch_sampler", None),
+                getattr(loader, "dataset", None)):
+            if hasattr(epoch_dependent, "set_epoch"):
+                epoch_dependent.set_epoch(self.epoch)
+
+        self.model.train()
+        self.optimizer.zero_grad()
+        total_loss = 0.
+        n_graphs = n_nodes = n_steps = 0
+        data_seconds = compute_seconds = 0.
+
+        batches = iter(loader)
+        while True:
+            start = time.perf_counter()
+            with stage("training.data"):
+                batch = next(batches, None)
+            data_seconds += time.perf_counter() - start
+            if batch is None:
+                break
+
+            start = time.perf_counter()
+            batch = batch.to(self.device)
+            loss = self._step_loss(batch)
+            with stage("training.backward"):
+                (loss / self.accumulation_steps).backward()
+            n_steps += 1
+            if n_steps % self.accumulation_steps == 0:
+                with stage("training.optimizer_step"):
+                    self.optimizer.step()
+                    self.optimizer.zero_grad()
+            compute_seconds += time.perf_counter() - start
+            count("training.graphs", batch.num_graphs)
+            count("training.nodes", batch.num_nodes)
+
+            total_loss += loss.item() * batch.num_graphs
+            n_graphs += batch.num_graphs
+            n_nodes += batch.num_nodes
+
+        if remainder := n_steps % self.accumulation_steps:
+            start = time.perf_counter()
+            # The losses of the last remainder batches were divided by
+            # accumulation_steps, rescale to their mean like a full window
+            with torch.no_grad():
+                for parameter in self.model.parameters():
+                    if parameter.grad is not None:
+                        parameter.grad.mul_(self.accumulation_steps / remainder)
+            self.optimizer.step()
+            self.optimizer.zero_grad()
+            compute_seconds += time.perf_counter() - start
+
+        metrics = EpochMetrics(
+            epoch=self.epoch,
+            loss=total_loss / max(n_graphs, 1),
+            n_graphs=n_graphs,
+            n_nodes=n_nodes,
+            data_seconds=data_seconds,
+            compute_seconds=compute_seconds,
+            peak_memory=peak_memory(self.device)
+        )
+        self.epoch += 1
+        return metrics
+
+    @torch.no_grad()
+    def evaluate(self, loader: Iterable[Data]) -> float:
+        """
+        Get the mean loss per graph of the batches of loader.
+        """
+
+        self.model.eval()
+        total_loss = 0.
+        n_graphs = 0
+        for batch in loader:
+            batch = batch.to(self.device)
+            total_loss += self._step_loss(batch).item() * batch.num_graphs
+            n_graphs += batch.num_graphs
+        return total_loss / max(n_graphs, 1)
+
+    def fit(
+            self,
+            loader: Iterable[Data],
+            epochs: int = 1,
+            val_loader: Optional[Iterable[Data]] = None,
+            callback: Optional[Callable[[EpochMetrics], None]] = None
+    ) -> List[EpochMetrics]:
+        """
+        Train several epochs.
+
+        :param loader: Batches of training graphs.
+        :type loader: Iterable[Data]
+        :param epochs: Number of epochs.
+        :type epochs: int
+        :param val_loader: Batches of validation graphs.
+        :type val_loader: Optional[Iterable[Data]]
+        :param callback: Called with the metrics after each epoch.
+        :type callback: Optional[Callable[[EpochMetrics], None]]
+
+        :returns: Metrics of each epoch.
+        :rtype: List[EpochMetrics]
+        """
+
+        for _ in range(epochs):
+            metrics = self.train_epoch(loader)
+            if val_loader is not None:
+                metrics.val_loss = self.evaluate(val_loader)
+            self.history.append(metrics)
+            if self.checkpoint_dir is not None:
+                self.save_checkpoint(
+                    os.path.join(self.checkpoint_dir, "checkpoint.pt")
+                )
+            if callback is not None:
+                callback(metrics)
+
+        return self.history
+
+    def save_checkpoint(self, path: str):
+        """
+        Store the state of model and optimizer and the metrics.
+        """
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        torch.save(
+            {
+                "epoch": self.epoch,
+                "model": self.model.state_dict(),
+                "optimizer": self.optimizer.state_dict(),
+                "history": [asdict(metrics) for metrics in self.history],
+            },
+            path
+        )
+
+    def load_checkpoint(self, path: str):
+        """
+        Restore the state of model and optimizer and the metrics.
+        """
+
+        checkpoint = torch.load(path, map_location=self.device)
+        self.model.load_state_dict(checkpoint["model"])
+        self.optimizer.load_state_dict(checkpoint["optimizer"])
+        self.epoch = checkpoint["epoch"]
+        self.history = [
+            EpochMetrics(**metrics) for metrics in checkpoint["history"]
+        ]
+
+
+def build_model(
+        name: str,
+        in_channels: int,
+        edge_dim: int,
+        hidden_channels: int = 32,
+        emb_channels: int = 16,
+        graph_norm: bool = False) -> torch.nn.Module:
+    """
+    Create a model by name, see MODELS. graph_norm only applies to
+    MathModel.
+    """
+
+    if name == "math":
+        return MathModel(
+            in_channels=in_channels,
+            emb_channels=emb_channels,
+            hidden_channels=hidden_channels,
+            out_channels=1,
+            edge_dim=edge_dim,
+            graph_norm=graph_norm
+        )
+    if name == "gcn":
+        return GCN(
+            in_channels=in_channels,
+            hidden_channels=hidden_channels,
+            emb_channels=hidden_channels,
+            out_channels=1
+        )
+    if name == "level":
+        return LevelModel(
+            in_channels=in_channels,
+            hidden_channels=hidden_channels,
+            emb_channels=emb_channels,
+            out_channels=1,
+            edge_dim=edge_dim
+        )
+    raise ValueError(f"Unknown model '{name}', expected one of {MODELS}.")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Command line interface to train a model on generated or cached graphs.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="arigin-train",
+        description="Train a model on arithmetic expression graphs."
+    )
+    parser.add_argument("--model", choices=MODELS, default="math")
+    parser.add_argument("--n-graphs", type=int, default=10000)
+    parser.add_argument("--min-numbers", type=int, default=2)
+    parser.add_argument("--max-numbers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="Load the graphs from the dataset cache, building it if missing."
+    )
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument(
+        "--max-nodes", type=int, default=None,
+        help="Node budget per batch, replaces --batch-size."
+    )
+    parser.add_argument("--hidden-channels", type=int, default=32)
+    parser.add_argument(
+        "--graph-norm", action="store_true",
+        help="Normalize each graph separately in MathModel."
+    )
+    parser.add_argument("--lr", type=float, default=5e-4)
+    parser.add_argument("--accumulation-steps", type=int, default=1)
+    parser.add_argument("--bf16", action="store_true")
+    parser.add_argument("--compile", action="store_true")
+    parser.add_argument("--checkpoint-dir", default=None)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Print the time spent per stage, see arigin.profiling."
+    )
+    args = parser.parse_args(argv)
+
+    profiler = Profiler(record_functions=True).start() if args.profile else None
+
+    if args.cache:
+        from arigin.datastore import DEFAULT_CACHE_DIR, cached_dataset
+        dataset = cached_dataset(
+            args.n_graphs,
+            args.min_numbers,
+            args.max_numbers,
+            seed=args.seed,
+            n_jobs=args.n_jobs,
+            cache_dir=args.cache_dir or DEFAULT_CACHE_DIR
+        )
+        feature_spec = dataset.feature_spec
+    else:
+        from arigin.graph.generation import generate_multiple_graphs
+        from arigin.preprocessing import GraphEntityToDataSet
+        graphs, results = generate_multiple_graphs(
+            args.n_graphs,
+            args.min_numbers,
+            args.max_numbers,
+            n_jobs=args.n_jobs,
+            seed=args.seed,
+            compact=True
+        )
+        transformer = GraphEntityToDataSet().fit(graphs, results)
+        dataset = transformer.transform_dataset(graphs, results)
+        feature_spec = transformer.feature_spec()
+
+    if args.checkpoint_dir is not None and feature_spec is not None:
+        # Stored next to the checkpoints for `arigin.serving`
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+        feature_spec.save(os.path.join(args.checkpoint_dir, FEATURE_SPEC_FILE))
+
+    if args.max_nodes is None:
+        loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True)
+    else:
+        loader = DataLoader(
+            dataset,
+            batch_sampler=NodeBudgetBatchSampler.from_dataset(
+                dataset, args.max_nodes, seed=args.seed
+            )
+        )
+
+    sample = dataset[0]
+    torch.manual_seed(args.seed)
+    model = build_model(
+        args.model,
+        in_channels=sample.num_node_features,
+        edge_dim=sample.num_edge_features,
+        hidden_channels=args.hidden_channels,
+        graph_norm=args.graph_norm
+    )
+    trainer = Trainer(
+        model,
+        lr=args.lr,
+        accumulation_steps=args.accumulation_steps,
+        bf16=args.bf16,
+        compile=args.compile,
+        checkpoint_dir=args.checkpoint_dir,
+        device=args.device
+    )
+    trainer.fit(loader, epochs=args.epochs, callback=print)
+
+    if profiler is not None:
+        print(profiler.stop().report())
+
+
+if __name__ == "__main__":
+    main()
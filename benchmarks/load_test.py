@@ -0,0 +1,163 @@
+"""
+Load test of the inference server.
+
+Send concurrent prediction requests and report latency percentiles and
+throughput, as seen by the clients and by the server:
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 64
+
+Without --port, a local instance serving an untrained MathModel with
+per graph normalization is started in this process. To test a running server, e.g. `arigin-serve --port 8000`,
+pass its --host and --port.
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import numpy as np
+from typing import List, Optional, Tuple
+
+from arigin.expressions import generate
+from arigin.graph.generation import graph_from_expression
+from arigin.preprocessing import GraphEntityToDataSet
+from arigin.serving import InferenceServer, load_predictor
+
+SEED = 0
+
+
+async def _request(
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        method: str,
+        path: str,
+        content: Optional[dict] = None) -> Tuple[int, dict]:
+
+    body = json.dumps(content).encode() if content is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    return status, json.loads(await reader.readexactly(content_length))
+
+
+async def _client(
+        host: str,
+        port: int,
+        expressions: List[str],
+        latencies: List[float]):
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for expression in expressions:
+            start = time.perf_counter()
+            status, _ = await _request(
+                reader, writer, "POST", "/predict", {"expression": expression}
+            )
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def load_test(
+        host: str,
+        port: int,
+        n_requests: int,
+        concurrency: int) -> dict:
+    """
+    Send n_requests requests of random expressions over concurrency
+    connections, each sending its next request after the previous response.
+    """
+
+    rng = random.Random(SEED)
+    expressions = [generate(2, 4, rng=rng) for _ in range(n_requests)]
+    latencies: List[float] = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, expressions[i::concurrency], latencies)
+        for i in range(concurrency)
+    ))
+    duration = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server_metrics = await _request(reader, writer, "GET", "/metrics")
+    writer.close()
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        "client": {
+            "requests": len(latencies),
+            "errors": n_requests - len(latencies),
+            "p50_ms": float(p50) * 1e3,
+            "p99_ms": float(p99) * 1e3,
+            "requests_per_second": len(latencies) / duration,
+        },
+        "server": server_metrics,
+    }
+
+
+async def _run(args) -> dict:
+
+    if args.port is not None:
+        return await load_test(
+            args.host, args.port, args.requests, args.concurrency
+        )
+
+    # The default featurizers do not depend on the fitted graphs
+    spec = GraphEntityToDataSet().fit(
+        graph_from_expression("0.5 * 0.25", compact=True), None
+    ).feature_spec()
+    server = InferenceServer(
+        load_predictor(feature_spec=spec, graph_norm=True),
+        host=args.host,
+        port=0,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait
+    )
+    await server.start()
+    try:
+        return await load_test(
+            args.host, server.port, args.requests, args.concurrency
+        )
+    finally:
+        await server.close()
+
+
+def main(argv=None) -> int:
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument(
+        "--max-batch-size", type=int, default=64,
+        help="Batch size of the local instance."
+    )
+    parser.add_argument(
+        "--max-wait", type=float, default=0.005,
+        help="Maximum wait in seconds of the local instance."
+    )
+    args = parser.parse_args(argv)
+
+    print(json.dumps(asyncio.run(_run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
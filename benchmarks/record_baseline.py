@@ -0,0 +1,52 @@
+"""
+Record the benchmark baseline of a base commit on this machine.
+
+The base commit is checked out into a temporary git worktree and its
+benchmarks are run with the current Python environment, so the baseline
+and later runs share the environment:
+
+    python -m benchmarks.record_baseline main --output benchmarks/baseline.json
+
+Further arguments are passed on to `benchmarks.run`, e.g. --suite or
+--threads, which must match the later runs.
+"""
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main(argv=None) -> int:
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("ref", help="Base commit, e.g. a branch or tag.")
+    parser.add_argument(
+        "--output", default=os.path.join(ROOT, "benchmarks", "baseline.json")
+    )
+    args, run_args = parser.parse_known_args(argv)
+    output = os.path.abspath(args.output)
+
+    with tempfile.TemporaryDirectory() as worktree:
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", worktree, args.ref],
+            cwd=ROOT, check=True
+        )
+        try:
+            return subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--output", output]
+                + run_args,
+                cwd=worktree,
+                env={**os.environ, "PYTHONPATH": worktree}
+            ).returncode
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", worktree],
+                cwd=ROOT, check=True
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
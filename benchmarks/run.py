@@ -0,0 +1,233 @@
+"""
+Benchmarks of the data and model pipeline.
+
+Run all benchmarks, store the results and compare them with a baseline:
+
+    python -m benchmarks.run --output results.json --baseline benchmarks/baseline.json
+
+Timings only compare within the same environment, so the baseline is
+recorded on the machine checking for regressions, by running the
+benchmarks of the base commit, see `benchmarks.record_baseline`:
+
+    python -m benchmarks.record_baseline main
+
+A baseline of another environment is rejected. The exit code is 1, if any
+benchmark is slower than its baseline by more than the tolerance.
+"""
+import sys
+import random
+import argparse
+import torch
+import numpy as np
+from typing import Callable, Dict, List
+
+from arigin import features
+from arigin.expressions import generate, generate_batch
+from arigin.benchmarking import (
+    BenchmarkResult, benchmark, compare, load_environment, load_results,
+    save_results
+)
+from arigin.graph.compact import GraphBatch
+from arigin.graph.generation import generate_multiple_graphs, graph_from_expression
+from arigin.preprocessing import GraphEntityToDataSet
+from arigin.training import build_model, predict
+from torch_geometric.loader import DataLoader
+
+SEED = 0
+
+
+def bench_expressions(repeat: int, scale: int) -> List[BenchmarkResult]:
+
+    n = 1000 * scale
+    random.seed(SEED)
+    return [
+        benchmark(
+            f"expressions.generate[n={n}]",
+            lambda: [generate(2, 4) for _ in range(n)],
+            repeat=repeat,
+            n_items=n
+        ),
+        benchmark(
+            f"expressions.generate_batch[n={n}]",
+            lambda: generate_batch(n, 2, 4, seed=SEED),
+            repeat=repeat,
+            n_items=n
+        ),
+    ]
+
+
+def bench_graph_from_expression(repeat: int, scale: int) -> List[BenchmarkResult]:
+
+    n = 200 * scale
+    results = []
+    for max_numbers in (2, 4, 8, 16):
+        random.seed(SEED)
+        expressions = [generate(max_numbers, max_numbers) for _ in range(n)]
+        for engine in ("parser", "regex"):
+            results.append(
+                benchmark(
+                    f"graph_from_expression[engine={engine},numbers={max_numbers}]",
+                    lambda: [
+                        graph_from_expression(expression, engine=engine)
+                        for expression in expressions
+                    ],
+                    repeat=repeat,
+                    n_items=n,
+                    engine=engine,
+                    max_numbers=max_numbers
+                )
+            )
+    return results
+
+
+def bench_features(repeat: int, scale: int) -> List[BenchmarkResult]:
+
+    n = 1000 * scale
+    graphs, _ = generate_multiple_graphs(n, 2, 4, seed=SEED)
+    graph_batch = GraphBatch.from_entities(graphs)
+    nodes = graphs["nodes"]
+    relationships = graphs["relationships"]
+
+    transformers: Dict[str, tuple] = {
+        "node_features": (features.node_features, nodes),
+        "node_features_emb": (features.node_features_emb, nodes),
+        "node_features_values": (features.node_features_values, nodes),
+        "edge_features": (features.edge_features, relationships),
+        "fast_node_features": (features.fast_node_features, nodes),
+        "fast_node_features[GraphBatch]": (features.fast_node_features, graph_batch),
+        "fast_edge_features": (features.fast_edge_features, relationships),
+        "fast_edge_features[GraphBatch]": (features.fast_edge_features, graph_batch),
+    }
+
+    results = []
+    for name, (transformer, X) in transformers.items():
+        transformer.fit(X)
+        results.append(
+            benchmark(
+                f"features.{name}.transform[graphs={n}]",
+                lambda: transformer.transform(X),
+                repeat=repeat,
+                n_items=n
+            )
+        )
+    return results
+
+
+def bench_transform(repeat: int, scale: int) -> List[BenchmarkResult]:
+
+    n = 1000 * scale
+    graphs, y = generate_multiple_graphs(n, 2, 4, seed=SEED)
+    graph_batch = GraphBatch.from_entities(graphs)
+
+    results = []
+    for name, X in (("entities", graphs), ("GraphBatch", graph_batch)):
+        transformer = GraphEntityToDataSet().fit(X, y)
+        results.append(
+            benchmark(
+                f"GraphEntityToDataSet.transform[{name},graphs={n}]",
+                lambda: transformer.transform(X, y),
+                repeat=repeat,
+                n_items=n,
+                measure_memory=True
+            )
+        )
+    return results
+
+
+def bench_models(repeat: int, scale: int) -> List[BenchmarkResult]:
+
+    graphs, y = generate_multiple_graphs(1024, 2, 4, seed=SEED, compact=True)
+    dataset = GraphEntityToDataSet().fit(graphs, y).transform_dataset(graphs, y)
+
+    results = []
+    for name in ("math", "gcn", "level"):
+        for batch_size in (16, 128, 1024):
+            batch = next(iter(DataLoader(dataset, batch_size=batch_size)))
+            torch.manual_seed(SEED)
+            model = build_model(
+                name, batch.num_node_features, batch.num_edge_features
+            )
+
+            def forward():
+                with torch.no_grad():
+                    predict(model, batch)
+
+            def forward_backward():
+                model.zero_grad()
+                predict(model, batch).sum().backward()
+
+            for step, func in (
+                    ("forward", forward), ("forward_backward", forward_backward)):
+                results.append(
+                    benchmark(
+                        f"{name}.{step}[batch_size={batch_size}]",
+                        func,
+                        repeat=repeat,
+                        n_items=batch_size,
+                        model=name,
+                        batch_size=batch_size
+                    )
+                )
+    return results
+
+
+SUITES: Dict[str, Callable[[int, int], List[BenchmarkResult]]] = {
+    "expressions": bench_expressions,
+    "graph_from_expression": bench_graph_from_expression,
+    "features": bench_features,
+    "transform": bench_transform,
+    "models": bench_models,
+}
+
+
+def main(argv=None) -> int:
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--suite", choices=SUITES, action="append")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--scale", type=int, default=1, help="Multiplier of the problem sizes."
+    )
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+    np.random.seed(SEED)
+
+    results = []
+    for suite in args.suite or SUITES:
+        for result in SUITES[suite](args.repeat, args.scale):
+            line = (
+                f"{result.name:<60} {result.median * 1e3:10.3f}ms "
+                f"{result.items_per_second:12.0f} items/s"
+            )
+            if result.peak_memory is not None:
+                line += f" {result.peak_memory / 2 ** 20:10.1f} MiB peak"
+            print(line)
+            results.append(result)
+
+    if args.output is not None:
+        save_results(results, args.output)
+
+    if args.baseline is not None:
+        comparisons = compare(
+            results,
+            load_results(args.baseline),
+            args.tolerance,
+            baseline_environment=load_environment(args.baseline)
+        )
+        print()
+        for comparison in comparisons:
+            print(comparison)
+        if any(comparison.regression for comparison in comparisons):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
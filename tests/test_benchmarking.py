@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from arigin.benchmarking import (
+    BenchmarkResult,
+    benchmark,
+    compare,
+    environment,
+    load_environment,
+    load_results,
+    peak_traced_memory,
+    save_results,
+)
+
+
+def test_benchmark():
+    calls = []
+    result = benchmark(
+        "append", calls.append, setup=lambda: (1,), repeat=3, warmup=2,
+        n_items=10, size=1
+    )
+
+    assert len(calls) == 5
+    assert len(result.times) == 3
+    assert result.params == {"size": 1}
+    assert result.items_per_second == pytest.approx(10 / result.median)
+
+
+def test_save_and_load_results(tmp_path):
+    results = [BenchmarkResult("a", [0.1, 0.3, 0.2], n_items=5, params={"n": 1})]
+    save_results(results, tmp_path / "results.json")
+
+    assert load_results(tmp_path / "results.json") == results
+
+
+def test_compare():
+    baseline = [BenchmarkResult("a", [1.]), BenchmarkResult("b", [1.])]
+    results = [
+        BenchmarkResult("a", [1.05]),
+        BenchmarkResult("b", [1.5]),
+        BenchmarkResult("c", [1.]),
+    ]
+    comparisons = compare(results, baseline, tolerance=0.1)
+
+    assert [comparison.name for comparison in comparisons] == ["a", "b"]
+    assert [comparison.regression for comparison in comparisons] == [False, True]
+    assert comparisons[1].ratio == 1.5
+
+
+def test_compare_rejects_other_environment(tmp_path):
+    results = [BenchmarkResult("a", [1.])]
+    save_results(results, tmp_path / "baseline.json")
+
+    assert load_environment(tmp_path / "baseline.json") == environment()
+    assert len(compare(results, results, baseline_environment=environment())) == 1
+    with pytest.raises(ValueError):
+        compare(results, results, baseline_environment={**environment(), "torch": "0"})
+
+
+def test_peak_traced_memory():
+    result, peak = peak_traced_memory(np.ones, 10 ** 6)
+    assert result.shape == (10 ** 6,)
+    assert 8 * 10 ** 6 <= peak < 9 * 10 ** 6
+
+    assert benchmark("ones", np.ones, setup=lambda: (10,), measure_memory=True).peak_memory > 0
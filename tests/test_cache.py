@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from arigin.graph.cache import GraphCache, canonical_key
+from arigin.graph.generation import generate_multiple_graphs, graph_from_expression
+from arigin.graph.parsing import parse
+
+
+def test_canonical_key():
+    assert canonical_key(parse("0.5 * ( 0.25 )")) == canonical_key(parse("(0.50*0.25)"))
+    assert canonical_key(parse("0.5 * 0.25")) != canonical_key(parse("0.25 * 0.5"))
+    # Reference to a reduction differs from a number of the same value
+    assert canonical_key(parse("(1 + 2) * 0")) != canonical_key(parse("(1 + 2) * (1 + 2)"))
+
+
+def test_get():
+    cache = GraphCache()
+    graph, result = cache.get("0.5 * ( 0.25 + 0.125 )")
+
+    assert result == 0.5 * (0.25 + 0.125)
+    assert graph.to_entities()["nodes"][-1].type == "*"
+    assert graph.n_nodes == len(graph_from_expression("0.5 * ( 0.25 + 0.125 )")["nodes"])
+    assert cache.get("0.5*(0.25+0.125)").graph is graph
+    assert cache.get("0.5 / ( 0.25 - 0.25 )").result is None
+    assert cache.cache_info() == (1, 2, 0, 100000, 2)
+    with pytest.raises(ValueError):
+        cache.get("0.5")
+
+
+@pytest.mark.parametrize(
+    "eviction, kept, evicted", [("lru", "1 + 1", "2 + 2"), ("fifo", "2 + 2", "1 + 1")]
+)
+def test_eviction(eviction, kept, evicted):
+    cache = GraphCache(maxsize=2, eviction=eviction)
+    cache.get("1 + 1")
+    cache.get("2 + 2")
+    cache.get("1 + 1")
+    cache.get("3 + 3")
+
+    assert cache.cache_info().evictions == 1
+    assert len(cache) == 2
+    assert kept in cache
+    assert "3 + 3" in cache
+    assert evicted not in cache
+
+
+def test_unknown_eviction():
+    with pytest.raises(ValueError):
+        GraphCache(eviction="random")
+
+
+def test_deduplicate():
+    cache = GraphCache()
+    cache.get("1 + 2")
+    expressions = ["1 + 2", "2 + 1", "( 2 + 1 )", "3 * 4"]
+
+    assert list(cache.deduplicate(expressions)) == ["2 + 1", "3 * 4"]
+    cache.cache_clear()
+    assert len(cache) == 0 and cache.cache_info().misses == 0
+
+
+def test_generate_deduplicated():
+    cache = GraphCache(maxsize=None)
+    train, train_results = generate_multiple_graphs(
+        300, 2, 3, seed=0, compact=True, cache=cache
+    )
+    repeated, _ = generate_multiple_graphs(300, 2, 3, seed=0, compact=True, cache=cache)
+    valid, _ = generate_multiple_graphs(300, 2, 3, seed=1, compact=True, cache=cache)
+
+    assert len(train_results) == train.n_graphs
+    assert repeated.n_graphs == 0
+    assert len(cache) == train.n_graphs + valid.n_graphs
+    seen = set()
+    for batch in (train, valid):
+        for i in range(batch.n_graphs):
+            key = (batch[i].node_type.tobytes(), batch[i].value.tobytes())
+            assert key not in seen
+            seen.add(key)
+
+
+def test_generate_deduplicated_parallel():
+    with pytest.raises(ValueError):
+        generate_multiple_graphs(10, n_jobs=2, cache=GraphCache())
+
+
+def test_get_parses_expression_once(monkeypatch):
+    from arigin.graph import cache as cache_module
+    calls = []
+    monkeypatch.setattr(
+        cache_module, "parse", lambda e: calls.append(e) or parse(e)
+    )
+    cache = GraphCache()
+
+    first = cache.get("0.5 * 0.25")
+    assert cache.get("0.5 * 0.25") is first
+    assert "0.5 * 0.25" in cache
+    assert calls == ["0.5 * 0.25"]
+
+
+def test_generate_reuses_cached_graphs():
+    expected, expected_results = generate_multiple_graphs(200, 2, 3, seed=0, compact=True)
+    cache = GraphCache(maxsize=1000)
+
+    first, _ = generate_multiple_graphs(
+        200, 2, 3, seed=0, compact=True, cache=cache, deduplicate=False
+    )
+    misses = cache.cache_info().misses
+    second, results = generate_multiple_graphs(
+        200, 2, 3, seed=0, compact=True, cache=cache, deduplicate=False
+    )
+
+    assert cache.cache_info().misses == misses
+    np.testing.assert_array_equal(results, expected_results)
+    for batch in (first, second):
+        np.testing.assert_array_equal(batch.node_type, expected.node_type)
+        np.testing.assert_array_equal(batch.edge_index, expected.edge_index)
+        np.testing.assert_array_equal(batch.topo_rank, expected.topo_rank)
+
+
+def test_deduplication_requires_unbounded_cache():
+    with pytest.raises(ValueError):
+        generate_multiple_graphs(10, cache=GraphCache(maxsize=10))
+
+    cache = GraphCache(maxsize=1)
+    with pytest.warns(RuntimeWarning):
+        assert list(cache.deduplicate(["1 + 2", "3 * 4", "1 + 2"])) == [
+            "1 + 2", "3 * 4", "1 + 2"
+        ]
@@ -0,0 +1,90 @@
+import numpy as np
+import random
+
+from arigin.expressions import generate
+from arigin.graph import elements
+from arigin.graph.compact import GraphBatch, GraphBatchBuilder
+from arigin.graph.generation import graph_from_expression
+from arigin.graph.parsing import parse
+
+
+def assert_batches_equal(a, b):
+    for field in (
+            "node_type", "value", "edge_index", "edge_type",
+            "node_offsets", "edge_offsets", "depth", "topo_rank"):
+        np.testing.assert_array_equal(getattr(a, field), getattr(b, field))
+
+
+def test_graph_from_expression_compact():
+    batch = graph_from_expression("( 0.1 - 0.2 ) / 0.3", compact=True)
+
+    np.testing.assert_array_equal(batch.node_type, [0, 1, 5, 1, 3])
+    np.testing.assert_array_equal(batch.value, [0.1, 0.2, np.nan, 0.3, np.nan])
+    np.testing.assert_array_equal(batch.edge_index, [[0, 1, 2, 3], [2, 2, 4, 4]])
+    np.testing.assert_array_equal(batch.edge_type, [0, 1, 0, 1])
+    np.testing.assert_array_equal(batch.node_offsets, [0, 5])
+    np.testing.assert_array_equal(batch.edge_offsets, [0, 4])
+    np.testing.assert_array_equal(batch.depth, [2, 2, 1, 1, 0])
+    np.testing.assert_array_equal(batch.topo_rank, [0, 0, 1, 0, 2])
+    np.testing.assert_array_equal(batch.root_index, [4])
+    assert batch.node_type.dtype == np.int32
+    assert batch.edge_index.dtype == np.int64
+
+
+def test_compact_matches_entities():
+    random.seed(7)
+    for _ in range(100):
+        expression = generate(2, 6)
+        assert_batches_equal(
+            graph_from_expression(expression, compact=True),
+            GraphBatch.from_entities(graph_from_expression(expression))
+        )
+        assert_batches_equal(
+            graph_from_expression(expression, compact=True),
+            graph_from_expression(expression, engine="regex", compact=True)
+        )
+
+
+def test_entities_round_trip():
+    expression = "0.25 * ( 0.5 - 1.5 ) + 2.0 / 0.125"
+    graph_entities = graph_from_expression(expression)
+    converted = graph_from_expression(expression, compact=True).to_entities()
+
+    for original, node in zip(graph_entities["nodes"], converted["nodes"]):
+        assert node.__class__ == original.__class__
+        assert node.model_dump(exclude={"id"}) == original.model_dump(exclude={"id"})
+
+    index = {node.id: i for i, node in enumerate(converted["nodes"])}
+    original_index = {
+        node.id: i for i, node in enumerate(graph_entities["nodes"])
+    }
+    for original, relationship in zip(
+            graph_entities["relationships"], converted["relationships"]):
+        assert relationship.__class__ == original.__class__
+        assert index[relationship.source.id] == original_index[original.source.id]
+        assert index[relationship.target.id] == original_index[original.target.id]
+
+
+def test_multiple_graphs():
+    expressions = ["0.1 + 0.2", "0.5", "( 0.3 * 0.4 ) - 0.5"]
+    builder = GraphBatchBuilder()
+    for expression in expressions:
+        builder.add(parse(expression))
+    batch = builder.build()
+
+    assert len(batch) == 3
+    np.testing.assert_array_equal(batch.node_offsets, [0, 3, 3, 8])
+    np.testing.assert_array_equal(batch.batch, [0, 0, 0, 2, 2, 2, 2, 2])
+    np.testing.assert_array_equal(batch.root_index, [2, -1, 7])
+    assert_batches_equal(
+        batch,
+        GraphBatch.concatenate(
+            [graph_from_expression(e, compact=True) for e in expressions]
+        )
+    )
+    assert_batches_equal(batch[2], graph_from_expression(expressions[2], compact=True))
+    assert_batches_equal(batch, GraphBatch.from_entities(batch.to_entities()))
+
+    graph_entities = batch.to_entities()
+    assert isinstance(graph_entities, elements.GraphEntities)
+    assert graph_entities["batch"] == [0, 0, 0, 2, 2, 2, 2, 2]
@@ -1,7 +1,20 @@
 import pytest
 import re
-
-from arigin.expressions import generate, OPERATORS
+import numpy as np
+
+from arigin.expressions import (
+    generate,
+    generate_batch,
+    TokenBatch,
+    OPERATORS,
+    OPERATOR_TOKEN,
+    PADDING_TOKEN,
+    NUMBER_TOKEN,
+    OPEN_PARENTHESIS_TOKEN,
+    CLOSE_PARENTHESIS_TOKEN,
+)
+from arigin.graph.compact import GraphBatch
+from arigin.graph.generation import graph_from_expression
 
 
 @pytest.mark.parametrize("max_integer, max_numbers", [(10, 2), (100, 3), (1000, 5)])
@@ -58,3 +71,90 @@ def test_generate_no_double_operators(max_integer, max_numbers):
     # Ensure that there are no two consecutive operators in the expression
     for op in OPERATORS:
         assert f"{op} {op}" not in result
+
+
+@pytest.mark.parametrize("min_numbers, max_numbers", [(2, 2), (2, 5), (3, 8)])
+def test_generate_batch_valid_expressions(min_numbers, max_numbers):
+    """Test that batch generated expressions are valid and complete."""
+    batch = generate_batch(200, min_numbers, max_numbers, seed=0)
+
+    assert batch.codes.shape == batch.values.shape
+    assert batch.codes.shape[1] == batch.lengths.max()
+    for codes, length in zip(batch.codes, batch.lengths):
+        assert (codes[length:] == PADDING_TOKEN).all()
+        n_numbers = (codes == NUMBER_TOKEN).sum()
+        assert min_numbers <= n_numbers <= max_numbers
+        assert (codes == OPEN_PARENTHESIS_TOKEN).sum() == (
+            codes == CLOSE_PARENTHESIS_TOKEN
+        ).sum()
+
+    for expression in batch.to_strings():
+        eval(expression.replace("/", "*"))  # Valid syntax
+
+
+def test_generate_batch_values():
+    """Test that values are rounded and within range."""
+    batch = generate_batch(100, min_value=1., max_value=2., n_digits=1, seed=0)
+    values = batch.values[batch.codes == NUMBER_TOKEN]
+
+    assert ((values >= 1.) & (values <= 2.)).all()
+    np.testing.assert_array_equal(values, np.round(values, 1))
+    assert np.isnan(batch.values[batch.codes != NUMBER_TOKEN]).all()
+
+
+def test_generate_batch_reproducible():
+    """Test that the seed determines the expressions."""
+    assert generate_batch(20, seed=1).to_strings() == generate_batch(20, seed=1).to_strings()
+    assert generate_batch(20, seed=1).to_strings() != generate_batch(20, seed=2).to_strings()
+
+
+@pytest.mark.parametrize(
+    "n_expressions, min_numbers, max_numbers, seed",
+    [(50, 2, 6, 3), (300, 2, 3, 0), (200, 3, 10, 1), (20, 1, 2, 2), (0, 2, 4, 0)]
+)
+def test_generate_batch_graphs(n_expressions, min_numbers, max_numbers, seed):
+    """Test that token arrays give the same graphs as parsing the strings."""
+    batch = generate_batch(n_expressions, min_numbers, max_numbers, seed=seed)
+    graphs = GraphBatch.from_token_batch(batch)
+    expected = GraphBatch.concatenate(
+        [graph_from_expression(e, compact=True) for e in batch.to_strings()]
+    )
+
+    for field in (
+            "node_type", "value", "edge_index", "edge_type", "node_offsets",
+            "edge_offsets", "depth", "topo_rank"):
+        assert getattr(graphs, field).dtype == getattr(expected, field).dtype
+        np.testing.assert_array_equal(
+            getattr(graphs, field), getattr(expected, field)
+        )
+
+
+def test_token_batch_graphs_redundant_parentheses():
+    """Test groups with a single operand given as token arrays."""
+    expressions = [
+        "( 0.5 )", "( ( 0.5 ) ) * 2", "( ( 1 + 2 ) ) / 4",
+        "1 - ( ( 2 ) * 3 + 4 / ( 5 ) ) / 6 * 7 - 8",
+    ]
+    symbols = {o: OPERATOR_TOKEN + i for i, o in enumerate(OPERATORS)}
+    symbols.update({"(": OPEN_PARENTHESIS_TOKEN, ")": CLOSE_PARENTHESIS_TOKEN})
+    tokens = [e.split() for e in expressions]
+    lengths = np.array([len(t) for t in tokens])
+    codes = np.full((len(tokens), lengths.max()), PADDING_TOKEN, dtype=np.int8)
+    values = np.full(codes.shape, np.nan)
+    for i, expression in enumerate(tokens):
+        for j, token in enumerate(expression):
+            if token in symbols:
+                codes[i, j] = symbols[token]
+            else:
+                codes[i, j] = NUMBER_TOKEN
+                values[i, j] = float(token)
+
+    graphs = GraphBatch.from_token_batch(TokenBatch(codes, values, lengths))
+    expected = GraphBatch.concatenate(
+        [graph_from_expression(e, compact=True) for e in expressions]
+    )
+
+    assert graphs.node_offsets.tolist() == expected.node_offsets.tolist()
+    np.testing.assert_array_equal(graphs.node_type, expected.node_type)
+    np.testing.assert_array_equal(graphs.edge_index, expected.edge_index)
+    np.testing.assert_array_equal(graphs.depth, expected.depth)
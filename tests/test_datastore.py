@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+import torch
+from sklearn.preprocessing import StandardScaler
+
+from arigin.datastore import (
+    build_cache, cache_key, cached_dataset, list_caches, load_cache, main
+)
+from arigin.graph.generation import generate_multiple_graphs
+from arigin.preprocessing import GraphEntityToDataSet
+
+
+def test_cache_key():
+    key = cache_key(100, 2, 4, 0, 50)
+    assert key == cache_key(100, 2, 4, 0, 50)
+    assert key != cache_key(100, 2, 4, 1, 50)
+    assert key != cache_key(100, 2, 5, 0, 50)
+
+
+def test_build_and_load_cache(tmp_path):
+    path = build_cache(120, 2, 5, seed=3, shard_size=50, cache_dir=tmp_path)
+    store = load_cache(path)
+
+    graphs, results = generate_multiple_graphs(
+        120, 2, 5, seed=3, shard_size=50, compact=True
+    )
+    expected = GraphEntityToDataSet().fit(graphs, results).transform(
+        graphs, results
+    )
+
+    assert len(store) == 120
+    assert [shard["n_graphs"] for shard in store.metadata["shards"]] == [50, 50, 20]
+    assert isinstance(store.shards[0]["x"], np.memmap)
+
+    x = torch.cat([store[i].x for i in range(len(store))])
+    y = torch.cat([store[i].y for i in range(len(store))])
+    torch.testing.assert_close(x, expected.x, rtol=0, atol=0)
+    torch.testing.assert_close(y, expected.y, rtol=0, atol=0)
+    np.testing.assert_array_equal(store.n_nodes, np.diff(graphs.node_offsets))
+    np.testing.assert_array_equal(
+        store.feature_spec.transform(graphs).x.numpy(), expected.x.numpy()
+    )
+
+
+def test_transformer_fitted_on_all_shards(tmp_path):
+    transformer = GraphEntityToDataSet(target_transformer=StandardScaler())
+    path = build_cache(
+        60, 2, 5, seed=4, shard_size=20, transformer=transformer,
+        cache_dir=tmp_path
+    )
+    store = load_cache(path)
+
+    graphs, results = generate_multiple_graphs(
+        60, 2, 5, seed=4, shard_size=20, compact=True
+    )
+    expected = GraphEntityToDataSet(target_transformer=StandardScaler()).fit(
+        graphs, results
+    ).transform(graphs, results)
+
+    y = torch.cat([store[i].y for i in range(len(store))])
+    torch.testing.assert_close(y, expected.y)
+    with pytest.raises(ValueError):
+        build_cache(20, seed=0, transformer=StandardScaler(), cache_dir=tmp_path)
+
+
+def test_graph_edges(tmp_path):
+    store = cached_dataset(10, 2, 5, seed=1, shard_size=4, cache_dir=tmp_path)
+    graphs, results = generate_multiple_graphs(
+        10, 2, 5, seed=1, shard_size=4, compact=True
+    )
+
+    for i in range(len(store)):
+        graph = graphs[i]
+        data = store[i]
+        n_edges = graph.n_edges
+        np.testing.assert_array_equal(
+            data.edge_index.numpy(),
+            np.hstack((graph.edge_index, graph.edge_index[::-1]))
+        )
+        assert data.edge_attr.shape == (2 * n_edges, 4)
+        assert data.edge_attr[:n_edges, 2:].sum() == 0
+        assert data.edge_attr[n_edges:, :2].sum() == 0
+
+
+def test_shard_data(tmp_path):
+    store = cached_dataset(30, 2, 5, seed=2, shard_size=30, cache_dir=tmp_path)
+    data = store.shard_data(0)
+
+    graphs, results = generate_multiple_graphs(30, 2, 5, seed=2, compact=True)
+    expected = GraphEntityToDataSet().fit(graphs, results).transform(
+        graphs, results
+    )
+
+    torch.testing.assert_close(data.batch, expected.batch)
+    assert sorted(map(tuple, data.edge_index.T.tolist())) == sorted(
+        map(tuple, expected.edge_index.T.tolist())
+    )
+
+
+def test_cache_reused(tmp_path):
+    path = build_cache(20, seed=0, shard_size=10, cache_dir=tmp_path)
+    modified = (tmp_path / path).stat().st_mtime_ns
+
+    assert build_cache(20, seed=0, shard_size=10, cache_dir=tmp_path) == path
+    assert (tmp_path / path).stat().st_mtime_ns == modified
+    assert [cache["key"] for cache in list_caches(tmp_path)] == [
+        cache_key(20, 2, 4, 0, 10)
+    ]
+
+
+def test_cli(tmp_path, capsys):
+    main(["--cache-dir", str(tmp_path), "build", "--n-graphs", "20", "--seed", "5"])
+    path = capsys.readouterr().out.strip()
+    assert load_cache(path).metadata["seed"] == 5
+
+    main(["--cache-dir", str(tmp_path), "list"])
+    assert "20 graphs" in capsys.readouterr().out
+
+
+def test_shard_dataset(tmp_path):
+    store = cached_dataset(30, 2, 5, seed=2, shard_size=20, cache_dir=tmp_path)
+    dataset = store.shard_dataset(1)
+
+    assert len(dataset) == 10
+    for i in range(len(dataset)):
+        torch.testing.assert_close(dataset[i].x, store[20 + i].x)
+        torch.testing.assert_close(dataset[i].edge_index, store[20 + i].edge_index)
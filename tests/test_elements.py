@@ -0,0 +1,110 @@
+import copy
+import pickle
+import random
+
+from arigin.graph import elements
+from arigin.graph.generation import generate_multiple_graphs, graph_from_expression
+
+
+def numbers(n):
+    return [
+        elements.LeftOperand(expression=str(i), value=i) for i in range(n)
+    ]
+
+
+def test_node_list_index_on_append():
+    nodes = elements.NodeList()
+    created = numbers(3)
+    nodes.append(created[0])
+    nodes += created[1:]
+
+    assert nodes.id_to_index == {node.id: i for i, node in enumerate(created)}
+    assert nodes.by_id(created[2].id) is created[2]
+    assert nodes.by_id("unknown") is None
+
+
+def test_node_list_reindex_on_modification():
+    created = numbers(4)
+    nodes = elements.NodeList(created)
+    del nodes[1]
+    nodes.insert(0, created[1])
+    nodes.pop()
+
+    assert nodes.id_to_index == {
+        created[1].id: 0, created[0].id: 1, created[2].id: 2
+    }
+
+
+def test_node_list_keeps_first_duplicate():
+    created = numbers(2)
+    nodes = elements.NodeList(created + [created[0]])
+
+    assert nodes.id_to_index[created[0].id] == 0
+
+
+def test_node_list_copy_and_pickle():
+    nodes = elements.NodeList(numbers(3))
+
+    for other in (copy.copy(nodes), pickle.loads(pickle.dumps(nodes))):
+        assert isinstance(other, elements.NodeList)
+        assert other.id_to_index == nodes.id_to_index
+
+
+def test_node_by_id():
+    created = numbers(3)
+
+    for nodes in (created, elements.NodeList(created)):
+        assert elements.node_by_id(nodes, created[1].id) is created[1]
+        assert elements.node_by_id(nodes, "unknown") is None
+
+
+def test_graph_entities_keeps_node_list():
+    created = numbers(2)
+    graph_entities = elements.GraphEntities()
+    graph_entities["nodes"] += created[:1]
+
+    assert isinstance(graph_entities["nodes"], elements.NodeList)
+    assert graph_entities["relationships"] == []
+
+    graph_entities["nodes"] = created
+    assert isinstance(graph_entities["nodes"], elements.NodeList)
+    assert elements.node_id_to_index(graph_entities["nodes"]) == {
+        created[0].id: 0, created[1].id: 1
+    }
+
+
+def test_sequential_ids():
+    with elements.sequential_ids() as strategy:
+        graph_entities = graph_from_expression("0.5 * ( 0.25 + 0.125 )")
+        assert strategy.next_node_id == 5
+
+    assert [node.id for node in graph_entities["nodes"]] == list(range(5))
+    assert [r.id for r in graph_entities["relationships"]] == list(range(4))
+    assert isinstance(graph_from_expression("1 + 2")["nodes"][0].id, str)
+
+
+def test_nested_id_scopes():
+    with elements.sequential_ids(10):
+        with elements.random_ids():
+            assert isinstance(elements.LeftOperand(expression="1", value=1).id, str)
+        assert elements.LeftOperand(expression="1", value=1).id == 10
+
+
+def test_random_ids_keep_global_random_state():
+    random.seed(1)
+    expected = random.random()
+    random.seed(1)
+    graph_from_expression("0.5 * 0.25")
+    assert random.random() == expected
+
+
+def test_regex_engine_with_sequential_ids():
+    with elements.sequential_ids():
+        graph_entities = graph_from_expression("0.5 * ( 0.25 + 0.125 )", engine="regex")
+    assert [node.value for node in graph_entities["nodes"]] == [0.25, 0.125, None, 0.5, None]
+
+
+def test_generated_ids_unique():
+    graphs, _ = generate_multiple_graphs(50, seed=0, shard_size=20)
+    assert [node.id for node in graphs["nodes"]] == list(range(len(graphs["nodes"])))
+    assert len({r.id for r in graphs["relationships"]}) == len(graphs["relationships"])
@@ -0,0 +1,65 @@
+import numpy as np
+import random
+
+from arigin.expressions import generate
+from arigin.graph.compact import GraphBatch
+from arigin.graph.evaluation import evaluate, evaluation_order
+from arigin.graph.generation import graph_from_expression
+
+
+def compact_batch(expressions):
+    return GraphBatch.concatenate(
+        [graph_from_expression(e, compact=True) for e in expressions]
+    )
+
+
+def test_evaluate_matches_eval():
+    random.seed(5)
+    expressions = [generate(2, 8) for _ in range(500)]
+    evaluation = evaluate(compact_batch(expressions))
+
+    for expression, result, valid in zip(
+            expressions, evaluation.results, evaluation.valid):
+        try:
+            expected = eval(expression)
+        except ZeroDivisionError:
+            assert not valid
+            continue
+        assert valid
+        assert result.tobytes() == np.float64(expected).tobytes()
+
+
+def test_evaluate_node_values():
+    evaluation = evaluate(graph_from_expression("( 1 - 0.5 ) * 4", compact=True))
+
+    np.testing.assert_array_equal(evaluation.node_values, [1, 0.5, 0.5, 4, 2])
+    np.testing.assert_array_equal(evaluation.results, [2.])
+
+
+def test_evaluate_masks():
+    evaluation = evaluate(
+        compact_batch(
+            ["1 / ( 2 - 2 ) + 1", "1e308 * 10 - 1", "0.5 + 0.25", "( 3 )"]
+        )
+    )
+
+    np.testing.assert_array_equal(evaluation.zero_division, [True, False, False, False])
+    np.testing.assert_array_equal(evaluation.overflow, [False, True, False, False])
+    np.testing.assert_array_equal(evaluation.no_operator, [False, False, False, True])
+    np.testing.assert_array_equal(evaluation.valid, [False, False, True, False])
+    np.testing.assert_array_equal(
+        evaluation.node_zero_division[:6], [False, False, False, False, True, False]
+    )
+    assert np.isinf(evaluation.results[1])
+    assert evaluation.results[2] == 0.75
+    assert np.isnan(evaluation.results[3])
+
+
+def test_evaluation_order():
+    batch = graph_from_expression("( 0.1 - 0.2 ) / 0.3 - 0.4 * 0.5", compact=True)
+
+    np.testing.assert_array_equal(
+        evaluation_order(batch), [0, 0, 1, 0, 2, 0, 0, 1, 3]
+    )
+    # Unlike the distance from the root
+    np.testing.assert_array_equal(batch.depth, [3, 3, 2, 2, 1, 2, 2, 1, 0])
@@ -0,0 +1,107 @@
+import pytest
+import torch
+from torch_geometric.loader import DataLoader
+
+from arigin.export import compare_export, export_model, load_exported, main
+from arigin.graph.generation import generate_multiple_graphs
+from arigin.graph.models import MathModel
+from arigin.preprocessing import GraphEntityToDataSet
+from arigin.training import build_model, predict
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    graphs, results = generate_multiple_graphs(64, 2, 6, seed=0, compact=True)
+    return GraphEntityToDataSet().fit(graphs, results).transform_dataset(
+        graphs, results
+    )
+
+
+def _config(name, dataset):
+    sample = dataset[0]
+    return dict(
+        name=name,
+        in_channels=sample.num_node_features,
+        edge_dim=sample.num_edge_features,
+        hidden_channels=16
+    )
+
+
+def _model(name, dataset):
+    torch.manual_seed(0)
+    return build_model(**_config(name, dataset)).eval()
+
+
+def test_torchscript_export_matches_eager(dataset, tmp_path):
+    model = _model("level", dataset)
+    export_model(model, tmp_path / "level.pt")
+    exported = load_exported(tmp_path / "level.pt")
+    batch = next(iter(DataLoader(dataset, batch_size=len(dataset))))
+
+    assert isinstance(exported, torch.jit.ScriptModule)
+    with torch.inference_mode():
+        torch.testing.assert_close(predict(exported, batch), predict(model, batch))
+
+
+@pytest.mark.parametrize(
+    "name, format",
+    [("level", "torchscript"), ("gcn", "state_dict"), ("math", "state_dict")]
+)
+def test_quantized_export(dataset, tmp_path, name, format):
+    model = _model(name, dataset)
+    export_model(
+        model, tmp_path / "model.pt", format=format, quantized=True,
+        config=_config(name, dataset)
+    )
+
+    report = compare_export(
+        model, load_exported(tmp_path / "model.pt"), dataset, repeat=2
+    )
+
+    assert 0 < report.max_abs_delta < 0.5
+    assert [r.params["batch_size"] for r in report.eager] == [1, 32, 1024]
+    assert len(report.exported) == 3
+    assert "speedup" in str(report)
+    assert 0 < report.quantized_fraction <= 1
+    assert bool(report.notes) == (format == "state_dict")
+
+
+def test_state_dict_export_loads_no_pickles(dataset, tmp_path):
+    model = _model("math", dataset)
+    with pytest.raises(ValueError):
+        export_model(model, tmp_path / "math.pt", format="state_dict")
+    export_model(
+        model, tmp_path / "math.pt", format="state_dict", config=_config("math", dataset)
+    )
+    torch.save(model, tmp_path / "pickled.pt")
+    batch = next(iter(DataLoader(dataset, batch_size=len(dataset))))
+
+    with torch.inference_mode():
+        torch.testing.assert_close(
+            predict(load_exported(tmp_path / "math.pt"), batch), predict(model, batch)
+        )
+    with pytest.raises(Exception):
+        load_exported(tmp_path / "pickled.pt")
+
+
+def test_export_rejects_unscriptable_models(dataset, tmp_path):
+    with pytest.raises(ValueError):
+        export_model(_model("math", dataset), tmp_path / "math.pt")
+    with pytest.raises(ValueError):
+        export_model(_model("level", dataset), tmp_path / "level.onnx", format="onnx")
+
+
+def test_cli_requires_state_dict_format_for_math_model(tmp_path):
+    graphs, results = generate_multiple_graphs(8, 2, 4, seed=0, compact=True)
+    spec = str(tmp_path / "feature_spec.npz")
+    GraphEntityToDataSet().fit(graphs, results).feature_spec().save(spec)
+
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "math.pt"), "--model", "math", "--feature-spec", spec])
+    assert not (tmp_path / "math.pt").exists()
+
+    main([
+        str(tmp_path / "math.pt"), "--model", "math", "--format", "state_dict",
+        "--feature-spec", spec, "--n-graphs", "32"
+    ])
+    assert isinstance(load_exported(tmp_path / "math.pt"), MathModel)
@@ -0,0 +1,90 @@
+import sys
+import pickle
+import subprocess
+import numpy as np
+import pytest
+import torch
+from sklearn.preprocessing import StandardScaler
+
+from arigin import features
+from arigin.feature_spec import FeatureSpec, edge_attr_with_reverse
+from arigin.features import EdgeFeaturizer, NodeFeaturizer
+from arigin.graph.generation import generate_graphs
+from arigin.preprocessing import GraphEntityToDataSet
+
+
+@pytest.fixture(scope="module")
+def graphs():
+    graphs, results = generate_graphs(100, 2, 5, compact=True)
+    return graphs, np.array(results).reshape(-1, 1)
+
+
+@pytest.mark.parametrize(
+    "node_transformer",
+    [
+        NodeFeaturizer(),
+        NodeFeaturizer(
+            features=("class_type_label", "inverse_value", "value"),
+            categories="auto"
+        ),
+    ]
+)
+def test_feature_spec_matches_transformer(graphs, node_transformer, tmp_path):
+    X, y = graphs
+    transformer = GraphEntityToDataSet(
+        node_transformer=node_transformer,
+        edge_transformer=EdgeFeaturizer(),
+        target_transformer=StandardScaler()
+    ).fit(X, y)
+
+    transformer.feature_spec().save(tmp_path / "spec.npz")
+    spec = FeatureSpec.load(tmp_path / "spec.npz")
+
+    expected = transformer.transform(X, y)
+    data = spec.transform(X, y)
+    for key in ("x", "edge_index", "edge_attr", "y", "batch"):
+        assert torch.equal(data[key], expected[key])
+    assert len(spec.node_columns) == data.x.shape[1]
+    np.testing.assert_allclose(
+        spec.inverse_transform_target(data.y.numpy()), y, atol=1e-5
+    )
+
+
+def test_feature_spec_requires_fast_featurizers():
+    transformer = GraphEntityToDataSet(
+        node_transformer=features.node_features,
+        edge_transformer=features.edge_features
+    ).fit(generate_graphs(10, 2, 3)[0], None)
+
+    with pytest.raises(ValueError):
+        transformer.feature_spec()
+
+
+def test_feature_spec_loads_without_sklearn_and_pandas(graphs, tmp_path):
+    X, y = graphs
+    GraphEntityToDataSet().fit(X, y).feature_spec().save(tmp_path / "spec.npz")
+
+    code = (
+        "import sys\n"
+        "from arigin.feature_spec import FeatureSpec\n"
+        f"FeatureSpec.load({str(tmp_path / 'spec.npz')!r})\n"
+        "assert 'sklearn' not in sys.modules and 'pandas' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_node_features_values_can_be_pickled():
+    pipeline = pickle.loads(pickle.dumps(features.node_features_values))
+    assert pipeline.steps[0][0] == "dataframe"
+
+
+def test_edge_attr_with_reverse_dtype():
+    E = np.arange(6, dtype=np.float64).reshape(3, 2)
+
+    edge_attr = edge_attr_with_reverse(E)
+
+    assert edge_attr.dtype == np.float64
+    np.testing.assert_array_equal(edge_attr[:3, :2], E)
+    np.testing.assert_array_equal(edge_attr[3:, 2:], E)
+    assert edge_attr[:3, 2:].sum() == edge_attr[3:, :2].sum() == 0
+    assert edge_attr_with_reverse(E, np.float16).dtype == np.float16
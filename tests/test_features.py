@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from arigin import features
+from arigin.features import NodeFeaturizer, EdgeFeaturizer
+from arigin.graph.compact import GraphBatch
+from arigin.graph.generation import generate_multiple_graphs, graph_from_expression
+
+
+@pytest.fixture(scope="module")
+def graphs():
+    return generate_multiple_graphs(100, 2, 5, seed=0)[0]
+
+
+@pytest.mark.parametrize(
+    "pipeline, featurizer",
+    [
+        (features.node_features, NodeFeaturizer(features=("class_type", "value"))),
+        (features.node_features_emb, NodeFeaturizer(features=("class_type_label",))),
+        (features.node_features_values, NodeFeaturizer(features=("inverse_value", "value"))),
+    ]
+)
+def test_node_featurizer_identical_to_pipeline(graphs, pipeline, featurizer):
+    expected = pipeline.fit_transform(graphs["nodes"])
+    result = featurizer.fit(graphs["nodes"]).transform(graphs["nodes"])
+
+    assert result.dtype == np.float32
+    np.testing.assert_array_equal(result, expected.astype(np.float32))
+    np.testing.assert_array_equal(
+        featurizer.transform(GraphBatch.from_entities(graphs)), result
+    )
+
+
+def test_edge_featurizer_identical_to_pipeline(graphs):
+    expected = features.edge_features.fit_transform(graphs["relationships"])
+    featurizer = EdgeFeaturizer().fit(graphs["relationships"])
+
+    np.testing.assert_array_equal(
+        featurizer.transform(graphs["relationships"]), expected.astype(np.float32)
+    )
+    np.testing.assert_array_equal(
+        featurizer.transform(GraphBatch.from_entities(graphs)),
+        expected.astype(np.float32)
+    )
+
+
+def test_node_featurizer_auto_categories():
+    nodes = graph_from_expression("0.5 * 0.25 + 1.5")["nodes"]
+    expected = features.node_features.fit_transform(nodes)
+    featurizer = NodeFeaturizer(categories="auto").fit(nodes)
+
+    np.testing.assert_array_equal(featurizer.transform(nodes), expected)
+    assert NodeFeaturizer().fit(nodes).transform(nodes).shape == (len(nodes), 9)
+    with pytest.raises(ValueError):
+        featurizer.transform(graph_from_expression("0.5 / 0.25")["nodes"])
+
+
+def test_node_featurizer_invalid_features():
+    with pytest.raises(ValueError):
+        NodeFeaturizer(features=("unknown",)).fit([])
+
+
+@pytest.mark.parametrize("featurizer", [NodeFeaturizer, EdgeFeaturizer])
+def test_featurizer_partial_fit_and_merge(featurizer):
+    chunks = [
+        graph_from_expression(expression, compact=True)
+        for expression in ("0.5 * 0.25", "0.5 + 0.25", "( 0.5 - 0.25 ) / 0.125")
+    ]
+    nodes = GraphBatch.concatenate(chunks)
+    expected = featurizer(categories="auto").fit(nodes)
+
+    incremental = featurizer(categories="auto")
+    for chunk in chunks:
+        incremental.partial_fit(chunk)
+    merged = featurizer(categories="auto").fit(chunks[0]).merge(
+        featurizer(categories="auto").fit(chunks[1]).merge(
+            featurizer(categories="auto").fit(chunks[2])
+        )
+    )
+
+    for fitted in (incremental, merged):
+        np.testing.assert_array_equal(fitted.codes_, expected.codes_)
+        np.testing.assert_array_equal(fitted.transform(nodes), expected.transform(nodes))
+        assert fitted.n_samples_seen_ == expected.n_samples_seen_
+    with pytest.raises(ValueError):
+        merged.merge(featurizer(categories="fixed").fit(nodes))
+    with pytest.raises(ValueError):
+        merged.merge(merged)
@@ -1,5 +1,11 @@
 import pytest
+import random
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from arigin.expressions import generate, generate_batch
 from arigin.graph import elements
+from arigin.graph.compact import GraphBatch
 
 # Importing the functions to test from your module
 from arigin.graph.generation import (
@@ -8,7 +14,13 @@ from arigin.graph.generation import (
     extract_multiplication_or_division, 
     extract_addition_subtraction,
     remove_redundant_parenthesis,
-    graph_elements_from_primitive_expression
+    graph_elements_from_primitive_expression,
+    generate_graphs,
+    generate_multiple_graphs,
+    iter_multiple_graphs,
+    generate_tree,
+    graph_from_expression,
+    graph_from_reductions
 )
 
 
@@ -52,3 +64,125 @@ def test_remove_redundant_parenthesis():
     # Edge cases with complex nesting
     assert remove_redundant_parenthesis("((( ( 100 ) )))") == "100"
     assert remove_redundant_parenthesis("( ( ( Rabc ) ) )") == "Rabc"
+
+
+def test_generate_multiple_graphs_reproducible():
+    graphs_a, results_a = generate_multiple_graphs(50, 2, 5, seed=3, shard_size=20)
+    graphs_b, results_b = generate_multiple_graphs(50, 2, 5, seed=3, shard_size=20)
+    graphs_c, results_c = generate_multiple_graphs(50, 2, 5, seed=4, shard_size=20)
+
+    np.testing.assert_array_equal(results_a, results_b)
+    assert [n.value for n in graphs_a["nodes"]] == [n.value for n in graphs_b["nodes"]]
+    assert not np.array_equal(results_a, results_c)
+
+
+def test_generate_multiple_graphs_parallel():
+    graphs, results = generate_multiple_graphs(60, 2, 5, seed=3, shard_size=25)
+    parallel_graphs, parallel_results = generate_multiple_graphs(
+        60, 2, 5, seed=3, shard_size=25, n_jobs=2
+    )
+    threaded_graphs, threaded_results = generate_multiple_graphs(
+        60, 2, 5, seed=3, shard_size=25, executor=ThreadPoolExecutor(2)
+    )
+
+    for other_graphs, other_results in (
+            (parallel_graphs, parallel_results),
+            (threaded_graphs, threaded_results)):
+        np.testing.assert_array_equal(results, other_results)
+        assert graphs["batch"] == other_graphs["batch"]
+        assert [n.value for n in graphs["nodes"]] == [
+            n.value for n in other_graphs["nodes"]
+        ]
+
+    # Node ids of different workers must not collide
+    assert len(parallel_graphs["nodes"].id_to_index) == len(parallel_graphs["nodes"])
+    assert parallel_graphs["batch"][-1] == len(parallel_results) - 1
+
+
+def test_generate_multiple_graphs_compact():
+    graphs, results = generate_multiple_graphs(60, 2, 5, seed=3, shard_size=25)
+    compact_graphs, compact_results = generate_multiple_graphs(
+        60, 2, 5, seed=3, shard_size=25, n_jobs=2, compact=True
+    )
+    expected = GraphBatch.from_entities(graphs)
+
+    assert isinstance(compact_graphs, GraphBatch)
+    np.testing.assert_array_equal(results, compact_results)
+    np.testing.assert_array_equal(compact_graphs.node_type, expected.node_type)
+    np.testing.assert_array_equal(compact_graphs.value, expected.value)
+    np.testing.assert_array_equal(compact_graphs.edge_index, expected.edge_index)
+    np.testing.assert_array_equal(compact_graphs.node_offsets, expected.node_offsets)
+
+
+def test_generate_graphs_from_token_batch():
+    # One of the expressions divides by zero
+    graphs, results = generate_graphs(500, 2, 6, rng=random.Random(60), compact=True)
+    token_batch = generate_batch(500, 2, 6, seed=random.Random(60).getrandbits(64))
+
+    expressions, expected_results = [], []
+    for expression in token_batch.to_strings():
+        try:
+            expected_results.append(eval(expression))
+        except ZeroDivisionError:
+            continue
+        expressions.append(expression)
+    expected = GraphBatch.concatenate(
+        [graph_from_expression(e, compact=True) for e in expressions]
+    )
+
+    assert len(expressions) == 499
+    assert results == expected_results
+    np.testing.assert_array_equal(graphs.node_type, expected.node_type)
+    np.testing.assert_array_equal(graphs.value, expected.value)
+    np.testing.assert_array_equal(graphs.edge_index, expected.edge_index)
+    np.testing.assert_array_equal(graphs.node_offsets, expected.node_offsets)
+    np.testing.assert_array_equal(graphs.depth, expected.depth)
+
+
+def test_iter_multiple_graphs():
+    chunks = list(iter_multiple_graphs(50, 2, 5, chunk_size=20, seed=3))
+    graphs, results = generate_multiple_graphs(50, 2, 5, seed=3, shard_size=20)
+
+    assert len(chunks) == 3
+    for chunk_graphs, chunk_results in chunks:
+        assert chunk_graphs["batch"][0] == 0
+        assert chunk_graphs["batch"][-1] == len(chunk_results) - 1
+    np.testing.assert_array_equal(
+        np.concatenate([chunk_results for _, chunk_results in chunks]), results
+    )
+    assert [n.value for chunk, _ in chunks for n in chunk["nodes"]] == [
+        n.value for n in graphs["nodes"]
+    ]
+
+
+def test_iter_multiple_graphs_endless():
+    chunks = iter_multiple_graphs(
+        None, 2, 5, chunk_size=10, seed=3, compact=True,
+        executor=ThreadPoolExecutor(2)
+    )
+    first_chunks = [next(chunks) for _ in range(5)]
+    chunks.close()
+
+    expected = generate_multiple_graphs(50, 2, 5, seed=3, shard_size=10)[1]
+    np.testing.assert_array_equal(
+        np.concatenate([results for _, results in first_chunks]), expected
+    )
+
+
+def test_generate_tree():
+    rng, rng_expression = random.Random(11), random.Random(11)
+    for _ in range(200):
+        tree = generate_tree(2, 6, rng=rng)
+        expression = generate(2, 6, rng=rng_expression)
+
+        assert tree.render() == expression
+        try:
+            assert tree.result == eval(expression)
+        except ZeroDivisionError:
+            assert tree.result is None
+
+        graph = GraphBatch.from_entities(graph_from_reductions(tree.reductions))
+        expected = graph_from_expression(expression, compact=True)
+        np.testing.assert_array_equal(graph.node_type, expected.node_type)
+        np.testing.assert_array_equal(graph.value, expected.value)
+        np.testing.assert_array_equal(graph.edge_index, expected.edge_index)
@@ -0,0 +1,123 @@
+import pytest
+import torch
+from torch_geometric.loader import DataLoader
+
+from arigin.graph.generation import generate_multiple_graphs, graph_from_expression
+from arigin.graph.models import LevelModel, MathModel, topological_levels
+from arigin.preprocessing import GraphEntityToDataSet
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    graphs, results = generate_multiple_graphs(64, 2, 6, seed=0, compact=True)
+    return GraphEntityToDataSet().fit(graphs, results).transform_dataset(
+        graphs, results
+    )
+
+
+def test_topological_levels():
+    graph = graph_from_expression("( 0.1 + 0.2 ) * 0.3 - 0.4 / 0.5", compact=True)
+
+    levels = topological_levels(
+        torch.from_numpy(graph.edge_index), graph.n_nodes
+    )
+
+    # Numbers, then 0.1 + 0.2 and 0.4 / 0.5, then *, then -
+    assert [level.tolist() for level in levels] == [
+        [0, 1, 3, 5, 6], [2, 7], [4], [8]
+    ]
+
+
+def test_level_model_batch_matches_single(dataset):
+    torch.manual_seed(0)
+    sample = dataset[0]
+    model = LevelModel(
+        sample.num_node_features, 16, 8, 1, edge_dim=sample.num_edge_features
+    ).eval()
+    batch = next(iter(DataLoader(dataset, batch_size=len(dataset))))
+
+    with torch.no_grad():
+        batched = model(batch.x, batch.edge_index, batch.edge_attr, batch.batch)
+        single = torch.cat([
+            model(data.x, data.edge_index, data.edge_attr) for data in dataset
+        ])
+
+    assert batched.shape == (len(dataset), 1)
+    torch.testing.assert_close(batched, single)
+
+
+def test_level_model_precomputed_ranks(dataset):
+    torch.manual_seed(0)
+    sample = dataset[0]
+    model = LevelModel(
+        sample.num_node_features, 16, 8, 1, edge_dim=sample.num_edge_features
+    ).eval()
+    batch = next(iter(DataLoader(dataset, batch_size=16)))
+
+    levels = topological_levels(
+        batch.edge_index[:, batch.edge_index[0] < batch.edge_index[1]],
+        batch.num_nodes
+    )
+    for rank, nodes in enumerate(levels):
+        assert (batch.topo_rank[nodes] == rank).all()
+
+    with torch.no_grad():
+        torch.testing.assert_close(
+            model(batch.x, batch.edge_index, batch.edge_attr, batch.batch),
+            model(
+                batch.x, batch.edge_index, batch.edge_attr, batch.batch,
+                topo_rank=batch.topo_rank
+            )
+        )
+
+
+def test_level_model_distinguishes_operand_order():
+    transformer = GraphEntityToDataSet().fit(
+        *generate_multiple_graphs(8, 2, 3, seed=0, compact=True)
+    )
+    torch.manual_seed(0)
+    model = LevelModel(9, 16, 8, 1, edge_dim=4).eval()
+
+    predictions = []
+    for expression in ("( 0.1 + 0.2 ) / 0.3", "0.3 / ( 0.1 + 0.2 )"):
+        data = transformer.transform(
+            graph_from_expression(expression, compact=True)
+        )
+        with torch.no_grad():
+            predictions.append(
+                model(data.x, data.edge_index, data.edge_attr, data.batch)
+            )
+
+    assert not torch.allclose(*predictions)
+
+
+def test_level_model_backward(dataset):
+    sample = dataset[0]
+    model = LevelModel(
+        sample.num_node_features, 16, 8, 1, edge_dim=sample.num_edge_features
+    )
+    batch = next(iter(DataLoader(dataset, batch_size=16)))
+
+    model(batch.x, batch.edge_index, batch.edge_attr, batch.batch).sum().backward()
+
+    assert all(parameter.grad is not None for parameter in model.parameters())
+
+
+def test_math_model_graph_norm(dataset):
+    torch.manual_seed(0)
+    sample = dataset[0]
+    batch = next(iter(DataLoader(dataset, batch_size=8)))
+    predictions = {}
+    for graph_norm in (False, True):
+        model = MathModel(
+            sample.num_node_features, 8, 16, 1,
+            edge_dim=sample.num_edge_features, graph_norm=graph_norm
+        ).eval()
+        with torch.no_grad():
+            batched = model(batch.x, batch.edge_index, batch.edge_attr, batch.batch)
+            first = next(iter(DataLoader(dataset, batch_size=1)))
+            single = model(first.x, first.edge_index, first.edge_attr, first.batch)
+        predictions[graph_norm] = torch.allclose(batched[:1], single, atol=1e-5)
+
+    # Only the per graph norm is independent of the other graphs
+    assert predictions == {False: False, True: True}
@@ -0,0 +1,155 @@
+import pytest
+import random
+
+from arigin.expressions import generate
+from arigin.graph import elements
+from arigin.graph.parsing import (
+    Reduction, Token, TokenType, tokenize, parse, evaluate_reductions
+)
+from arigin.graph.generation import graph_from_expression
+
+
+def graph_signature(graph_entities):
+    """
+    Describe a graph by the ordered node contents and relationships given
+    as node indices, i.e. independent of the random node ids.
+    """
+    nodes = graph_entities["nodes"]
+    index = {id(node): i for i, node in enumerate(nodes)}
+    return (
+        [
+            (node.__class__, node.expression, node.value, node.type)
+            for node in nodes
+        ],
+        [
+            (
+                relationship.__class__,
+                index[id(relationship.source)],
+                index[id(relationship.target)]
+            )
+            for relationship in graph_entities["relationships"]
+        ]
+    )
+
+
+def test_tokenize():
+    assert tokenize("0.5 * ( 0.25 - 1.0 )") == [
+        Token(TokenType.NUMBER, "0.5"),
+        Token(TokenType.OPERATOR, "*"),
+        Token(TokenType.OPEN_PARENTHESIS, "("),
+        Token(TokenType.NUMBER, "0.25"),
+        Token(TokenType.OPERATOR, "-"),
+        Token(TokenType.NUMBER, "1.0"),
+        Token(TokenType.CLOSE_PARENTHESIS, ")"),
+    ]
+
+
+def test_tokenize_number_formats():
+    assert [token.text for token in tokenize("12 + 1e-05 * 2.5E3 - .5")] == [
+        "12", "+", "1e-05", "*", "2.5E3", "-", ".5"
+    ]
+
+
+def test_tokenize_signed_numbers():
+    assert [token.text for token in tokenize("-2 - -3 * (+4 / -1.5e2)")] == [
+        "-2", "-", "-3", "*", "(", "+4", "/", "-1.5e2", ")"
+    ]
+    assert [token.text for token in tokenize("2-3")] == ["2", "-", "3"]
+
+
+@pytest.mark.parametrize("expression", ["2 % 3", "2 + a", "-(2 + 3)", "2 * -"])
+def test_tokenize_invalid(expression):
+    with pytest.raises(ValueError):
+        tokenize(expression)
+
+
+def test_parse():
+    assert parse("(2 + 3) * 4") == [
+        Reduction("+", "2", "3"),
+        Reduction("*", 0, "4"),
+    ]
+    assert parse("1 - 2 * 3 + 4 / 5") == [
+        Reduction("*", "2", "3"),
+        Reduction("/", "4", "5"),
+        Reduction("-", "1", 0),
+        Reduction("+", 2, 1),
+    ]
+    assert parse("( ( 0.5 ) )") == []
+
+
+@pytest.mark.parametrize(
+    "expression", ["2 +", "2 3", "(2 + 3", "2 + 3)", "()", "2 ( 3 )"]
+)
+def test_parse_invalid(expression):
+    with pytest.raises(ValueError):
+        parse(expression)
+
+
+def test_graph_from_expression_unknown_engine():
+    with pytest.raises(ValueError):
+        graph_from_expression("2 + 3", engine="unknown")
+
+
+def test_graph_from_expression_number_formats():
+    graph_entities = graph_from_expression("-2 * 1e-3 + 4")
+    nodes = graph_entities["nodes"]
+
+    assert [node.__class__ for node in nodes] == [
+        elements.LeftOperand,
+        elements.RightOperand,
+        elements.Operator,
+        elements.RightOperand,
+        elements.Operator,
+    ]
+    assert [node.value for node in nodes] == [-2., 1e-3, None, 4., None]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "1.5 + 2.25 * 3.0",
+        "( 0.1 - 0.2 ) / 0.3 - 0.4",
+        "0.1 - 0.2 - 0.3 + 0.4",
+        "0.5 / 0.2 / 0.1 * 0.7",
+        "( ( 0.5 ) )",
+        "0.1 * ( 0.2 + 0.3 * ( 0.4 - 0.5 ) )",
+        "( 0.1 + ( 0.2 * 0.3 ) ) - ( 0.4 / ( ( 0.5 ) ) + 0.6 )",
+        "0.1 * 0.2 + ( 0.3 - 0.4 )",
+    ]
+)
+def test_engines_equivalent(expression):
+    assert (
+        graph_signature(graph_from_expression(expression, engine="parser")) ==
+        graph_signature(graph_from_expression(expression, engine="regex"))
+    )
+
+
+def test_engines_equivalent_on_generated_expressions():
+    random.seed(42)
+    for _ in range(300):
+        expression = generate(2, 6)
+        assert (
+            graph_signature(graph_from_expression(expression, engine="parser")) ==
+            graph_signature(graph_from_expression(expression, engine="regex"))
+        ), expression
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "1.5 + 2.25 * 3.0",
+        "( 0.1 - 0.2 ) / 0.3 - 0.4",
+        "0.1 - 0.2 - 0.3 + 0.4",
+        "0.5 / 0.2 / 0.1 * 0.7",
+        "-2 * 1e-3 + 4",
+    ]
+)
+def test_evaluate_reductions(expression):
+    assert evaluate_reductions(parse(expression)) == eval(expression)
+
+
+def test_evaluate_reductions_zero_division():
+    with pytest.raises(ZeroDivisionError):
+        evaluate_reductions(parse("0.1 / ( 0.2 - 0.2 )"))
+    with pytest.raises(ValueError):
+        evaluate_reductions(parse("0.1"))
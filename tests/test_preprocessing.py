@@ -0,0 +1,241 @@
+import numpy as np
+import pytest
+import torch
+from sklearn.preprocessing import StandardScaler
+from torch_geometric.loader import DataLoader
+
+from arigin.benchmarking import peak_traced_memory
+from arigin import features
+from arigin.features import EdgeFeaturizer, NodeFeaturizer, node_features, edge_features
+from arigin.graph.compact import GraphBatch
+from arigin.graph.elements import sequential_ids
+from arigin.graph.generation import (
+    generate_multiple_graphs, graph_from_expression, iter_multiple_graphs
+)
+from arigin.preprocessing import GraphDataset, GraphEntityToDataSet, split_by_graph
+
+
+def test_iter_transform():
+    graphs, results = generate_multiple_graphs(40, 2, 5, seed=1, shard_size=15)
+    transformer = GraphEntityToDataSet().fit(graphs, results)
+    expected = transformer.transform(graphs, results)
+
+    chunks = list(
+        transformer.iter_transform(
+            iter_multiple_graphs(40, 2, 5, chunk_size=15, seed=1)
+        )
+    )
+
+    assert len(chunks) == 3
+    torch.testing.assert_close(torch.cat([c.x for c in chunks]), expected.x)
+    torch.testing.assert_close(torch.cat([c.y for c in chunks]), expected.y)
+    assert sum(c.edge_index.shape[1] for c in chunks) == expected.edge_index.shape[1]
+    for chunk in chunks:
+        assert chunk.batch.min() == 0
+        assert chunk.batch.max() == len(chunk.y) - 1
+
+
+def test_transform_graph_batch():
+    graphs, results = generate_multiple_graphs(30, 2, 5, seed=2)
+    compact_graphs, compact_results = generate_multiple_graphs(
+        30, 2, 5, seed=2, compact=True
+    )
+    data = GraphEntityToDataSet().fit(graphs, results).transform(graphs, results)
+    compact_data = GraphEntityToDataSet().fit(
+        compact_graphs, compact_results
+    ).transform(compact_graphs, compact_results)
+
+    for key in (
+            "x", "edge_index", "edge_attr", "y", "batch",
+            "depth", "topo_rank", "root_index"):
+        torch.testing.assert_close(compact_data[key], data[key])
+
+
+def test_transform_pipelines_identical():
+    graphs, results = generate_multiple_graphs(30, 2, 5, seed=2)
+    data = GraphEntityToDataSet().fit(graphs, results).transform(graphs, results)
+    pipeline_data = GraphEntityToDataSet(
+        node_transformer=node_features, edge_transformer=edge_features
+    ).fit(graphs, results).transform(graphs, results)
+
+    for key in ("x", "edge_index", "edge_attr", "y", "batch"):
+        torch.testing.assert_close(pipeline_data[key], data[key], rtol=0, atol=0)
+
+
+def test_transform_dataset():
+    graphs, results = generate_multiple_graphs(40, 2, 5, seed=4)
+    transformer = GraphEntityToDataSet().fit(graphs, results)
+    data = transformer.transform(graphs, results)
+    dataset = transformer.transform_dataset(graphs, results)
+
+    assert len(dataset) == 40
+    for i in (0, 17, 39):
+        graph = dataset[i]
+        nodes = data.batch == i
+        torch.testing.assert_close(graph.x, data.x[nodes])
+        torch.testing.assert_close(graph.y, data.y[i:i + 1])
+        assert graph.edge_index.shape[1] == 2 * (nodes.sum() - 1)
+        assert graph.edge_index.max() < nodes.sum()
+
+
+def test_transform_dataset_data_loader():
+    graphs, results = generate_multiple_graphs(40, 2, 5, seed=4, compact=True)
+    transformer = GraphEntityToDataSet().fit(graphs, results)
+    data = transformer.transform(graphs, results)
+    dataset = transformer.transform_dataset(graphs, results)
+
+    loader = DataLoader(dataset, batch_size=40, shuffle=False)
+    batch = next(iter(loader))
+
+    torch.testing.assert_close(batch.x, data.x)
+    torch.testing.assert_close(batch.y, data.y)
+    torch.testing.assert_close(batch.batch, data.batch)
+    torch.testing.assert_close(batch.depth, data.depth)
+    torch.testing.assert_close(batch.topo_rank, data.topo_rank)
+    torch.testing.assert_close(batch.root_index, data.root_index)
+    assert sorted(map(tuple, batch.edge_index.T.tolist())) == sorted(
+        map(tuple, data.edge_index.T.tolist())
+    )
+
+    loader = DataLoader(dataset, batch_size=16, shuffle=True)
+    assert [len(batch.y) for batch in loader] == [16, 16, 8]
+    for batch in loader:
+        torch.testing.assert_close(batch.root_index, batch.ptr[1:] - 1)
+
+
+def test_transform_peak_memory():
+    graphs, results = generate_multiple_graphs(5000, 2, 5, seed=0, compact=True)
+    transformer = GraphEntityToDataSet().fit(graphs, results)
+    data, peak = peak_traced_memory(transformer.transform, graphs, results)
+
+    output = sum(
+        tensor.numel() * tensor.element_size()
+        for tensor in (data.x, data.edge_index, data.edge_attr, data.y, data.batch)
+    )
+    # All arrays are allocated once and shared with the tensors
+    assert output <= peak < 1.25 * output
+    assert data.edge_index.is_contiguous() and data.edge_attr.is_contiguous()
+
+
+def test_fit_stream_and_merge():
+    def transformer():
+        return GraphEntityToDataSet(
+            node_transformer=NodeFeaturizer(categories="auto"),
+            edge_transformer=EdgeFeaturizer(categories="auto"),
+            target_transformer=StandardScaler()
+        )
+
+    graphs, results = generate_multiple_graphs(
+        60, 2, 5, seed=3, shard_size=25, compact=True
+    )
+    expected = transformer().fit(graphs, results).transform(graphs, results)
+
+    chunks = list(iter_multiple_graphs(60, 2, 5, chunk_size=25, seed=3, compact=True))
+    streamed = transformer().fit_stream(iter(chunks))
+    merged = transformer()
+    for chunk in chunks:
+        merged.merge(transformer().fit(*chunk))
+
+    for fitted in (streamed, merged):
+        data = fitted.transform(graphs, results)
+        torch.testing.assert_close(data.x, expected.x)
+        torch.testing.assert_close(data.edge_attr, expected.edge_attr)
+        torch.testing.assert_close(data.y, expected.y)
+
+
+def test_partial_fit_requires_incremental_transformers():
+    graphs, results = generate_multiple_graphs(10, 2, 3, seed=0)
+
+    with pytest.raises(ValueError):
+        GraphEntityToDataSet(node_features, edge_features).partial_fit(graphs, results)
+
+
+def test_merge_default_transformers():
+    chunks = list(iter_multiple_graphs(40, 2, 5, chunk_size=20, seed=4, compact=True))
+    fitted = [GraphEntityToDataSet().partial_fit(*chunk) for chunk in chunks]
+
+    for transformer, (graphs, _) in zip(fitted, chunks):
+        assert transformer.node_transformer_.n_samples_seen_ == graphs.n_nodes
+    assert features.fast_node_features is not fitted[0].node_transformer_
+    # The parameters stay the transformers passed in
+    assert fitted[0].get_params()["node_transformer"] is features.fast_node_features
+    assert not hasattr(features.fast_node_features, "n_samples_seen_")
+
+    merged = GraphEntityToDataSet()
+    for transformer in fitted:
+        merged.merge(transformer)
+
+    assert merged.n_chunks_seen_ == 2
+    assert merged.node_transformer_.n_samples_seen_ == sum(
+        graphs.n_nodes for graphs, _ in chunks
+    )
+
+
+def test_empty_graph_root_index():
+    expressions = ["0.5 * 0.25 + 0.125", "0.5", "0.1 / 0.2"]
+    graphs = [graph_from_expression(e) for e in expressions]
+    entities = {
+        "nodes": [n for g in graphs for n in g["nodes"]],
+        "relationships": [r for g in graphs for r in g["relationships"]],
+        "batch": [i for i, g in enumerate(graphs) for _ in g["nodes"]],
+    }
+    compact = GraphBatch.concatenate(
+        [graph_from_expression(e, compact=True) for e in expressions]
+    )
+    transformer = GraphEntityToDataSet().fit(compact, None)
+
+    assert transformer.transform(entities).root_index.tolist() == [4, -1, 7]
+    assert transformer.transform(compact).root_index.tolist() == [4, -1, 7]
+
+    # Graphs without nodes are dropped, so collation never shifts the -1
+    dataset = transformer.transform_dataset(compact, np.arange(3.).reshape(-1, 1))
+    assert len(dataset) == 2
+    batch = next(iter(DataLoader(dataset, batch_size=2)))
+    assert batch.root_index.tolist() == [4, 7]
+    assert batch.y.view(-1).tolist() == [0., 2.]
+    dataset = GraphDataset.from_data(transformer.transform(entities), 3)
+    assert next(iter(DataLoader(dataset, batch_size=2))).root_index.tolist() == [4, 7]
+
+
+def test_edges_of_sequential_ids():
+    expressions = ["0.5 * 0.25 + 0.125", "0.1 / 0.2"]
+    random_graphs = [graph_from_expression(e) for e in expressions]
+    with sequential_ids(start=10):
+        sequential_graphs = [graph_from_expression(e) for e in expressions]
+    transformer = GraphEntityToDataSet()
+
+    def entities(graphs):
+        return {
+            "nodes": [n for g in graphs for n in g["nodes"]],
+            "relationships": [r for g in graphs for r in g["relationships"]],
+        }
+
+    expected = transformer._get_edges(entities(random_graphs))
+    assert transformer._get_first_sequential_id(entities(sequential_graphs)) == 10
+    np.testing.assert_array_equal(
+        transformer._get_edges(entities(sequential_graphs)), expected
+    )
+    # Ids, which are not consecutive, are mapped to their index
+    reordered = entities(sequential_graphs[::-1])
+    assert transformer._get_first_sequential_id(reordered) is None
+    np.testing.assert_array_equal(
+        transformer._get_edges(reordered),
+        transformer._get_edges(entities(random_graphs[::-1]))
+    )
+
+
+def test_split_by_graph_empty_trailing_graph():
+    expressions = ["0.5 * 0.25", "0.1 / 0.2", "0.5"]
+    compact = GraphBatch.concatenate(
+        [graph_from_expression(e, compact=True) for e in expressions]
+    )
+    transformer = GraphEntityToDataSet().fit(compact, None)
+    data = transformer.transform(compact, np.arange(3.).reshape(-1, 1))
+
+    arrays = split_by_graph(data)
+
+    assert len(arrays["node_offsets"]) == 3
+    assert arrays["y"].ravel().tolist() == [0., 1.]
+    assert arrays["root_index"].tolist() == [2, 2]
+    with pytest.raises(ValueError):
+        split_by_graph(data, 2)
@@ -0,0 +1,76 @@
+import pickle
+import random
+import pytest
+import torch
+
+from arigin import profiling
+from arigin.graph.generation import generate_multiple_graphs, generate_tree
+from arigin.preprocessing import GraphEntityToDataSet
+from arigin.profiling import Profiler, count, profiled, stage
+
+
+@profiled("test.square")
+def square(x):
+    return x * x
+
+
+def test_disabled_hooks_record_nothing():
+    profiler = Profiler()
+
+    assert stage("test.block") is profiling._NULL_STAGE
+    assert square(3) == 9
+    count("test.counter")
+
+    assert profiler.report().stages == []
+    assert profiler.report().counters == {}
+
+
+def test_profiler_records_stages_and_counters():
+    with Profiler() as profiler:
+        assert profiler.active
+        for i in range(3):
+            square(i)
+        with stage("test.block"):
+            square(4)
+        count("test.counter", 5)
+
+    assert not profiler.active
+    report = profiler.report()
+    stages = {stats.name: stats for stats in report.stages}
+    assert stages["test.square"].calls == 4
+    assert stages["test.block"].calls == 1
+    assert stages["test.block"].allocated is None
+    assert report.counters == {"test.counter": 5}
+    assert report.seconds >= stages["test.block"].seconds
+    assert "test.square" in str(report)
+
+
+def test_pipeline_stages():
+    with Profiler(trace_memory=True) as profiler:
+        graphs, results = generate_multiple_graphs(50, 2, 4, seed=0, compact=True)
+        GraphEntityToDataSet().fit_transform(graphs, results)
+
+    report = profiler.report()
+    stages = {stats.name: stats for stats in report.stages}
+    assert stages["generation.generate_graphs"].calls == 1
+    assert stages["expressions.generate_batch"].calls == 1
+    assert stages["preprocessing.transform"].calls == 1
+    assert stages["preprocessing.transform"].allocated > 0
+    assert report.counters["generation.graphs"] == len(results)
+
+
+def test_record_function_ranges():
+    with torch.profiler.profile() as trace, Profiler(record_functions=True):
+        generate_tree(2, 3, rng=random.Random(0))
+
+    assert "generation.generate_tree" in {event.name for event in trace.events()}
+
+
+def test_single_active_profiler():
+    with Profiler():
+        with pytest.raises(RuntimeError):
+            Profiler().start()
+
+
+def test_profiled_functions_can_be_pickled():
+    assert pickle.loads(pickle.dumps(generate_tree)) is generate_tree
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from torch_geometric.loader import DataLoader
+
+from arigin.graph.generation import generate_multiple_graphs
+from arigin.preprocessing import GraphEntityToDataSet
+from arigin.sampling import NodeBudgetBatchSampler, batch_stats
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    graphs, results = generate_multiple_graphs(200, 2, 8, seed=0, compact=True)
+    return GraphEntityToDataSet().fit(graphs, results).transform_dataset(
+        graphs, results
+    )
+
+
+def test_batches_respect_node_budget():
+    n_nodes = np.random.default_rng(0).integers(3, 16, size=500)
+    sampler = NodeBudgetBatchSampler(n_nodes, max_nodes=64)
+    batches = list(sampler)
+
+    assert sorted(np.concatenate(batches).tolist()) == list(range(500))
+    assert all(n_nodes[batch].sum() <= 64 for batch in batches)
+    # Buckets per distinct size, i.e. batches are homogeneous
+    assert all(len(np.unique(n_nodes[batch])) == 1 for batch in batches)
+    assert len(sampler) == len(batches)
+
+
+def test_oversized_graph_forms_own_batch():
+    sampler = NodeBudgetBatchSampler([3, 100, 3], max_nodes=10, shuffle=False)
+    assert list(sampler) == [[0, 2], [1]]
+
+
+def test_n_buckets():
+    n_nodes = np.arange(3, 103)
+    sampler = NodeBudgetBatchSampler(n_nodes, max_nodes=200, n_buckets=4)
+
+    assert len(sampler.buckets) == 4
+    assert sum(len(bucket) for bucket in sampler.buckets) == 100
+
+
+def test_drop_last():
+    sampler = NodeBudgetBatchSampler([5] * 7, max_nodes=10, drop_last=True)
+    assert sorted(len(batch) for batch in sampler) == [2, 2, 2]
+
+
+def test_epoch_reproducible():
+    n_nodes = np.random.default_rng(1).integers(3, 16, size=100)
+    sampler = NodeBudgetBatchSampler(n_nodes, max_nodes=32, seed=3)
+
+    first = list(sampler)
+    assert list(sampler) == first
+    sampler.set_epoch(1)
+    assert list(sampler) != first
+    sampler.set_epoch(0)
+    assert list(sampler) == first
+
+
+def test_epoch_stats():
+    stats = batch_stats([[0, 1], [2]], np.array([3, 5, 7]), max_nodes=10, seconds=2.)
+
+    assert stats.n_batches == 2
+    assert stats.n_graphs == 3
+    assert stats.n_nodes == 15
+    assert stats.fill_ratio == 0.75
+    assert stats.padding_ratio == pytest.approx(1 - 15 / 17)
+    assert stats.graphs_per_second == 1.5
+    assert stats.nodes_per_second == 7.5
+
+
+def test_data_loader(dataset):
+    sampler = NodeBudgetBatchSampler.from_dataset(dataset, max_nodes=100)
+    loader = DataLoader(dataset, batch_sampler=sampler)
+
+    n_graphs = 0
+    for batch in loader:
+        assert batch.num_nodes <= 100
+        n_graphs += batch.num_graphs
+
+    assert n_graphs == len(dataset)
+    assert sampler.epoch_stats().n_graphs == len(dataset)
+    assert sampler.epoch_stats().padding_ratio == 0.
@@ -0,0 +1,209 @@
+import json
+import asyncio
+import pytest
+import torch
+
+from arigin.graph.generation import graph_from_expression
+from arigin.preprocessing import GraphEntityToDataSet
+from arigin.serving import (
+    InferenceServer, LatencyMetrics, MicroBatcher, load_predictor
+)
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    torch.manual_seed(0)
+    return load_predictor(feature_spec=_feature_spec(), graph_norm=True)
+
+
+def _feature_spec():
+    return GraphEntityToDataSet().fit(
+        graph_from_expression("0.5 * 0.25", compact=True), None
+    ).feature_spec()
+
+
+async def _post(port, path, content=None, method="POST"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(content).encode() if content is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    content = json.loads(await reader.readexactly(int(headers["content-length"])))
+    writer.close()
+    return status, content
+
+
+def test_predictor_batch_matches_single(predictor):
+    expressions = ["0.5 * 0.25", "( 0.1 + 0.2 ) / 0.3", "0.7 - 0.2 * 0.4"]
+
+    batched = predictor.predict(expressions)
+    single = [predictor.predict([expression])[0] for expression in expressions]
+
+    assert batched == pytest.approx(single, abs=1e-5)
+
+
+def test_predictor_rejects_expression_without_operator(predictor):
+    with pytest.raises(ValueError):
+        predictor.parse("0.5")
+
+
+def test_micro_batcher_collects_concurrent_items():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait=0.05)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == [2 * i for i in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_micro_batcher_propagates_errors():
+
+    def process(items):
+        raise RuntimeError("failed")
+
+    async def run():
+        batcher = MicroBatcher(process, max_wait=0.)
+        batcher.start()
+        try:
+            with pytest.raises(RuntimeError):
+                await batcher.submit(1)
+            # The batcher keeps running after a failed batch
+            batcher.process = lambda items: items
+            return await batcher.submit(2)
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()) == 2
+
+
+def test_latency_metrics():
+    metrics = LatencyMetrics()
+    for latency in range(1, 101):
+        metrics.record(latency / 1000)
+    metrics.record_batch(4)
+
+    summary = metrics.summary()
+
+    assert summary["requests"] == 100
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+    assert summary["mean_batch_size"] == 4
+
+
+def test_inference_server(predictor):
+    expressions = ["0.5 * 0.25", "( 0.1 + 0.2 ) / 0.3", "0.7 - 0.2 * 0.4"]
+
+    async def run():
+        server = InferenceServer(predictor, port=0, max_wait=0.05)
+        await server.start()
+        try:
+            responses = await asyncio.gather(*(
+                _post(server.port, "/predict", {"expression": expression})
+                for expression in expressions
+            ))
+            invalid = await _post(server.port, "/predict", {"expression": "0.5 +"})
+            unknown = await _post(server.port, "/unknown", method="GET")
+            metrics = await _post(server.port, "/metrics", method="GET")
+        finally:
+            await server.close()
+        return responses, invalid, unknown, metrics
+
+    responses, invalid, unknown, (_, metrics) = asyncio.run(run())
+
+    assert [status for status, _ in responses] == [200] * 3
+    assert [content["prediction"] for _, content in responses] == pytest.approx(
+        predictor.predict(expressions), abs=1e-5
+    )
+    assert invalid[0] == 400
+    assert unknown[0] == 404
+    assert metrics["requests"] == 3
+    assert metrics["errors"] == 1
+    assert metrics["mean_batch_size"] == 3
+
+
+def test_inference_server_errors(predictor):
+
+    class FailingPredictor:
+        parse = staticmethod(predictor.parse)
+        batch_independent = True
+
+        @staticmethod
+        def predict_graphs(graphs):
+            raise RuntimeError("model failed")
+
+    async def malformed(port, request_line):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request_line + b"\r\n\r\n")
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        # The connection is closed after the response
+        await reader.read()
+        writer.close()
+        return status
+
+    async def run():
+        server = InferenceServer(predictor, port=0, max_wait=0.)
+        failing = InferenceServer(FailingPredictor(), port=0, max_wait=0.)
+        await server.start()
+        await failing.start()
+        try:
+            not_string = await _post(server.port, "/predict", {"expression": 0.5})
+            not_object = await _post(server.port, "/predict", ["0.5 * 0.25"])
+            request_line = await malformed(server.port, b"GARBAGE")
+            content_length = await malformed(
+                server.port, b"POST /predict HTTP/1.1\r\nContent-Length: x"
+            )
+            failed = await _post(failing.port, "/predict", {"expression": "0.5 * 0.25"})
+            metrics = await _post(server.port, "/metrics", method="GET")
+            failing_metrics = await _post(failing.port, "/metrics", method="GET")
+        finally:
+            await server.close()
+            await failing.close()
+        return (
+            not_string, not_object, request_line, content_length, failed,
+            metrics, failing_metrics
+        )
+
+    (not_string, not_object, request_line, content_length, failed,
+     (_, metrics), (_, failing_metrics)) = asyncio.run(run())
+
+    assert not_string[0] == 400
+    assert not_object[0] == 400
+    assert request_line == 400
+    assert content_length == 400
+    assert failed[0] == 500
+    assert "model failed" in failed[1]["error"]
+    assert metrics["errors"] == 4
+    assert failing_metrics["errors"] == 1
+
+
+def test_batch_dependent_model_is_not_micro_batched(tmp_path):
+    with pytest.raises(ValueError):
+        load_predictor()
+    spec = _feature_spec()
+    spec.save(tmp_path / "feature_spec.npz")
+    predictor = load_predictor(feature_spec=str(tmp_path / "feature_spec.npz"))
+
+    assert not predictor.batch_independent
+    with pytest.raises(ValueError):
+        InferenceServer(predictor, port=0)
+    assert InferenceServer(predictor, port=0, max_batch_size=1)
+    assert load_predictor("level", feature_spec=spec).batch_independent
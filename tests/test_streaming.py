@@ -0,0 +1,56 @@
+import pytest
+import torch
+
+from arigin.graph.models import MathModel
+from arigin.streaming import GeneratedGraphDataset, streaming_loader
+from arigin.training import Trainer
+
+
+def signature(batches):
+    return sorted(tuple(batch.y.flatten().tolist()) for batch in batches)
+
+
+def test_batches():
+    dataset = GeneratedGraphDataset(batch_size=20, n_batches=3, seed=0)
+    batches = list(dataset)
+
+    assert len(batches) == len(dataset) == 3
+    for batch in batches:
+        assert batch.num_graphs == len(batch.y) <= 20
+        assert batch.ptr[-1] == batch.num_nodes
+        assert batch.x.shape == (batch.num_nodes, 9)
+        assert batch.edge_attr.shape == (batch.edge_index.shape[1], 4)
+
+
+def test_endless():
+    dataset = GeneratedGraphDataset(batch_size=4, seed=0)
+    iterator = iter(dataset)
+    assert len([next(iterator) for _ in range(50)]) == 50
+    with pytest.raises(TypeError):
+        len(dataset)
+
+
+def test_reproducible_and_epoch_dependent():
+    dataset = GeneratedGraphDataset(batch_size=10, n_batches=4, seed=1)
+    first = signature(dataset)
+
+    assert signature(dataset) == first
+    dataset.set_epoch(1)
+    assert signature(dataset) != first
+
+
+def test_workers_split_stream():
+    dataset = GeneratedGraphDataset(batch_size=10, n_batches=5, seed=2)
+    expected = signature(dataset)
+
+    loader = streaming_loader(dataset, num_workers=2, prefetch_factor=2)
+    assert signature(loader) == expected
+
+
+def test_trainer_sets_epoch():
+    dataset = GeneratedGraphDataset(batch_size=16, n_batches=2, seed=3)
+    trainer = Trainer(MathModel(9, 8, 8, 1, edge_dim=4))
+    metrics = trainer.fit(streaming_loader(dataset), epochs=2)
+
+    assert dataset.epoch == 1
+    assert metrics[0].n_graphs > 0
@@ -0,0 +1,76 @@
+import pytest
+import torch
+from torch_geometric.loader import DataLoader
+
+from arigin.graph.generation import generate_multiple_graphs
+from arigin.preprocessing import GraphEntityToDataSet
+from arigin.training import Trainer, build_model, main, predict
+
+
+@pytest.fixture(scope="module")
+def loader():
+    graphs, results = generate_multiple_graphs(64, 2, 4, seed=0, compact=True)
+    dataset = GraphEntityToDataSet().fit(graphs, results).transform_dataset(
+        graphs, results
+    )
+    return DataLoader(dataset, batch_size=16, shuffle=True)
+
+
+@pytest.mark.parametrize("name", ["math", "gcn", "level"])
+def test_predict_shape(loader, name):
+    batch = next(iter(loader))
+    model = build_model(name, batch.num_node_features, batch.num_edge_features, 8)
+    assert predict(model, batch).shape == (batch.num_graphs, 1)
+
+
+def test_unknown_model():
+    with pytest.raises(ValueError):
+        build_model("unknown", 9, 4)
+
+
+@pytest.mark.parametrize("accumulation_steps, bf16", [(1, False), (3, True)])
+def test_train_epoch(loader, accumulation_steps, bf16):
+    torch.manual_seed(0)
+    model = build_model("math", 9, 4, 8)
+    trainer = Trainer(model, accumulation_steps=accumulation_steps, bf16=bf16)
+    metrics = trainer.fit(loader, epochs=2)
+
+    assert [m.epoch for m in metrics] == [0, 1]
+    assert metrics[0].n_graphs == 64
+    assert metrics[0].n_nodes == sum(batch.num_nodes for batch in loader)
+    assert metrics[0].graphs_per_second > 0
+    assert metrics[0].peak_memory > 0
+
+
+def test_accumulation_remainder(loader):
+    batches = list(loader)[:2]
+
+    def train(accumulation_steps):
+        torch.manual_seed(0)
+        model = build_model("gcn", 9, 4, 8)
+        optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+        Trainer(
+            model, optimizer=optimizer, accumulation_steps=accumulation_steps
+        ).train_epoch(batches)
+        return torch.cat([p.detach().view(-1) for p in model.parameters()])
+
+    # A window cut short by the end of the epoch averages its batches
+    torch.testing.assert_close(train(3), train(2))
+
+
+def test_checkpoint(loader, tmp_path):
+    torch.manual_seed(0)
+    trainer = Trainer(build_model("gcn", 9, 4, 8), checkpoint_dir=tmp_path)
+    trainer.fit(loader, epochs=1, val_loader=loader)
+
+    restored = Trainer(build_model("gcn", 9, 4, 8))
+    restored.load_checkpoint(tmp_path / "checkpoint.pt")
+
+    assert restored.epoch == 1
+    assert restored.history[0].val_loss == trainer.history[0].val_loss
+    assert restored.evaluate(loader) == pytest.approx(trainer.evaluate(loader))
+
+
+def test_main(capsys):
+    main(["--n-graphs", "32", "--epochs", "1", "--max-nodes", "64"])
+    assert "Epoch 00000" in capsys.readouterr().out